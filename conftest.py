@@ -0,0 +1,2 @@
+# conftest.py
+# Keeps the repo root importable from tests/ (the modules live at the top level).
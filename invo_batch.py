@@ -0,0 +1,405 @@
+# invo_batch.py
+"""Vectorized version of ``invo_engine.GameEngine`` for parameter grids.
+
+Every state field is a NumPy array with one entry per parameter set and all
+runs advance in lockstep; the branches of the JS ``tick()`` become masks.
+Runs share one ``speed_unit`` (the time step), everything else, including
+the scenario, may differ per run. A step longer than "minute" is
+sub-divided at each run's own next event, as ``GameEngine`` does: the first
+sub-step plays every run, later ones only the runs an event split. Results
+match ``GameEngine`` at every speed. With ``adaptive=False`` every step is
+played whole, as one sub-step: far cheaper at the turbo speeds, where a step
+spans many events, but no longer the game.
+"""
+import copy
+import itertools
+
+import numpy as np
+
+from invo_engine import (
+    DEFAULT_PARAMS,
+    FG_UNIT_PRICE,
+    MARKET_UNIT_PRICE,
+    REFERENCE_STEP_UNITS,
+    SIM_TIME_UNITS_PER_DAY,
+    SUPPLIER_UNIT_COST,
+    TRUCK_LOADING_PORTION,
+    WAREHOUSE_UNIT_COST,
+    time_units_per_step,
+)
+
+# The eight sidebar sliders
+SLIDER_FIELDS = (
+    "lead_time",
+    "moq",
+    "production_rate",
+    "market_demand",
+    "safety_stock",
+    "fg_safety_stock",
+    "initial_fg_stock",
+    "factory_batch",
+)
+
+
+def param_grid(**axes):
+    """Cartesian product of slider values, flattened to one array per field.
+
+    Fields that are not given keep their sidebar default; ``scenario`` may be
+    passed as an axis too.
+    """
+    names = list(axes)
+    values = [np.atleast_1d(axes[name]) for name in names]
+    combos = list(itertools.product(*values)) or [()]
+    grid = {name: np.array([combo[i] for combo in combos]) for i, name in enumerate(names)}
+    size = len(combos)
+    for field in SLIDER_FIELDS + ("scenario",):
+        if field not in grid:
+            grid[field] = np.full(size, DEFAULT_PARAMS[field])
+    return grid
+
+
+class BatchEngine:
+    """Lockstep simulation of many parameter sets at once.
+
+    ``params`` maps the app's param keys to scalars or 1-D arrays; arrays are
+    broadcast against each other. Money particles and the chilled truck are
+    render-only and are not simulated. Only the deterministic model is
+    vectorized; stochastic runs go through ``GameEngine``. ``adaptive`` may be
+    switched between ticks.
+    """
+
+    def __init__(self, params, speed_unit=None, adaptive=True):
+        merged = {**DEFAULT_PARAMS, **params}
+        if np.any(np.asarray(merged["stochastic"], dtype=bool)):
+            raise ValueError("BatchEngine runs the deterministic model only; use GameEngine for stochastic runs")
+        if speed_unit is None:
+            speed_unit = merged["speed_unit"]
+        self.time_units_per_step = time_units_per_step(speed_unit)
+        self.substep_units = self.time_units_per_step
+        self.adaptive = adaptive
+
+        fields = {field: np.asarray(merged[field], dtype=float) for field in SLIDER_FIELDS}
+        biased = np.asarray(merged["scenario"]) == "Biased forecast"
+        *sliders, biased = np.broadcast_arrays(*fields.values(), biased)
+        self.params = {field: np.array(arr) for field, arr in zip(SLIDER_FIELDS, sliders)}
+        self.biased = np.array(biased)
+        self.size = self.biased.size
+
+        self.production_bias = np.where(self.biased, 1.2, 1.0)
+        self.demand_per_time_unit = (
+            np.maximum(0.0, self.params["market_demand"]) / max(1.0, SIM_TIME_UNITS_PER_DAY)
+        ) * np.where(self.biased, 1.3, 1.0)
+        self.state = self.create_initial_state()
+        self.steps = 0
+
+    def create_initial_state(self):
+        p = self.params
+        n = self.size
+        state = {
+            "factory_stock": np.full(n, 240.0),
+            "warehouse_stock": np.full(n, 520.0),
+            "safety_stock": p["safety_stock"].copy(),
+            "fg_safety_stock": p["fg_safety_stock"].copy(),
+            "high_stock_threshold": np.full(n, 800.0),
+            "fg_high_stock_threshold": np.full(n, 600.0),
+            "worker_capacity": np.maximum(1.0, p["factory_batch"]),
+            "worker_progress": np.zeros(n),
+            "worker_direction": np.ones(n, dtype=np.int8),
+            "worker_load": np.zeros(n),
+            "finished_goods_stock": np.maximum(0.0, p["initial_fg_stock"]),
+            "backlog": np.zeros(n),
+            "truck_en_route": np.zeros(n, dtype=bool),
+            "truck_progress": np.zeros(n),
+            "truck_delivery": np.zeros(n),
+            "truck_wait_timer": np.zeros(n),
+            "truck_travel_minutes_total": np.zeros(n),
+            "truck_travel_minutes_remaining": np.zeros(n),
+            "production_shutdown": np.zeros(n, dtype=bool),
+            "score": np.zeros(n),
+            "time_acc": np.zeros(n),
+            "production_plan_daily": np.zeros(n),
+            "supply_plan_daily": np.zeros(n),
+            "production_target_per_time_unit": np.zeros(n),
+        }
+        self.update_planning_targets(state)
+        return state
+
+    def update_planning_targets(self, state):
+        demand = np.maximum(0.0, self.params["market_demand"])
+        deficit = np.maximum(0.0, np.maximum(0.0, state["fg_safety_stock"]) - np.maximum(0.0, state["finished_goods_stock"]))
+        production_plan = np.maximum(0.0, demand + deficit + np.maximum(0.0, state["backlog"]))
+        state["production_plan_daily"] = production_plan
+        state["supply_plan_daily"] = np.maximum(0.0, production_plan + np.maximum(0.0, state["safety_stock"]))
+        state["production_target_per_time_unit"] = production_plan / max(1.0, SIM_TIME_UNITS_PER_DAY)
+
+    def sync_param_driven_state(self):
+        p = self.params
+        s = self.state
+        s["safety_stock"] = p["safety_stock"]
+        s["fg_safety_stock"] = p["fg_safety_stock"]
+        s["worker_capacity"] = np.maximum(1.0, p["factory_batch"])
+        s["fg_high_stock_threshold"] = np.maximum(
+            s["fg_safety_stock"] * 2.0, p["initial_fg_stock"] + np.maximum(0.0, p["market_demand"]) * 2.0
+        )
+        self.update_planning_targets(s)
+
+    # Utility calculations
+    def production_requirement_per_time_unit(self):
+        return np.maximum(0.0, self.state["production_target_per_time_unit"]) * self.production_bias
+
+    def compute_reorder_point(self, per_unit):
+        lead_demand = per_unit * np.maximum(0.0, self.params["lead_time"]) * SIM_TIME_UNITS_PER_DAY
+        return np.maximum(0.0, self.state["safety_stock"] + lead_demand)
+
+    # Simulation steps
+    def apply_production(self, per_unit):
+        s = self.state
+        per_step = per_unit * self.substep_units
+        actual = np.minimum(per_step, np.maximum(0.0, s["factory_stock"]))
+        active = ~s["production_shutdown"] & (per_step > 0) & (actual > 0)
+        actual = np.where(active, actual, 0.0)
+        s["factory_stock"] = np.where(active, np.maximum(0.0, s["factory_stock"] - actual), s["factory_stock"])
+        s["finished_goods_stock"] += actual
+
+        fg = s["finished_goods_stock"]
+        backlog = s["backlog"]
+        fulfill = np.where(active & (backlog > 0) & (fg > 0), np.minimum(fg, backlog), 0.0)
+        s["finished_goods_stock"] = fg - fulfill
+        s["backlog"] = backlog - fulfill
+
+    def apply_market_demand(self):
+        s = self.state
+        per_step = self.demand_per_time_unit * self.substep_units
+        fg = s["finished_goods_stock"]
+        active = per_step > 0
+        enough = fg >= per_step
+        short = active & ~enough
+        s["backlog"] = s["backlog"] + np.where(short, per_step - fg, 0.0)
+        s["finished_goods_stock"] = np.where(active & enough, fg - per_step, np.where(short, 0.0, fg))
+
+    def compute_worker_speed(self, per_unit):
+        s = self.state
+        dt = self.substep_units
+        capacity = np.maximum(0.0, s["worker_capacity"])
+        forward = s["worker_direction"] == 1
+        producing = per_unit > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cycle_units = 1.0 / (per_unit / capacity)
+        idle_trip = np.where(
+            (~forward & (s["worker_progress"] > 0)) | (forward & (s["worker_progress"] < 1)), 0.5, np.nan
+        )
+        half_trip_units = np.where(producing, np.maximum(dt, cycle_units / 2.0), idle_trip)
+        valid = (capacity > 0) & np.isfinite(half_trip_units) & (half_trip_units > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed = np.clip(dt / half_trip_units, 0.0, 1.0)
+        return np.where(valid, speed, 0.0)
+
+    def move_worker(self, per_unit):
+        s = self.state
+        speed = self.compute_worker_speed(per_unit)
+        forward = s["worker_direction"] == 1
+        progress = s["worker_progress"]
+
+        progress = np.where(forward & (progress < 1.0), np.minimum(1.0, progress + speed), progress)
+        at_warehouse = forward & (np.abs(progress - 1.0) < 1e-3)
+        take = np.where(at_warehouse & (s["warehouse_stock"] > 0), np.minimum(s["worker_capacity"], s["warehouse_stock"]), 0.0)
+        s["worker_load"] = np.where(at_warehouse, take, s["worker_load"])
+        s["warehouse_stock"] = s["warehouse_stock"] - take
+
+        backward = ~forward
+        progress = np.where(backward & (progress > 0.0), np.maximum(0.0, progress - speed), progress)
+        at_factory = backward & (np.abs(progress) < 1e-3)
+        drop = at_factory & (s["worker_load"] > 0)
+        s["factory_stock"] = s["factory_stock"] + np.where(drop, s["worker_load"], 0.0)
+        s["worker_load"] = np.where(drop, 0.0, s["worker_load"])
+
+        s["worker_progress"] = progress
+        s["worker_direction"] = np.where(at_warehouse, -1, np.where(at_factory, 1, s["worker_direction"])).astype(np.int8)
+
+    def handle_replenishment(self, reorder_point):
+        s = self.state
+        raw_on_hand = s["factory_stock"] + s["warehouse_stock"]
+        target_raw = np.maximum(0.0, s["supply_plan_daily"])
+        dispatch = ~s["truck_en_route"] & (raw_on_hand <= np.maximum(target_raw, reorder_point))
+        if not dispatch.any():
+            return
+
+        lead_time_units = np.maximum(0.1, self.params["lead_time"]) * SIM_TIME_UNITS_PER_DAY
+        loading_units = lead_time_units * TRUCK_LOADING_PORTION
+        travel_units = np.maximum(self.substep_units, lead_time_units - loading_units)
+        moq = self.params["moq"]
+        request_amount = np.maximum(moq, np.maximum(0.0, target_raw - raw_on_hand))
+        request_amount = np.where(request_amount <= 0, np.maximum(moq, target_raw), request_amount)
+
+        s["truck_en_route"] = s["truck_en_route"] | dispatch
+        s["truck_progress"] = np.where(dispatch, 0.0, s["truck_progress"])
+        s["truck_wait_timer"] = np.where(dispatch, loading_units, s["truck_wait_timer"])
+        s["truck_travel_minutes_total"] = np.where(dispatch, travel_units, s["truck_travel_minutes_total"])
+        s["truck_travel_minutes_remaining"] = np.where(dispatch, travel_units, s["truck_travel_minutes_remaining"])
+        s["truck_delivery"] = np.where(dispatch, request_amount, s["truck_delivery"])
+
+    def move_truck(self):
+        s = self.state
+        dt = self.substep_units
+        en_route = s["truck_en_route"]
+        if not en_route.any():
+            return
+
+        waiting = en_route & (s["truck_wait_timer"] > 0)
+        loading = np.where(waiting, np.minimum(s["truck_wait_timer"], dt), 0.0)
+        s["truck_wait_timer"] = np.where(waiting, np.maximum(0.0, s["truck_wait_timer"] - loading), s["truck_wait_timer"])
+        travel_dt = dt - loading
+        moving = en_route & ~(waiting & ((s["truck_wait_timer"] > 0) | (travel_dt <= 0)))
+        instant = moving & (s["truck_travel_minutes_total"] <= 0)
+        travelling = moving & ~instant
+
+        s["truck_travel_minutes_remaining"] = np.where(
+            travelling,
+            np.maximum(0.0, s["truck_travel_minutes_remaining"] - travel_dt),
+            s["truck_travel_minutes_remaining"],
+        )
+        prog = travel_dt / np.maximum(1e-6, s["truck_travel_minutes_total"])
+        s["truck_progress"] = np.where(travelling, np.minimum(1.0, s["truck_progress"] + prog), s["truck_progress"])
+        arrived = travelling & (
+            (s["truck_travel_minutes_remaining"] <= 0.0) | (np.abs(s["truck_progress"] - 1.0) < 1e-3)
+        )
+        self.complete_truck(instant | arrived)
+
+    def complete_truck(self, done):
+        s = self.state
+        s["warehouse_stock"] = s["warehouse_stock"] + np.where(done & (s["truck_delivery"] > 0), s["truck_delivery"], 0.0)
+        s["truck_en_route"] = s["truck_en_route"] & ~done
+        for key in (
+            "truck_progress",
+            "truck_delivery",
+            "truck_wait_timer",
+            "truck_travel_minutes_total",
+            "truck_travel_minutes_remaining",
+        ):
+            s[key] = np.where(done, 0.0, s[key])
+
+    def apply_scenario_effects(self):
+        s = self.state
+        factory = s["factory_stock"]
+        safety = s["safety_stock"]
+        shutdown = s["production_shutdown"] | (factory < np.maximum(40.0, safety * 0.5))
+        shutdown &= ~(factory > safety + 60)
+        s["production_shutdown"] = self.biased & shutdown
+
+    def update_score(self, reorder_point):
+        s = self.state
+        factory = s["factory_stock"]
+        warehouse = s["warehouse_stock"]
+        safety = s["safety_stock"]
+        step = (
+            (~s["production_shutdown"]).astype(float)
+            - ((factory <= 0) | (factory < safety))
+            - ((warehouse <= 0) | (warehouse < safety))
+            + (warehouse >= reorder_point)
+        )
+        s["score"] += step * (self.substep_units / REFERENCE_STEP_UNITS)
+
+    # Adaptive sub-stepping
+    def time_to_next_event(self, per_unit, reorder_point):
+        s = self.state
+        horizon = np.full(self.size, np.inf)
+        left = np.where(s["truck_wait_timer"] > 0, s["truck_wait_timer"], s["truck_travel_minutes_remaining"])
+        horizon = np.where(s["truck_en_route"] & (left > 0), np.minimum(horizon, left), horizon)
+
+        capacity = np.maximum(0.0, s["worker_capacity"])
+        distance = np.where(s["worker_direction"] == 1, 1.0 - s["worker_progress"], s["worker_progress"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            half_trip_units = np.where(per_unit > 0, (1.0 / (per_unit / capacity)) / 2.0, 0.5)
+        horizon = np.where((capacity > 0) & (distance > 0), np.minimum(horizon, distance * half_trip_units), horizon)
+
+        slack = s["factory_stock"] + s["warehouse_stock"] - np.maximum(s["supply_plan_daily"], reorder_point)
+        watch = ~s["truck_en_route"] & ~s["production_shutdown"] & (s["factory_stock"] > 0) & (per_unit > 0) & (slack > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(watch, np.minimum(horizon, slack / per_unit), horizon)
+
+    def next_substep_units(self, remaining, per_unit, reorder_point):
+        if not self.adaptive or self.time_units_per_step <= REFERENCE_STEP_UNITS:
+            return remaining
+        h = np.maximum(REFERENCE_STEP_UNITS, self.time_to_next_event(per_unit, reorder_point))
+        split = (remaining > REFERENCE_STEP_UNITS) & (h < remaining - REFERENCE_STEP_UNITS * 1e-6)
+        return np.where(split, h, remaining)
+
+    def substep(self, remaining):
+        """Play one sub-step of every run; returns the time each run has left in the tick."""
+        # production_target_per_time_unit only changes between sub-steps, so
+        # the requirement and reorder point hold for the whole sub-step
+        per_unit = self.production_requirement_per_time_unit()
+        reorder_point = self.compute_reorder_point(per_unit)
+        self.substep_units = self.next_substep_units(remaining, per_unit, reorder_point)
+        self.apply_production(per_unit)
+        self.apply_market_demand()
+        self.move_worker(per_unit)
+        self.handle_replenishment(reorder_point)
+        self.move_truck()
+        self.apply_scenario_effects()
+        self.update_score(reorder_point)
+        return remaining - self.substep_units
+
+    # Main tick
+    def tick(self):
+        self.sync_param_driven_state()
+        remaining = self.substep(np.full(self.size, self.time_units_per_step))
+        index = np.flatnonzero(remaining > 0)
+        if index.size:
+            # the runs an event split play the rest of the tick on their own and are written back as
+            # they finish it; the copies keep the writes off arrays shared with params
+            split = self.take(index)
+            remaining = remaining[index]
+            state = {field: values.copy() for field, values in self.state.items()}
+            while index.size:
+                split.update_planning_targets(split.state)
+                remaining = split.substep(remaining)
+                more = remaining > 0
+                if more.all():
+                    continue
+                done = ~more
+                for field, values in split.state.items():
+                    state[field][index[done]] = values[done]
+                keep = np.flatnonzero(more)
+                split, index, remaining = split.take(keep), index[keep], remaining[keep]
+            self.state = state
+        self.state["time_acc"] += self.time_units_per_step  # in-game clock
+        self.steps += 1
+
+    def run(self, steps):
+        for _ in range(int(steps)):
+            self.tick()
+        return self.state
+
+    def steps_for_days(self, days):
+        return int(np.ceil(max(0.0, days) / self.time_units_per_step))
+
+    def take(self, index):
+        """A new engine holding only the runs at ``index``, mid-run state included."""
+        engine = copy.copy(self)
+        engine.params = {field: values[index] for field, values in self.params.items()}
+        engine.state = {field: values[index] for field, values in self.state.items()}
+        engine.biased = self.biased[index]
+        engine.production_bias = self.production_bias[index]
+        engine.demand_per_time_unit = self.demand_per_time_unit[index]
+        engine.size = engine.biased.size
+        return engine
+
+    def run_days(self, days):
+        return self.run(self.steps_for_days(days))
+
+    def financial_snapshot(self):
+        s = self.state
+        supplier_outstanding = np.where(s["truck_en_route"], np.maximum(0.0, s["truck_delivery"]), 0.0)
+        accounts_payable = (
+            supplier_outstanding * SUPPLIER_UNIT_COST + np.maximum(0.0, s["warehouse_stock"]) * WAREHOUSE_UNIT_COST
+        )
+        accounts_receivable = (
+            np.maximum(0.0, s["finished_goods_stock"]) * FG_UNIT_PRICE
+            + np.maximum(0.0, self.params["market_demand"]) * MARKET_UNIT_PRICE
+        )
+        return {
+            "accounts_payable": accounts_payable,
+            "accounts_receivable": accounts_receivable,
+            "net_cash_flow": accounts_receivable - accounts_payable,
+        }
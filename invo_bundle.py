@@ -0,0 +1,278 @@
+# invo_bundle.py
+"""Static bundle for the game component.
+
+The sources live in ``invo_component/frontend`` (index.html, game.css,
+game.js). A build strips comments and indentation, names each asset after
+its content hash and writes them, a rewritten index.html and manifest.json
+to ``invo_component/build``, the directory ``declare_component`` serves.
+Streamlit sends component files other than HTML with
+``Cache-Control: public``, so browsers keep the hashed assets across reruns
+and sessions; only the small index.html is fetched again.
+
+    python invo_bundle.py          # rebuild invo_component/build
+    python invo_bundle.py --check  # exit 1 if the build is stale
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import warnings
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "invo_component")
+SOURCE_DIR = os.path.join(COMPONENT_DIR, "frontend")
+BUILD_DIR = os.path.join(COMPONENT_DIR, "build")
+MANIFEST_NAME = "manifest.json"
+
+# Bundled assets, in the order index.html references them
+ASSETS = ("game.css", "game.js")
+
+# Per build directory, the file mtimes ensure_bundle() last checked it at
+_checked = {}
+
+
+def _read(name):
+    with open(os.path.join(SOURCE_DIR, name), encoding="utf-8", newline="") as fh:
+        return fh.read()
+
+
+def content_hash(text, length=10):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
+
+
+def source_hash():
+    digest = hashlib.sha256()
+    for name in ("index.html",) + ASSETS:
+        digest.update(name.encode("utf-8"))
+        digest.update(_read(name).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Keywords after which a '/' starts a regex literal rather than a division
+_REGEX_KEYWORDS = frozenset(
+    ("return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else",
+     "yield", "await")
+)
+
+
+def _regex_allowed(out):
+    """Whether a '/' after the text in ``out`` opens a regex literal.
+
+    A '/' divides after an operand (a name, number, string, ')', ']' or '}') and
+    starts a regex anywhere else, e.g. after '(', ',', '=' or ``return``.
+    """
+    tail = "".join(out[-64:]).rstrip()
+    if not tail:
+        return True
+    last = tail[-1]
+    if last.isalnum() or last in "_$":
+        start = len(tail)
+        while start and (tail[start - 1].isalnum() or tail[start - 1] in "_$"):
+            start -= 1
+        return tail[start:] in _REGEX_KEYWORDS
+    return last not in ")]}'\"`"
+
+
+def _skip_regex(source, i):
+    """Index just past the regex literal opening at ``source[i]``, flags included."""
+    n = len(source)
+    end = i + 1
+    in_class = False
+    while end < n and source[end] not in "\r\n":
+        ch = source[end]
+        if ch == "\\":
+            end += 2
+            continue
+        if ch == "[":
+            in_class = True
+        elif ch == "]":
+            in_class = False
+        elif ch == "/" and not in_class:
+            end += 1
+            while end < n and (source[end].isalnum() or source[end] in "_$"):
+                end += 1
+            return end
+        end += 1
+    raise ValueError(f"unterminated regex literal at offset {i}")
+
+
+def _strip_js_comments(source):
+    """Drop // and /* */ comments, leaving strings, template literals and regex literals alone.
+
+    A '/' that is not a comment is a regex literal where an operand is
+    expected (see ``_regex_allowed``) and a division otherwise.
+    """
+    out = []
+    i, n = 0, len(source)
+    # one entry per open template literal: depth of ${ } braces inside it
+    templates = []
+    while i < n:
+        ch = source[i]
+        if templates and templates[-1] == 0:
+            # inside template literal text
+            if ch == "\\":
+                out.append(source[i:i + 2])
+                i += 2
+            elif ch == "`":
+                templates.pop()
+                out.append(ch)
+                i += 1
+            elif source.startswith("${", i):
+                templates[-1] = 1
+                out.append("${")
+                i += 2
+            else:
+                out.append(ch)
+                i += 1
+            continue
+        if ch in "'\"":
+            end = i + 1
+            while end < n and source[end] != ch:
+                end += 2 if source[end] == "\\" else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif ch == "`":
+            templates.append(0)
+            out.append(ch)
+            i += 1
+        elif source.startswith("//", i):
+            while i < n and source[i] not in "\r\n":
+                i += 1
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+        elif ch == "/" and _regex_allowed(out):
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+        else:
+            if templates and ch == "{":
+                templates[-1] += 1
+            elif templates and ch == "}":
+                templates[-1] -= 1
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def minify_js(source):
+    # line breaks are kept so automatic semicolon insertion still sees them
+    lines = (line.strip() for line in _strip_js_comments(source).splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def minify_css(source):
+    out = []
+    i = 0
+    while True:
+        start = source.find("/*", i)
+        if start < 0:
+            out.append(source[i:])
+            break
+        out.append(source[i:start])
+        end = source.find("*/", start + 2)
+        i = len(source) if end < 0 else end + 2
+    text = " ".join("".join(out).split())
+    for token in ("{", "}", ";", ","):
+        text = text.replace(f" {token}", token).replace(f"{token} ", token)
+    return text.replace(";}", "}") + "\n"
+
+
+def minify_html(source):
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def build(out_dir=BUILD_DIR):
+    """Write the hashed bundle and return its manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    minifiers = {".css": minify_css, ".js": minify_js}
+    files = {}
+    for name in ASSETS:
+        stem, ext = os.path.splitext(name)
+        text = minifiers[ext](_read(name))
+        files[name] = f"{stem}.{content_hash(text)}{ext}"
+        with open(os.path.join(out_dir, files[name]), "w", encoding="utf-8", newline="\n") as fh:
+            fh.write(text)
+
+    index = _read("index.html")
+    for name, hashed in files.items():
+        index = index.replace(f'"{name}"', f'"{hashed}"')
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8", newline="\n") as fh:
+        fh.write(minify_html(index))
+
+    manifest = {"source_hash": source_hash(), "files": files}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8", newline="\n") as fh:
+        json.dump(manifest, fh, indent=2)
+        fh.write("\n")
+
+    # drop assets from earlier builds
+    keep = set(files.values()) | {"index.html", MANIFEST_NAME}
+    for entry in os.listdir(out_dir):
+        if entry not in keep and entry.endswith(tuple(os.path.splitext(name)[1] for name in ASSETS)):
+            os.remove(os.path.join(out_dir, entry))
+    return manifest
+
+
+def read_manifest(out_dir=BUILD_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(out_dir=BUILD_DIR):
+    manifest = read_manifest(out_dir)
+    return manifest is None or manifest.get("source_hash") != source_hash()
+
+
+def _mtimes(out_dir):
+    paths = [os.path.join(SOURCE_DIR, name) for name in ("index.html",) + ASSETS]
+    stamps = []
+    for path in paths + [os.path.join(out_dir, MANIFEST_NAME)]:
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def ensure_bundle(out_dir=BUILD_DIR):
+    """Rebuild if the sources changed since the last build; returns ``out_dir``.
+
+    On a read-only checkout the existing build is used as is. The app calls
+    this on every rerun, so the sources are only read and hashed again once
+    their mtimes or the manifest's change.
+    """
+    mtimes = _mtimes(out_dir)
+    if _checked.get(out_dir) == mtimes:
+        return out_dir
+    if is_stale(out_dir):
+        try:
+            build(out_dir)
+        except OSError as err:
+            warnings.warn(f"Could not rebuild the game bundle, serving the existing one: {err}")
+    _checked[out_dir] = _mtimes(out_dir)
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the game component's hashed static bundle.")
+    parser.add_argument("--check", action="store_true", help="only report whether the build is stale")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        stale = is_stale()
+        print("stale" if stale else "up to date")
+        return 1 if stale else 0
+
+    manifest = build()
+    for name, hashed in manifest["files"].items():
+        size = os.path.getsize(os.path.join(BUILD_DIR, hashed))
+        print(f"{name} -> {hashed} ({size / 1024:.1f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
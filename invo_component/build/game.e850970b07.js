@@ -0,0 +1,3054 @@
+const params = {};
+let started = false;
+const SIM_TIME_UNITS_PER_DAY = 1.0;
+const base_interval_ms = 120;
+const canvas = document.getElementById('game');
+let ctx = canvas.getContext('2d');
+const startButton = document.getElementById('control-start');
+const resetButton = document.getElementById('control-reset');
+const fastForwardInput = document.getElementById('control-ff-day');
+const fastForwardButton = document.getElementById('control-ff');
+const fastForwardStatus = document.getElementById('ff-status');
+const MAX_FAST_FORWARD_DAY = 3650;
+function updateControlButtons(){
+if(startButton){
+if(started){
+startButton.textContent = '⏸ Pause';
+startButton.setAttribute('data-state', 'pause');
+} else {
+startButton.textContent = '▶ Start';
+startButton.setAttribute('data-state', 'start');
+}
+}
+}
+function setRunning(running){
+if(running) showLive();
+started = running;
+postToCore({type: 'running', running: started});
+updateControlButtons();
+}
+function resetGame(){
+started = false;
+fastForwarding = false;
+moneyParticles.count = 0;
+seedParticles();
+render_prev = null;
+setFastForwardStatus('');
+showLive();
+postToCore({type: 'reset'});
+updateControlButtons();
+}
+if(startButton){
+startButton.addEventListener('click', () => {
+setRunning(!started);
+reportControls();
+});
+}
+if(resetButton){
+resetButton.addEventListener('click', () => {
+resetGame();
+reportControls();
+});
+}
+let fastForwarding = false;
+let fastForwardTarget = 0;
+let handled_fast_forward_token = 0;
+function setFastForwardStatus(text){
+if(fastForwardStatus) fastForwardStatus.textContent = text;
+}
+function requestFastForward(day){
+const target = clamp(Math.round(Number(day) || 0), 1, MAX_FAST_FORWARD_DAY);
+showLive();
+fastForwarding = true;
+fastForwardTarget = target;
+setFastForwardStatus(`⏩ Simulating to day ${target}…`);
+postToCore({type: 'fast_forward', day: target});
+}
+if(fastForwardButton){
+fastForwardButton.addEventListener('click', () => {
+requestFastForward(fastForwardInput ? fastForwardInput.value : params.fast_forward_day);
+});
+}
+updateControlButtons();
+function clamp(v,a,b){ return Math.max(a, Math.min(b, v)); }
+function lerp(a, b, t){ return a + (b - a) * t; }
+function formatTimeUnits(units){
+const days = Math.max(0, units) / SIM_TIME_UNITS_PER_DAY;
+if(days >= 1) return `${days.toFixed(1)} d`;
+return `${(days * 24).toFixed(1)} h`;
+}
+const numberFormatter = new Intl.NumberFormat('en-US');
+function scoreLevel(score){
+if(score >= 0) return 'good';
+if(score >= -500) return 'warning';
+return 'alert';
+}
+function inventoryLevel(stock, safety=null, high=null){
+if(stock <= 0) return 'alert';
+if(safety != null){
+if(stock <= Math.max(5, safety * 0.25)) return 'alert';
+if(stock <= safety) return 'warning';
+}
+if(high != null && stock >= high) return 'warning';
+return 'good';
+}
+function backlogLevel(backlog){
+if(backlog <= 0) return 'good';
+const warningThreshold = Math.max(40, (params.market_demand || 0) * 1.5);
+const alertThreshold = Math.max(80, (params.market_demand || 0) * 3.0);
+if(backlog >= alertThreshold) return 'alert';
+if(backlog >= warningThreshold) return 'warning';
+return 'warning';
+}
+function cashFlowLevel(net){
+if(net >= 0) return 'good';
+if(net >= -200) return 'warning';
+return 'alert';
+}
+function payableLevel(payable, receivable){
+if(payable <= receivable * 0.75) return 'good';
+if(payable <= receivable) return 'warning';
+return 'alert';
+}
+function receivableLevel(receivable){
+if(receivable <= 0) return 'warning';
+return 'good';
+}
+const hudMetrics = new Map();
+let hudFlushId = null;
+function hudMetric(cardId, valueId){
+let metric = hudMetrics.get(cardId);
+if(!metric){
+metric = {
+card: document.getElementById(cardId),
+el: document.getElementById(valueId),
+key: null,
+text: '',
+level: null,
+shownText: null,
+shownLevel: null,
+};
+hudMetrics.set(cardId, metric);
+}
+return metric;
+}
+function setMetric(cardId, valueId, label, value, level='good', unitSuffix=''){
+const metric = hudMetric(cardId, valueId);
+const numeric = typeof value === 'number' && isFinite(value);
+const key = numeric ? Math.round(value) : value;
+if(key === metric.key && level === metric.level) return;
+metric.key = key;
+metric.level = level;
+if(numeric){
+metric.text = `${label}: ${numberFormatter.format(key)}${unitSuffix}`;
+} else {
+const hasValue = value !== undefined && value !== null && String(value).length > 0;
+const body = hasValue ? String(value) : '0';
+metric.text = `${label}: ${body}`;
+}
+if(hudFlushId === null) hudFlushId = requestAnimationFrame(flushHud);
+}
+function flushHud(){
+if(hudFlushId !== null){
+cancelAnimationFrame(hudFlushId);
+hudFlushId = null;
+}
+for(const metric of hudMetrics.values()){
+if(metric.card && metric.level !== metric.shownLevel){
+metric.card.setAttribute('data-level', metric.level);
+metric.shownLevel = metric.level;
+}
+if(metric.el && metric.text !== metric.shownText){
+metric.el.textContent = metric.text;
+metric.shownText = metric.text;
+}
+}
+}
+const STATE_WRAPPER_KEY = 'shalabyInventoryGame';
+function simCore(host){
+const SIM_TIME_UNITS_PER_DAY = 1.0;
+const TRUCK_LOADING_PORTION = 0.25;
+const SUPPLIER_UNIT_COST = 1.0;
+const WAREHOUSE_UNIT_COST = 1.1;
+const FG_UNIT_PRICE = 1.6;
+const MARKET_UNIT_PRICE = 1.9;
+const MAX_CATCH_UP_MS = 20;
+const PUMP_INTERVAL_MS = 30;
+const FAST_FORWARD_SLICE_MS = 50;
+let params = {};
+let state = null;
+let started = false;
+let base_interval_ms = 120;
+let snapshotFields = [];
+let spareBuffers = [];
+let render_prev = null;
+let historyFields = [];
+let historyCapacity = 0;
+let historyRows = null;
+let historyStart = 0;
+let historyCount = 0;
+let historyCleared = true;
+let spareHistoryBuffers = [];
+const EVENT_TRUCK_DISPATCH = 1;
+const EVENT_TRUCK_DELIVERY = 2;
+const EVENT_SHUTDOWN_START = 4;
+const EVENT_SHUTDOWN_END = 8;
+const EVENT_SUPERMARKET_BURST = 16;
+let telemetryFields = [];
+let telemetryChunkRows = 0;
+let telemetryRows = null;
+let telemetryCount = 0;
+let spareTelemetryBuffers = [];
+let stepCount = 0;
+let runCount = 0;
+let stepEvents = 0;
+const PROFILE_PHASES = [
+'sync', 'planning', 'production', 'demand', 'worker', 'replenishment', 'truck', 'scenario', 'score',
+'chilled', 'record',
+];
+let profiling = false;
+let profileTotals = null;
+let profileSteps = 0;
+let profileMark = 0;
+const JOURNAL_CHECKPOINT_SUBSTEPS = 20000;
+let controlParams = new Set();
+let replay = null;
+let replayTimer = null;
+let substepsSinceStart = 0;
+let timelineFields = [];
+let timelineInterval = 64;
+let timelineBudget = 0;
+let timelineSegments = [];
+let timelineBytes = 0;
+let timelineThinned = 0;
+let timelineStride = 1;
+let timelineSeq = 0;
+let timelineSplit = true;
+let timelineRow = null;
+let timelineLast = null;
+let timelineOffsets = null;
+let timelineIndices = null;
+let timelineValues = null;
+let timelineDeltaCount = 0;
+let timelineSnapshotIndex = [];
+const audioEnabled = false;
+function playEventSound(kind){}
+function clamp(v,a,b){ return Math.max(a, Math.min(b, v)); }
+function safeNumber(value, fallback=0){
+if(value === null || value === undefined) return fallback;
+const num = Number(value);
+return Number.isFinite(num) ? num : fallback;
+}
+function sanitizeStateNumbers(targetState){
+if(!targetState) return;
+const numericFields = [
+'factory_stock',
+'warehouse_stock',
+'safety_stock',
+'fg_safety_stock',
+'finished_goods_stock',
+'high_stock_threshold',
+'fg_high_stock_threshold',
+'worker_capacity',
+'worker_progress',
+'worker_load',
+'backlog',
+'truck_progress',
+'truck_delivery',
+'truck_wait_timer',
+'truck_travel_minutes_total',
+'truck_travel_minutes_remaining',
+'production_plan_daily',
+'supply_plan_daily',
+'production_target_per_time_unit',
+'chilled_truck_progress',
+'chilled_truck_wait',
+'score',
+'time_acc',
+'demand_factor',
+'demand_day',
+'truck_dispatches',
+];
+for(const key of numericFields){
+const value = targetState[key];
+targetState[key] = safeNumber(value, 0.0);
+}
+targetState.worker_progress = clamp(targetState.worker_progress || 0, 0.0, 1.0);
+targetState.truck_progress = clamp(targetState.truck_progress || 0, 0.0, 1.0);
+targetState.chilled_truck_progress = clamp(targetState.chilled_truck_progress || 0, 0.0, 1.0);
+targetState.worker_direction = targetState.worker_direction >= 0 ? 1 : -1;
+targetState.truck_en_route = Boolean(targetState.truck_en_route);
+targetState.production_shutdown = Boolean(targetState.production_shutdown);
+targetState.supplier_unlimited = targetState.supplier_unlimited !== false;
+}
+function createInitialState(){
+const baseState = {
+factory_stock: 240.0,
+warehouse_stock: 520.0,
+supplier_stock: null,
+safety_stock: params.safety_stock,
+fg_safety_stock: params.fg_safety_stock,
+high_stock_threshold: 800.0,
+fg_high_stock_threshold: 600.0,
+worker_capacity: Math.max(1, params.factory_batch),
+worker_progress: 0.0,
+worker_direction: 1,
+worker_load: 0.0,
+finished_goods_stock: Math.max(0, params.initial_fg_stock || 0),
+backlog: 0.0,
+truck_en_route: false,
+truck_progress: 0.0,
+truck_delivery: 0.0,
+truck_wait_timer: 0.0,
+truck_travel_minutes_total: 0.0,
+truck_travel_minutes_remaining: 0.0,
+production_shutdown: false,
+score: 0,
+time_acc: 0,
+chilled_truck_progress: 0.0,
+chilled_truck_direction: 1,
+chilled_truck_wait: 0.0,
+pending_supermarket_burst: false,
+production_plan_daily: 0.0,
+supply_plan_daily: 0.0,
+production_target_per_time_unit: 0.0,
+supplier_unlimited: true,
+demand_factor: 1.0,
+demand_day: -1,
+truck_dispatches: 0,
+};
+sanitizeStateNumbers(baseState);
+updatePlanningTargets(baseState);
+return baseState;
+}
+let paramsVersion = 0;
+let syncedParamsVersion = -1;
+const derived = {
+planned_version: -1,
+planned_fg: 0.0,
+planned_backlog: 0.0,
+demand_per_unit: 0.0,
+production_per_unit: 0.0,
+reorder_point: 0.0,
+stochastic: false,
+seed: 0,
+demand_distribution: 'Normal',
+demand_cv: 0.0,
+lead_time_distribution: 'Normal',
+lead_time_cv: 0.0,
+};
+const RANDOM_BLOCK_SIZE = 256;
+const STREAM_DEMAND = 1;
+const STREAM_LEAD_TIME = 2;
+const SQRT3 = Math.sqrt(3);
+const randomBlocks = {};
+function mulberry32(seed){
+let a = seed >>> 0;
+return () => {
+a = (a + 0x6D2B79F5) >>> 0;
+let t = a;
+t = Math.imul(t ^ (t >>> 15), t | 1);
+t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+}
+function blockSeed(seed, stream, block){
+let h = (seed ^ Math.imul(stream, 0x9E3779B1) ^ Math.imul(block + 1, 0x85EBCA77)) >>> 0;
+h ^= h >>> 16;
+h = Math.imul(h, 0x85EBCA6B);
+h ^= h >>> 13;
+h = Math.imul(h, 0xC2B2AE35);
+h ^= h >>> 16;
+return h >>> 0;
+}
+function fillVariates(values, seed, distribution){
+const next = mulberry32(seed);
+for(let idx=0; idx<values.length; idx++){
+if(distribution === 'Uniform'){
+values[idx] = SQRT3 * (2 * next() - 1);
+} else {
+let sum = 0;
+for(let k=0; k<12; k++) sum += next();
+values[idx] = sum - 6;
+}
+}
+}
+function randomFactor(stream, index, distribution, cv){
+const block = Math.floor(index / RANDOM_BLOCK_SIZE);
+let cache = randomBlocks[stream];
+if(!cache){
+cache = {seed: -1, block: -1, distribution: '', values: new Float64Array(RANDOM_BLOCK_SIZE)};
+randomBlocks[stream] = cache;
+}
+if(cache.seed !== derived.seed || cache.block !== block || cache.distribution !== distribution){
+fillVariates(cache.values, blockSeed(derived.seed, stream, block), distribution);
+cache.seed = derived.seed;
+cache.block = block;
+cache.distribution = distribution;
+}
+return Math.max(0, 1 + cv * cache.values[index - block * RANDOM_BLOCK_SIZE]);
+}
+function update_demand_draw(){
+const day = Math.floor(substep_start / SIM_TIME_UNITS_PER_DAY + 1e-9);
+if(day === state.demand_day) return;
+state.demand_day = day;
+state.demand_factor = randomFactor(STREAM_DEMAND, day, derived.demand_distribution, derived.demand_cv);
+}
+function invalidateParams(){
+paramsVersion += 1;
+}
+function syncParamDrivenState(){
+if(syncedParamsVersion === paramsVersion) return;
+syncedParamsVersion = paramsVersion;
+state.safety_stock = safeNumber(params.safety_stock, 0);
+state.fg_safety_stock = safeNumber(params.fg_safety_stock, 0);
+state.worker_capacity = Math.max(1, safeNumber(params.factory_batch, 1));
+state.fg_high_stock_threshold = Math.max(
+state.fg_safety_stock * 2.0,
+(params.initial_fg_stock || 0) + Math.max(0, params.market_demand) * 2.0
+);
+let demand_per_unit = Math.max(0, params.market_demand) / Math.max(1.0, SIM_TIME_UNITS_PER_DAY);
+if (params.scenario === "Biased forecast") demand_per_unit *= 1.3;
+derived.demand_per_unit = demand_per_unit;
+derived.stochastic = Boolean(params.stochastic);
+derived.seed = safeNumber(params.seed, 0) >>> 0;
+derived.demand_distribution = params.demand_distribution || 'Normal';
+derived.demand_cv = Math.max(0, safeNumber(params.demand_cv, 0));
+derived.lead_time_distribution = params.lead_time_distribution || 'Normal';
+derived.lead_time_cv = Math.max(0, safeNumber(params.lead_time_cv, 0));
+state.demand_day = -1;
+if(!derived.stochastic) state.demand_factor = 1.0;
+derived.planned_version = -1;
+updatePlanningTargets(state);
+}
+function updatePlanningTargets(targetState){
+if(!targetState) return;
+const live = targetState === state;
+if(live && derived.planned_version === paramsVersion
+&& derived.planned_fg === state.finished_goods_stock && derived.planned_backlog === state.backlog) return;
+const demand = Math.max(0, safeNumber(params.market_demand, 0));
+const initialFG = Math.max(0, safeNumber(params.initial_fg_stock, 0));
+const fgSafety = Math.max(0, safeNumber(targetState.fg_safety_stock, 0));
+const rawSafety = Math.max(0, safeNumber(targetState.safety_stock, 0));
+const currentFG = Math.max(0, safeNumber(targetState.finished_goods_stock, initialFG));
+const backlog = Math.max(0, safeNumber(targetState.backlog, 0));
+const deficit = Math.max(0, fgSafety - currentFG);
+const productionPlan = Math.max(0, safeNumber(demand + deficit + backlog, 0));
+const supplyPlan = Math.max(0, safeNumber(productionPlan + rawSafety, rawSafety));
+targetState.production_plan_daily = productionPlan;
+targetState.supply_plan_daily = supplyPlan;
+targetState.production_target_per_time_unit = safeNumber(productionPlan / Math.max(1.0, SIM_TIME_UNITS_PER_DAY), 0);
+if(!live) return;
+derived.planned_version = paramsVersion;
+derived.planned_fg = state.finished_goods_stock;
+derived.planned_backlog = state.backlog;
+let per_unit = Math.max(0, state.production_target_per_time_unit || 0);
+if (params.scenario === "Biased forecast") per_unit *= 1.2;
+derived.production_per_unit = per_unit;
+const lead_time_units = Math.max(0.0, params.lead_time) * SIM_TIME_UNITS_PER_DAY;
+derived.reorder_point = Math.max(0.0, state.safety_stock + per_unit * lead_time_units);
+}
+const speedFactorMap = {
+minute: 1.0,
+"10-second": 6.0,
+second: 60.0,
+"turbo-600x": 600.0,
+"turbo-6000x": 6000.0,
+};
+function resolveSpeedFactor(unit){
+return speedFactorMap[unit] || speedFactorMap.minute;
+}
+let time_units_per_step = 0.0;
+let substep_units = 0.0;
+let substep_start = 0.0;
+function production_requirement_per_time_unit(){
+return derived.production_per_unit;
+}
+function market_demand_per_time_unit(){
+return derived.demand_per_unit * state.demand_factor;
+}
+function compute_reorder_point(){
+return derived.reorder_point;
+}
+function apply_production(){
+if(state.production_shutdown) return;
+const per_unit = production_requirement_per_time_unit();
+const per_step = per_unit * substep_units;
+if(per_step <= 0) return;
+const available_raw = Math.max(0, state.factory_stock);
+const actual = Math.min(per_step, available_raw);
+if(actual <= 0) return;
+state.factory_stock = Math.max(0, state.factory_stock - actual);
+state.finished_goods_stock += actual;
+if(state.backlog > 0 && state.finished_goods_stock > 0){
+const fulfill = Math.min(state.finished_goods_stock, state.backlog);
+state.finished_goods_stock -= fulfill;
+state.backlog -= fulfill;
+}
+}
+function apply_market_demand(){
+const prevBacklog = state.backlog;
+const per_unit = market_demand_per_time_unit();
+const per_step = per_unit * substep_units;
+if(per_step <= 0) return;
+if(state.finished_goods_stock >= per_step){
+state.finished_goods_stock -= per_step;
+} else {
+const shortfall = per_step - state.finished_goods_stock;
+state.finished_goods_stock = 0.0;
+state.backlog += shortfall;
+if(audioEnabled && state.backlog > prevBacklog){
+playEventSound('backlog');
+}
+}
+}
+function compute_worker_speed(){
+const per_unit = production_requirement_per_time_unit();
+const capacity = Math.max(0, state.worker_capacity);
+if(capacity <= 0) return 0;
+let half_trip_units = null;
+if(per_unit > 0){
+const trips_per_unit = per_unit / capacity;
+if(trips_per_unit > 0){
+const cycle_units = 1.0 / trips_per_unit;
+half_trip_units = Math.max(substep_units, cycle_units / 2.0);
+}
+} else {
+if(state.worker_direction === -1 && state.worker_progress > 0) half_trip_units = 0.5;
+else if(state.worker_direction === 1 && state.worker_progress < 1) half_trip_units = 0.5;
+}
+if(half_trip_units === null || !isFinite(half_trip_units) || half_trip_units <= 0) return 0;
+const progress = substep_units / half_trip_units;
+return clamp(progress, 0, 1);
+}
+function move_worker(){
+const speed = compute_worker_speed();
+if(state.worker_direction===1){
+if(state.worker_progress < 1.0) state.worker_progress = Math.min(1.0, state.worker_progress + speed);
+if(Math.abs(state.worker_progress-1.0) < 1e-3){
+if(state.warehouse_stock>0){
+const take = Math.min(state.worker_capacity, state.warehouse_stock);
+state.worker_load = take;
+state.warehouse_stock -= take;
+state.worker_direction = -1;
+}else{
+state.worker_load = 0.0;
+state.worker_direction = -1;
+}
+}
+} else {
+if(state.worker_progress > 0.0) state.worker_progress = Math.max(0.0, state.worker_progress - speed);
+if(Math.abs(state.worker_progress-0.0) < 1e-3){
+if(state.worker_load>0){
+state.factory_stock += state.worker_load;
+state.worker_load = 0.0;
+}
+state.worker_direction = 1;
+}
+}
+}
+function handle_replenishment(){
+if(state.truck_en_route) return;
+const rawOnHand = state.factory_stock + state.warehouse_stock;
+const targetRaw = Math.max(0, state.supply_plan_daily || 0);
+const reorder_point = compute_reorder_point();
+if(rawOnHand > Math.max(targetRaw, reorder_point)) return;
+state.truck_en_route = true;
+state.truck_progress = 0.0;
+stepEvents |= EVENT_TRUCK_DISPATCH;
+let lead_time_days = Math.max(0.1, params.lead_time);
+if(derived.stochastic){
+const factor = randomFactor(STREAM_LEAD_TIME, state.truck_dispatches, derived.lead_time_distribution, derived.lead_time_cv);
+lead_time_days = Math.max(0.1, params.lead_time * factor);
+}
+state.truck_dispatches += 1;
+const lead_time_units = lead_time_days * SIM_TIME_UNITS_PER_DAY;
+const loading_units = lead_time_units * TRUCK_LOADING_PORTION;
+const travel_units = Math.max(substep_units, lead_time_units - loading_units);
+state.truck_wait_timer = loading_units;
+state.truck_travel_minutes_total = travel_units;
+state.truck_travel_minutes_remaining = travel_units;
+const needed = Math.max(0, targetRaw - rawOnHand);
+let request_amount = Math.max(params.moq, needed);
+if(request_amount <= 0) request_amount = Math.max(params.moq, targetRaw);
+state.truck_delivery = request_amount;
+}
+function move_truck(){
+if(!state.truck_en_route) return;
+let travel_dt = substep_units;
+if(state.truck_wait_timer > 0){
+const loading = Math.min(state.truck_wait_timer, travel_dt);
+state.truck_wait_timer = Math.max(0.0, state.truck_wait_timer - loading);
+travel_dt -= loading;
+if(state.truck_wait_timer > 0 || travel_dt <= 0) return;
+}
+if(state.truck_travel_minutes_total <= 0){
+complete_truck();
+return;
+}
+state.truck_travel_minutes_remaining = Math.max(0.0, state.truck_travel_minutes_remaining - travel_dt);
+const prog = travel_dt / Math.max(1e-6, state.truck_travel_minutes_total);
+state.truck_progress = Math.min(1.0, state.truck_progress + prog);
+if(state.truck_travel_minutes_remaining <= 0.0 || Math.abs(state.truck_progress-1.0)<1e-3){
+complete_truck();
+}
+}
+function complete_truck(){
+if(state.truck_delivery > 0) state.warehouse_stock += state.truck_delivery;
+state.truck_en_route = false; state.truck_progress = 0.0; state.truck_delivery = 0.0;
+state.truck_wait_timer = 0.0; state.truck_travel_minutes_total = 0.0; state.truck_travel_minutes_remaining = 0.0;
+stepEvents |= EVENT_TRUCK_DELIVERY;
+playEventSound('delivery');
+}
+function move_chilled_truck(){
+const baseSpeed = clamp(time_units_per_step / 6.0, 0.01, 0.06);
+if(state.chilled_truck_wait > 0){
+state.chilled_truck_wait = Math.max(0.0, state.chilled_truck_wait - time_units_per_step);
+return;
+}
+state.chilled_truck_progress = clamp(
+state.chilled_truck_progress + baseSpeed * state.chilled_truck_direction,
+0.0,
+1.0
+);
+if(state.chilled_truck_direction === 1 && state.chilled_truck_progress >= 1.0){
+state.chilled_truck_progress = 1.0;
+state.chilled_truck_direction = -1;
+state.chilled_truck_wait = 0.4;
+state.pending_supermarket_burst = true;
+stepEvents |= EVENT_SUPERMARKET_BURST;
+} else if(state.chilled_truck_direction === -1 && state.chilled_truck_progress <= 0.0){
+state.chilled_truck_progress = 0.0;
+state.chilled_truck_direction = 1;
+state.chilled_truck_wait = 0.3;
+}
+}
+function apply_scenario_effects(){
+if(params.scenario === "Biased forecast"){
+if(state.factory_stock < Math.max(40.0, state.safety_stock*0.5)) state.production_shutdown = true;
+if(state.production_shutdown && state.factory_stock > state.safety_stock + 60) state.production_shutdown = false;
+} else {
+state.production_shutdown = false;
+}
+}
+function update_score(weight=1.0){
+let step = 0;
+if(!state.production_shutdown) step += 1;
+if(state.factory_stock <= 0) step -=1;
+else if(state.factory_stock < state.safety_stock) step -=1;
+if(state.warehouse_stock <= 0) step -=1;
+else if(state.warehouse_stock < state.safety_stock) step -=1;
+if(state.warehouse_stock >= compute_reorder_point()) step +=1;
+state.score += step * weight;
+}
+function computeFinancialSnapshot(){
+const supplierOutstanding = Math.max(0, safeNumber(state.truck_en_route ? state.truck_delivery : 0, 0));
+const warehouseStock = Math.max(0, safeNumber(state.warehouse_stock, 0));
+const finishedGoods = Math.max(0, safeNumber(state.finished_goods_stock, 0));
+const dailyDemand = Math.max(0, safeNumber(params.market_demand, 0));
+const supplierValue = supplierOutstanding * SUPPLIER_UNIT_COST;
+const warehouseValue = warehouseStock * WAREHOUSE_UNIT_COST;
+const finishedGoodsValue = finishedGoods * FG_UNIT_PRICE;
+const demandValue = dailyDemand * MARKET_UNIT_PRICE;
+const accountsPayable = supplierValue + warehouseValue;
+const accountsReceivable = finishedGoodsValue + demandValue;
+const netCashFlow = accountsReceivable - accountsPayable;
+return {
+accountsPayable,
+accountsReceivable,
+netCashFlow,
+};
+}
+function captureRenderState(){
+return {
+prev_worker_progress: state.worker_progress,
+prev_truck_en_route: state.truck_en_route,
+prev_truck_progress: state.truck_en_route && state.truck_wait_timer <= 0 ? state.truck_progress : 0.0,
+prev_chilled_truck_progress: state.chilled_truck_progress,
+};
+}
+function reference_step_units(){
+return (base_interval_ms / 60000.0) * speedFactorMap.minute;
+}
+function time_to_next_event(){
+let horizon = Infinity;
+if(state.truck_en_route){
+const left = state.truck_wait_timer > 0 ? state.truck_wait_timer : state.truck_travel_minutes_remaining;
+if(left > 0) horizon = Math.min(horizon, left);
+}
+const per_unit = production_requirement_per_time_unit();
+const capacity = Math.max(0, state.worker_capacity);
+const distance = state.worker_direction === 1 ? 1.0 - state.worker_progress : state.worker_progress;
+if(capacity > 0 && distance > 0){
+const half_trip_units = per_unit > 0 ? (1.0 / (per_unit / capacity)) / 2.0 : 0.5;
+horizon = Math.min(horizon, distance * half_trip_units);
+}
+if(!state.truck_en_route && !state.production_shutdown && state.factory_stock > 0 && per_unit > 0){
+const trigger = Math.max(state.supply_plan_daily || 0, compute_reorder_point());
+const slack = state.factory_stock + state.warehouse_stock - trigger;
+if(slack > 0) horizon = Math.min(horizon, slack / per_unit);
+}
+if(derived.stochastic){
+const next_day = (Math.floor(substep_start / SIM_TIME_UNITS_PER_DAY + 1e-9) + 1) * SIM_TIME_UNITS_PER_DAY;
+horizon = Math.min(horizon, next_day - substep_start);
+}
+return horizon;
+}
+function next_substep_units(remaining){
+const reference = reference_step_units();
+if(remaining <= reference) return remaining;
+const h = Math.max(reference, time_to_next_event());
+return h >= remaining - reference * 1e-6 ? remaining : h;
+}
+function tick(){
+if(profiling) profileMark = nowMs();
+syncParamDrivenState();
+if(profiling) profileLap('sync');
+stepEvents = 0;
+const wasShutdown = state.production_shutdown;
+const reference = reference_step_units();
+let remaining = time_units_per_step;
+let elapsed = 0.0;
+while(remaining > 0){
+updatePlanningTargets(state);
+substep_start = state.time_acc + elapsed;
+if(derived.stochastic) update_demand_draw();
+substep_units = next_substep_units(remaining);
+remaining -= substep_units;
+elapsed += substep_units;
+substepsSinceStart += 1;
+if(profiling) profileLap('planning');
+apply_production();
+if(profiling) profileLap('production');
+apply_market_demand();
+if(profiling) profileLap('demand');
+move_worker();
+if(profiling) profileLap('worker');
+handle_replenishment();
+if(profiling) profileLap('replenishment');
+move_truck();
+if(profiling) profileLap('truck');
+apply_scenario_effects();
+if(profiling) profileLap('scenario');
+update_score(substep_units / reference);
+if(profiling) profileLap('score');
+}
+move_chilled_truck();
+if(profiling) profileLap('chilled');
+state.time_acc += time_units_per_step;
+if(state.production_shutdown !== wasShutdown){
+stepEvents |= state.production_shutdown ? EVENT_SHUTDOWN_START : EVENT_SHUTDOWN_END;
+}
+stepCount += 1;
+const financials = computeFinancialSnapshot();
+recordHistory(financials);
+recordTelemetry();
+recordTimeline(financials);
+if(substepsSinceStart >= JOURNAL_CHECKPOINT_SUBSTEPS && !replay) journalCheckpoint();
+if(profiling){
+profileLap('record');
+profileSteps += 1;
+}
+}
+function profileLap(phase){
+const now = nowMs();
+profileTotals[phase] += now - profileMark;
+profileMark = now;
+}
+function resetProfile(){
+profileTotals = {};
+for(const phase of PROFILE_PHASES) profileTotals[phase] = 0;
+profileSteps = 0;
+}
+function takeProfile(){
+if(!profiling) return null;
+const profile = {steps: profileSteps, phase_ms: profileTotals};
+resetProfile();
+return profile;
+}
+function recordHistory(financials){
+if(historyCapacity <= 0) return;
+const width = historyFields.length;
+if(!historyRows){
+const spare = spareHistoryBuffers.pop();
+historyRows = new Float32Array(spare || new ArrayBuffer(historyCapacity * width * 4));
+}
+let row = historyStart + historyCount;
+if(row >= historyCapacity) row -= historyCapacity;
+if(historyCount < historyCapacity) historyCount += 1;
+else historyStart = historyStart + 1 === historyCapacity ? 0 : historyStart + 1;
+const offset = row * width;
+for(let idx=0; idx<width; idx++){
+const key = historyFields[idx];
+historyRows[offset + idx] = safeNumber(key in financials ? financials[key] : state[key], 0);
+}
+}
+function recordTelemetry(){
+if(telemetryChunkRows <= 0 || replay) return;
+const width = telemetryFields.length;
+if(!telemetryRows){
+const spare = spareTelemetryBuffers.pop();
+telemetryRows = new Float64Array(spare || new ArrayBuffer(telemetryChunkRows * width * 8));
+}
+const offset = telemetryCount * width;
+for(let idx=0; idx<width; idx++){
+const key = telemetryFields[idx];
+let value;
+if(key === 'step') value = stepCount;
+else if(key === 'run') value = runCount;
+else if(key === 'events') value = stepEvents;
+else {
+value = state[key];
+value = typeof value === 'boolean' ? (value ? 1 : 0) : safeNumber(value, 0);
+}
+telemetryRows[offset + idx] = value;
+}
+telemetryCount += 1;
+if(telemetryCount >= telemetryChunkRows) flushTelemetry();
+}
+function flushTelemetry(){
+if(telemetryCount === 0) return;
+const buffer = telemetryRows.buffer;
+host.postMessage({type: 'telemetry', buffer, rows: telemetryCount}, [buffer]);
+telemetryRows = null;
+telemetryCount = 0;
+}
+function clearHistory(){
+historyStart = 0;
+historyCount = 0;
+historyCleared = true;
+}
+function clearTimeline(){
+timelineSegments = [];
+timelineBytes = 0;
+timelineThinned = 0;
+timelineStride = 1;
+timelineSeq = 0;
+timelineSplit = true;
+}
+function recordTimeline(financials){
+if(timelineBudget <= 0) return;
+const width = timelineFields.length;
+const row = timelineRow;
+for(let idx=0; idx<width; idx++){
+const key = timelineFields[idx];
+const value = key === 'reorder_point' ? compute_reorder_point() : key in financials ? financials[key] : state[key];
+row[idx] = typeof value === 'number' ? value : value ? 1 : 0;
+}
+let segment = timelineSegments.length ? timelineSegments[timelineSegments.length - 1] : null;
+if(timelineSplit || stepCount - segment.step >= timelineInterval){
+if(segment && !timelineSplit) closeTimelineSegment(segment);
+if(!timelineOffsets || timelineOffsets.length < timelineInterval){
+timelineOffsets = new Uint32Array(timelineInterval);
+}
+if(!timelineIndices){
+timelineIndices = new Uint8Array(timelineInterval * 16);
+timelineValues = new Float64Array(timelineInterval * 16);
+}
+timelineDeltaCount = 0;
+segment = {
+seq: timelineSeq++,
+step: stepCount,
+keyframe: row.slice(),
+steps: 0,
+offsets: timelineOffsets,
+indices: timelineIndices,
+values: timelineValues,
+};
+timelineSegments.push(segment);
+timelineSplit = false;
+} else {
+const last = timelineLast;
+for(let idx=0; idx<width; idx++){
+if(row[idx] === last[idx]) continue;
+if(timelineDeltaCount === timelineIndices.length) growTimelineDeltas(segment);
+timelineIndices[timelineDeltaCount] = idx;
+timelineValues[timelineDeltaCount] = row[idx];
+timelineDeltaCount += 1;
+}
+timelineOffsets[segment.steps] = timelineDeltaCount;
+segment.steps += 1;
+}
+timelineRow = timelineLast;
+timelineLast = row;
+}
+function growTimelineDeltas(segment){
+const indices = new Uint8Array(timelineIndices.length * 2);
+const values = new Float64Array(timelineValues.length * 2);
+indices.set(timelineIndices);
+values.set(timelineValues);
+timelineIndices = segment.indices = indices;
+timelineValues = segment.values = values;
+}
+function closeTimelineSegment(segment){
+segment.offsets = timelineOffsets.slice(0, segment.steps);
+segment.indices = timelineIndices.slice(0, timelineDeltaCount);
+segment.values = timelineValues.slice(0, timelineDeltaCount);
+timelineBytes += segment.keyframe.byteLength + segment.offsets.byteLength + segment.indices.byteLength + segment.values.byteLength;
+if(timelineBytes > timelineBudget) thinTimeline();
+}
+function thinTimeline(){
+const segments = timelineSegments;
+const rowBytes = timelineFields.length * 8;
+while(timelineBytes > timelineBudget && timelineThinned < segments.length - 1){
+const segment = segments[timelineThinned];
+timelineBytes -= segment.offsets.byteLength + segment.indices.byteLength + segment.values.byteLength;
+if(segment.seq % timelineStride){
+timelineBytes -= rowBytes;
+segments.splice(timelineThinned, 1);
+continue;
+}
+segment.offsets = segment.indices = segment.values = null;
+segment.steps = 0;
+timelineThinned += 1;
+}
+while(timelineThinned > 1 && timelineThinned * rowBytes > timelineBudget / 2){
+timelineStride *= 2;
+let kept = 0;
+for(let idx=0; idx<timelineThinned; idx++){
+if(segments[idx].seq % timelineStride) timelineBytes -= rowBytes;
+else segments[kept++] = segments[idx];
+}
+segments.splice(kept, timelineThinned - kept);
+timelineThinned = kept;
+}
+}
+function seekTimeline(step){
+const segments = timelineSegments;
+if(!segments.length) return null;
+const target = clamp(Math.floor(Number(step) || 0), 0, stepCount);
+let lo = 0;
+let hi = segments.length - 1;
+while(lo < hi){
+const mid = (lo + hi + 1) >> 1;
+if(segments[mid].step <= target) lo = mid;
+else hi = mid - 1;
+}
+const segment = segments[lo];
+const row = segment.keyframe.slice();
+const deltas = clamp(target - segment.step, 0, segment.steps);
+let start = 0;
+for(let k=0; k<deltas; k++){
+const end = segment.offsets[k];
+for(let idx=start; idx<end; idx++) row[segment.indices[idx]] = segment.values[idx];
+start = end;
+}
+return {row, step: segment.step + deltas};
+}
+function postTimelineFrame(requestedStep){
+const frame = seekTimeline(requestedStep);
+const message = {type: 'timeline_frame', run: runCount, requested_step: requestedStep, buffer: null, step: 0};
+if(frame){
+const byteLength = snapshotFields.length * 8;
+let buffer = spareBuffers.pop();
+if(!buffer || buffer.byteLength !== byteLength) buffer = new ArrayBuffer(byteLength);
+const view = new Float64Array(buffer);
+view.fill(0);
+for(let idx=0; idx<timelineFields.length; idx++) view[timelineSnapshotIndex[idx]] = frame.row[idx];
+message.buffer = buffer;
+message.step = frame.step;
+}
+host.postMessage(message, message.buffer ? [message.buffer] : []);
+}
+function handleExternalActions(){
+syncParamDrivenState();
+}
+let sim_accumulator_ms = 0;
+let last_pump_ms = null;
+let pumpId = null;
+let pageHidden = false;
+function updatePump(){
+const wanted = started && !pageHidden;
+if(wanted && !pumpId){
+resetClock();
+pumpId = setInterval(pumpSimulation, PUMP_INTERVAL_MS);
+} else if(!wanted && pumpId){
+clearInterval(pumpId);
+pumpId = null;
+}
+}
+function nowMs(){
+return (typeof performance !== 'undefined' && performance.now) ? performance.now() : Date.now();
+}
+function pumpSimulation(){
+const now = nowMs();
+const elapsed = last_pump_ms === null ? 0 : Math.max(0, now - last_pump_ms);
+last_pump_ms = now;
+if(fastForward || replay) return;
+handleExternalActions();
+if(!started){
+sim_accumulator_ms = 0;
+return;
+}
+sim_accumulator_ms += elapsed;
+const catchUpEnd = now + MAX_CATCH_UP_MS;
+let steps = 0;
+let outOfTime = false;
+while(sim_accumulator_ms >= base_interval_ms){
+if(steps > 0 && nowMs() >= catchUpEnd){
+outOfTime = true;
+break;
+}
+render_prev = captureRenderState();
+sim_accumulator_ms -= base_interval_ms;
+steps += 1;
+tick();
+}
+if(outOfTime) sim_accumulator_ms = Math.min(sim_accumulator_ms, base_interval_ms);
+if(steps > 0) postSnapshot(steps);
+}
+function postSnapshot(steps=0){
+const derived = {
+reorder_point: compute_reorder_point(),
+...computeFinancialSnapshot(),
+...(render_prev || captureRenderState()),
+};
+const byteLength = snapshotFields.length * 8;
+let buffer = spareBuffers.pop();
+if(!buffer || buffer.byteLength !== byteLength) buffer = new ArrayBuffer(byteLength);
+const view = new Float64Array(buffer);
+for(let idx=0; idx<snapshotFields.length; idx++){
+const key = snapshotFields[idx];
+const value = key in derived ? derived[key] : state[key];
+view[idx] = typeof value === 'boolean' ? (value ? 1 : 0) : safeNumber(value, 0);
+}
+const message = {
+type: 'snapshot',
+buffer,
+steps,
+started,
+accumulator_ms: sim_accumulator_ms,
+interval_ms: base_interval_ms,
+time_units_per_step,
+run: runCount,
+step: stepCount,
+history: null,
+history_start: historyStart,
+history_rows: historyCount,
+history_cleared: historyCleared,
+profile: takeProfile(),
+};
+const transfer = [buffer];
+if(historyCount > 0){
+message.history = historyRows.buffer;
+transfer.push(historyRows.buffer);
+historyRows = null;
+}
+historyStart = 0;
+historyCount = 0;
+historyCleared = false;
+host.postMessage(message, transfer);
+state.pending_supermarket_burst = false;
+}
+function resetClock(){
+last_pump_ms = null;
+sim_accumulator_ms = 0;
+}
+let fastForward = null;
+let fastForwardTimer = null;
+function cancelFastForward(){
+if(fastForwardTimer) clearTimeout(fastForwardTimer);
+fastForwardTimer = null;
+fastForward = null;
+}
+function startFastForward(day){
+cancelFastForward();
+journal('fast_forward', {day});
+fastForward = {day, target_time: day * SIM_TIME_UNITS_PER_DAY, steps: 0, started_ms: nowMs()};
+syncParamDrivenState();
+runFastForwardSlice();
+}
+function journal(type, data){
+host.postMessage({type: 'journal', entry: {run: runCount, step: stepCount, type, ...data}});
+}
+function journalCheckpoint(){
+journal('checkpoint', {params: simParams(params), state: { ...state }});
+substepsSinceStart = 0;
+}
+function simParams(source){
+const out = {};
+for(const key in source){
+if(!controlParams.has(key)) out[key] = source[key];
+}
+return out;
+}
+function paramChanges(previous, next){
+let changes = null;
+for(const key in next){
+if(controlParams.has(key) || next[key] === previous[key]) continue;
+if(!changes) changes = {};
+changes[key] = next[key];
+}
+return changes;
+}
+function applyParams(next){
+params = next;
+time_units_per_step = (base_interval_ms / 60000.0) * resolveSpeedFactor(params.speed_unit);
+invalidateParams();
+}
+function startRun(runParams, startState){
+applyParams(runParams);
+state = startState ? { ...createInitialState(), ...startState } : createInitialState();
+sanitizeStateNumbers(state);
+syncParamDrivenState();
+clearTimeline();
+recordTimeline(computeFinancialSnapshot());
+substepsSinceStart = 0;
+}
+function startReplay(entries, targetStep, latestParams){
+let first = -1;
+for(let idx=entries.length - 1; idx>=0; idx--){
+if(entries[idx].type === 'init' || entries[idx].type === 'reset' || entries[idx].type === 'checkpoint'){
+first = idx;
+break;
+}
+}
+if(first < 0) return false;
+const entry = entries[first];
+runCount = entry.run || 0;
+stepCount = Math.max(0, Math.floor(Number(entry.step) || 0));
+startRun({ ...latestParams, ...entry.params }, entry.state);
+let target = Math.max(0, Math.floor(Number(targetStep) || 0));
+for(let idx=first + 1; idx<entries.length; idx++) target = Math.max(target, entries[idx].step);
+replay = {
+entries,
+next: first + 1,
+target_step: target,
+latest_params: latestParams,
+running_changed: false,
+checkpoint: false,
+fast_forward_day: null,
+started_ms: nowMs(),
+};
+runReplaySlice();
+return true;
+}
+function cancelReplay(){
+if(replayTimer) clearTimeout(replayTimer);
+replayTimer = null;
+replay = null;
+}
+function runReplaySlice(){
+replayTimer = null;
+if(!replay) return;
+const sliceEnd = nowMs() + FAST_FORWARD_SLICE_MS;
+const entries = replay.entries;
+while(true){
+const entry = replay.next < entries.length ? entries[replay.next] : null;
+if(entry && stepCount >= entry.step){
+if(entry.type === 'params'){
+applyParams({ ...params, ...entry.changes });
+syncParamDrivenState();
+}
+replay.next += 1;
+continue;
+}
+if(!entry && stepCount >= replay.target_step) break;
+tick();
+if((stepCount & 1023) === 0 && nowMs() >= sliceEnd){
+host.postMessage({type: 'replay_progress', step: stepCount, target_step: replay.target_step});
+replayTimer = setTimeout(runReplaySlice, 0);
+return;
+}
+}
+finishReplay();
+}
+function finishReplay(){
+const done = replay;
+replay = null;
+const changes = paramChanges(params, done.latest_params);
+applyParams(done.latest_params);
+syncParamDrivenState();
+if(changes) journal('params', {changes});
+if(done.running_changed) journal('running', {running: started});
+if(done.checkpoint) journalCheckpoint();
+render_prev = null;
+resetClock();
+updatePump();
+postSnapshot();
+host.postMessage({
+type: 'replay_done',
+run: runCount,
+step: stepCount,
+elapsed_ms: nowMs() - done.started_ms,
+});
+if(done.fast_forward_day !== null) startFastForward(done.fast_forward_day);
+}
+function runFastForwardSlice(){
+fastForwardTimer = null;
+if(!fastForward) return;
+const sliceEnd = nowMs() + FAST_FORWARD_SLICE_MS;
+const target = fastForward.target_time - 1e-9;
+while(state.time_acc < target){
+tick();
+fastForward.steps += 1;
+if((fastForward.steps & 1023) === 0 && nowMs() >= sliceEnd) break;
+}
+if(state.time_acc < target){
+host.postMessage({
+type: 'fast_forward_progress',
+day: state.time_acc / SIM_TIME_UNITS_PER_DAY,
+target_day: fastForward.day,
+});
+fastForwardTimer = setTimeout(runFastForwardSlice, 0);
+return;
+}
+const elapsed_ms = Math.max(1e-3, nowMs() - fastForward.started_ms);
+const result = {
+type: 'fast_forward_done',
+day: state.time_acc / SIM_TIME_UNITS_PER_DAY,
+target_day: fastForward.day,
+steps: fastForward.steps,
+elapsed_ms,
+steps_per_second: fastForward.steps / (elapsed_ms / 1000),
+};
+fastForward = null;
+render_prev = null;
+resetClock();
+postSnapshot();
+host.postMessage(result);
+}
+host.onmessage = (event) => {
+const msg = event.data || {};
+switch(msg.type){
+case 'init': {
+cancelFastForward();
+cancelReplay();
+base_interval_ms = msg.base_interval_ms || base_interval_ms;
+controlParams = new Set(msg.control_params || []);
+snapshotFields = msg.fields;
+historyFields = msg.history_fields || [];
+historyCapacity = Math.max(0, Math.floor(Number(msg.history_capacity) || 0));
+historyRows = null;
+spareHistoryBuffers = [];
+clearHistory();
+telemetryFields = msg.telemetry_fields || [];
+telemetryChunkRows = Math.max(0, Math.floor(Number(msg.telemetry_chunk_rows) || 0));
+telemetryRows = null;
+telemetryCount = 0;
+spareTelemetryBuffers = [];
+timelineFields = msg.timeline_fields || [];
+timelineSnapshotIndex = timelineFields.map(key => snapshotFields.indexOf(key));
+timelineInterval = Math.max(1, Math.floor(Number(msg.timeline_interval) || 64));
+timelineBudget = Math.max(0, Number(msg.timeline_budget_bytes) || 0);
+timelineRow = new Float64Array(timelineFields.length);
+timelineLast = new Float64Array(timelineFields.length);
+stepCount = 0;
+started = Boolean(msg.running);
+pageHidden = Boolean(msg.hidden);
+render_prev = null;
+if(pumpId) clearInterval(pumpId);
+pumpId = null;
+if(msg.journal && startReplay(msg.journal, msg.journal_step, msg.params)) break;
+startRun(msg.params, msg.state);
+const runStart = {params: simParams(params), running: started};
+if(msg.state) runStart.state = msg.state;
+journal('init', runStart);
+resetClock();
+updatePump();
+postSnapshot();
+break;
+}
+case 'running':
+if(Boolean(msg.running) !== started){
+if(replay) replay.running_changed = true;
+else journal('running', {running: Boolean(msg.running)});
+}
+started = Boolean(msg.running);
+if(replay) break;
+resetClock();
+updatePump();
+postSnapshot();
+break;
+case 'visibility':
+pageHidden = Boolean(msg.hidden);
+updatePump();
+break;
+case 'fast_forward': {
+const day = Math.max(0, Number(msg.day) || 0);
+if(replay) replay.fast_forward_day = day;
+else startFastForward(day);
+break;
+}
+case 'reset': {
+cancelFastForward();
+cancelReplay();
+flushTelemetry();
+const previousSteps = stepCount;
+runCount += 1;
+stepCount = 0;
+started = false;
+updatePump();
+startRun(params);
+journal('reset', {params: simParams(params), previous_steps: previousSteps});
+render_prev = null;
+clearHistory();
+resetClock();
+postSnapshot();
+break;
+}
+case 'params': {
+if(replay){
+replay.latest_params = msg.params;
+break;
+}
+const changes = paramChanges(params, msg.params);
+applyParams(msg.params);
+syncParamDrivenState();
+if(changes) journal('params', {changes});
+postSnapshot();
+break;
+}
+case 'recycle':
+if(msg.buffer && spareBuffers.length < 4) spareBuffers.push(msg.buffer);
+if(msg.history && msg.history.byteLength === historyCapacity * historyFields.length * 4 && spareHistoryBuffers.length < 2){
+spareHistoryBuffers.push(msg.history);
+}
+if(msg.telemetry && msg.telemetry.byteLength === telemetryChunkRows * telemetryFields.length * 8 && spareTelemetryBuffers.length < 2){
+spareTelemetryBuffers.push(msg.telemetry);
+}
+break;
+case 'seek':
+postTimelineFrame(Math.max(0, Number(msg.step) || 0));
+break;
+case 'checkpoint':
+if(replay) replay.checkpoint = true;
+else journalCheckpoint();
+break;
+case 'timeline':
+timelineInterval = Math.max(1, Math.floor(Number(msg.interval) || timelineInterval));
+if(!timelineSplit && timelineSegments.length) closeTimelineSegment(timelineSegments[timelineSegments.length - 1]);
+timelineSplit = true;
+break;
+case 'telemetry_flush':
+flushTelemetry();
+host.postMessage({type: 'telemetry_flushed'});
+break;
+case 'profile':
+profiling = Boolean(msg.enabled);
+resetProfile();
+break;
+}
+};
+}
+const STATE_FIELDS = [
+'factory_stock', 'warehouse_stock', 'supplier_stock', 'safety_stock', 'fg_safety_stock',
+'high_stock_threshold', 'fg_high_stock_threshold', 'worker_capacity', 'worker_progress',
+'worker_direction', 'worker_load', 'finished_goods_stock', 'backlog', 'truck_en_route',
+'truck_progress', 'truck_delivery', 'truck_wait_timer', 'truck_travel_minutes_total',
+'truck_travel_minutes_remaining', 'production_shutdown', 'score', 'time_acc',
+'chilled_truck_progress', 'chilled_truck_direction', 'chilled_truck_wait',
+'pending_supermarket_burst', 'production_plan_daily', 'supply_plan_daily',
+'production_target_per_time_unit', 'supplier_unlimited', 'demand_factor', 'demand_day', 'truck_dispatches',
+];
+const BOOLEAN_FIELDS = new Set(['truck_en_route', 'production_shutdown', 'pending_supermarket_burst', 'supplier_unlimited']);
+const DERIVED_FIELDS = [
+'reorder_point', 'accountsPayable', 'accountsReceivable', 'netCashFlow',
+'prev_worker_progress', 'prev_truck_en_route', 'prev_truck_progress', 'prev_chilled_truck_progress',
+];
+const SNAPSHOT_FIELDS = STATE_FIELDS.concat(DERIVED_FIELDS);
+const HISTORY_FIELDS = [
+'time_acc', 'factory_stock', 'warehouse_stock', 'finished_goods_stock', 'backlog', 'score',
+'accountsPayable', 'accountsReceivable', 'netCashFlow',
+];
+const HISTORY_CAPACITY = 2048;
+function createHistoryRing(fields, capacity){
+const columns = {};
+for(const key of fields) columns[key] = new Float32Array(capacity);
+return {fields, capacity, columns, series: fields.map(key => columns[key]), head: 0, length: 0};
+}
+function clearHistoryRing(ring){
+ring.head = 0;
+ring.length = 0;
+}
+function appendHistoryRows(ring, rows, start, count){
+const width = ring.fields.length;
+const batchCapacity = Math.floor(rows.length / width);
+for(let n=0; n<count; n++){
+let row = start + n;
+if(row >= batchCapacity) row -= batchCapacity;
+const offset = row * width;
+for(let idx=0; idx<width; idx++) ring.series[idx][ring.head] = rows[offset + idx];
+ring.head = ring.head + 1 === ring.capacity ? 0 : ring.head + 1;
+if(ring.length < ring.capacity) ring.length += 1;
+}
+}
+function historyValue(ring, key, age){
+let idx = ring.head - 1 - age;
+if(idx < 0) idx += ring.capacity;
+return ring.columns[key][idx];
+}
+const stepHistory = createHistoryRing(HISTORY_FIELDS, HISTORY_CAPACITY);
+const TIMELINE_FIELDS = SNAPSHOT_FIELDS.filter(key => key !== 'pending_supermarket_burst' && !key.startsWith('prev_'));
+const TIMELINE_MAX_BYTES = 16 * 1024 * 1024;
+let TIMELINE_INTERVAL = 64;
+const TELEMETRY_FIELDS = [
+'run', 'step', 'time_acc', 'factory_stock', 'warehouse_stock', 'finished_goods_stock', 'backlog',
+'score', 'worker_progress', 'worker_direction', 'worker_load', 'truck_en_route', 'truck_progress',
+'truck_delivery', 'truck_wait_timer', 'truck_travel_minutes_remaining', 'production_shutdown',
+'production_plan_daily', 'supply_plan_daily', 'chilled_truck_progress', 'demand_factor', 'events',
+];
+const TELEMETRY_CHUNK_ROWS = 1024;
+const TELEMETRY_MAX_QUEUED_ROWS = 50000;
+const TELEMETRY_MAX_SEND_ROWS = 20000;
+let TELEMETRY_INTERVAL_MS = 5000;
+const telemetrySession = Math.random().toString(36).slice(2, 10);
+let telemetryQueue = [];
+let telemetryQueuedRows = 0;
+let telemetryDropped = 0;
+let telemetrySeq = 0;
+let telemetrySentSeq = 0;
+let telemetryTimer = null;
+function queueTelemetry(buffer, rows){
+const view = new Float64Array(buffer);
+const width = TELEMETRY_FIELDS.length;
+const columns = {};
+TELEMETRY_FIELDS.forEach((key, idx) => {
+const column = new Array(rows);
+for(let row=0; row<rows; row++) column[row] = view[row * width + idx];
+columns[key] = column;
+});
+telemetrySeq += 1;
+telemetryQueue.push({seq: telemetrySeq, rows, columns});
+telemetryQueuedRows += rows;
+while(telemetryQueuedRows > TELEMETRY_MAX_QUEUED_ROWS && telemetryQueuedRows > telemetryQueue.length){
+thinTelemetryQueue();
+}
+}
+function thinTelemetryQueue(){
+telemetryQueuedRows = 0;
+for(const chunk of telemetryQueue){
+const kept = Math.ceil(chunk.rows / 2);
+for(const key of TELEMETRY_FIELDS){
+const column = chunk.columns[key];
+const thinned = new Array(kept);
+for(let row=0; row<kept; row++) thinned[row] = column[row * 2];
+if(key === 'events'){
+for(let row=0; row * 2 + 1 < chunk.rows; row++) thinned[row] |= column[row * 2 + 1];
+}
+chunk.columns[key] = thinned;
+}
+telemetryDropped += chunk.rows - kept;
+chunk.rows = kept;
+telemetryQueuedRows += kept;
+}
+}
+function acknowledgeTelemetry(session, seq){
+if(session !== telemetrySession) return;
+while(telemetryQueue.length && telemetryQueue[0].seq <= seq){
+telemetryQueuedRows -= telemetryQueue.shift().rows;
+}
+if(telemetrySentSeq < seq) telemetrySentSeq = seq;
+}
+function pendingTelemetry(){
+const chunks = [];
+let rows = 0;
+for(const chunk of telemetryQueue){
+if(chunks.length && rows + chunk.rows > TELEMETRY_MAX_SEND_ROWS) break;
+chunks.push(chunk);
+rows += chunk.rows;
+}
+return {session: telemetrySession, dropped: telemetryDropped, chunks};
+}
+function requestTelemetryFlush(){
+postToCore({type: 'telemetry_flush'});
+}
+function startTelemetry(){
+if(telemetryTimer) clearInterval(telemetryTimer);
+telemetryTimer = setInterval(requestTelemetryFlush, TELEMETRY_INTERVAL_MS);
+}
+let state = null;
+const MONEY_PARTICLE_CAPACITY = 512;
+const MONEY_BURST_SIZE = 24;
+const MONEY_PARTICLE_FIELDS = ['x', 'y', 'vx', 'vy', 'life', 'rotation', 'spin', 'scale'];
+const moneyParticles = {count: 0};
+for(const key of MONEY_PARTICLE_FIELDS) moneyParticles[key] = new Float32Array(MONEY_PARTICLE_CAPACITY);
+let particleRandom = mulberry32(0);
+function mulberry32(seed){
+let a = seed >>> 0;
+return () => {
+a = (a + 0x6D2B79F5) >>> 0;
+let t = a;
+t = Math.imul(t ^ (t >>> 15), t | 1);
+t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+}
+function seedParticles(){
+particleRandom = mulberry32(Number(params.seed) || 0);
+}
+let time_units_per_step = (base_interval_ms / 60000.0);
+let snapshot_received_ms = 0;
+let snapshot_accumulator_ms = 0;
+let core = null;
+let coreReady = false;
+function nowMs(){
+return (typeof performance !== 'undefined' && performance.now) ? performance.now() : Date.now();
+}
+const JOURNAL_FORMAT_VERSION = 1;
+const JOURNAL_MAX_ENTRIES = 1000;
+let journalEntries = [];
+let journalCheckpointPending = false;
+let journalJson = '[]';
+let journalRun = 0;
+let journalStep = 0;
+let journalUnreported = false;
+function setJournal(entries, run, step){
+journalEntries = entries.slice();
+journalJson = JSON.stringify(journalEntries);
+journalRun = run;
+journalStep = step;
+journalCheckpointPending = false;
+}
+function appendJournal(entry){
+if(entry.type === 'checkpoint'){
+journalEntries = [entry];
+journalCheckpointPending = false;
+} else {
+journalEntries.push(entry);
+if(journalEntries.length > JOURNAL_MAX_ENTRIES){
+const kept = journalEntries.filter(item => item.run === entry.run);
+journalEntries = kept.length < journalEntries.length ? kept : journalEntries;
+}
+if(journalEntries.length > JOURNAL_MAX_ENTRIES && !journalCheckpointPending){
+journalCheckpointPending = true;
+postToCore({type: 'checkpoint'});
+}
+}
+journalJson = JSON.stringify(journalEntries);
+journalStep = entry.run === journalRun ? Math.max(journalStep, entry.step) : entry.step;
+journalRun = entry.run;
+journalUnreported = true;
+markStateDirty();
+}
+function sessionJournal(){
+return {
+v: JOURNAL_FORMAT_VERSION,
+base_interval_ms,
+seed: Number(params.seed) || 0,
+run: journalRun,
+step: journalStep,
+entries: journalEntries,
+};
+}
+const PERSIST_FORMAT_VERSION = 3;
+let PERSIST_INTERVAL_MS = 2000;
+const PERSISTED_FIELDS = [
+'factory_stock', 'warehouse_stock', 'worker_progress', 'worker_direction', 'worker_load',
+'finished_goods_stock', 'backlog', 'truck_en_route', 'truck_progress', 'truck_delivery',
+'truck_wait_timer', 'truck_travel_minutes_total', 'truck_travel_minutes_remaining',
+'production_shutdown', 'score', 'time_acc', 'chilled_truck_progress', 'chilled_truck_direction',
+'chilled_truck_wait', 'demand_factor', 'demand_day', 'truck_dispatches',
+];
+let persistDirty = false;
+let persistTimer = null;
+let last_persist_ms = -Infinity;
+function loadState(){
+try {
+if(!window.name) return null;
+const wrapper = JSON.parse(window.name);
+if(!wrapper || wrapper.key !== STATE_WRAPPER_KEY) return null;
+if(wrapper.reset_token !== params.reset_token) return null;
+handled_fast_forward_token = Number(wrapper.ff) || 0;
+if(wrapper.v === PERSIST_FORMAT_VERSION && Array.isArray(wrapper.journal)){
+setJournal(wrapper.journal, Number(wrapper.run) || 0, Number(wrapper.step) || 0);
+return {journal: wrapper.journal, step: journalStep};
+}
+if(wrapper.v === 2 && Array.isArray(wrapper.s)){
+const restored = {};
+PERSISTED_FIELDS.forEach((key, idx) => {
+if(idx < wrapper.s.length) restored[key] = wrapper.s[idx];
+});
+return {state: restored};
+}
+if(!wrapper.state) return null;
+return {state: wrapper.state};
+} catch (err) {
+console.warn('Unable to load saved state', err);
+return null;
+}
+}
+function persistState(){
+if(!state) return;
+try {
+const header = JSON.stringify({
+key: STATE_WRAPPER_KEY,
+v: PERSIST_FORMAT_VERSION,
+reset_token: params.reset_token,
+ff: handled_fast_forward_token,
+run: journalRun,
+step: journalStep,
+});
+window.name = `${header.slice(0, -1)},"journal":${journalJson}}`;
+persistDirty = false;
+last_persist_ms = nowMs();
+} catch (err) {
+console.warn('Unable to persist state', err);
+}
+}
+function flushPersist(){
+if(persistTimer){
+clearTimeout(persistTimer);
+persistTimer = null;
+}
+if(persistDirty) persistState();
+}
+function markStateDirty(){
+persistDirty = true;
+if(persistTimer) return;
+const wait = Math.max(0, PERSIST_INTERVAL_MS - (nowMs() - last_persist_ms));
+persistTimer = setTimeout(flushPersist, wait);
+}
+document.addEventListener('visibilitychange', () => {
+if(document.visibilityState === 'hidden') flushPersist();
+});
+window.addEventListener('pagehide', flushPersist);
+function decodeSnapshot(view){
+const next = {};
+for(let idx=0; idx<SNAPSHOT_FIELDS.length; idx++){
+const key = SNAPSHOT_FIELDS[idx];
+next[key] = BOOLEAN_FIELDS.has(key) || key === 'prev_truck_en_route' ? view[idx] !== 0 : view[idx];
+}
+if(next.supplier_unlimited) next.supplier_stock = null;
+return next;
+}
+function applySnapshot(msg){
+const next = decodeSnapshot(new Float64Array(msg.buffer));
+liveState = next;
+if(!timelineViewing) state = next;
+if(msg.history_cleared){
+clearHistoryRing(stepHistory);
+resetSparklines();
+}
+if(msg.history){
+appendHistoryRows(stepHistory, new Float32Array(msg.history), msg.history_start, msg.history_rows);
+queueSparklineRows(msg.history_rows);
+}
+const recycled = msg.history ? [msg.buffer, msg.history] : [msg.buffer];
+postToCore({type: 'recycle', buffer: msg.buffer, history: msg.history}, recycled);
+markStateDirty();
+time_units_per_step = msg.time_units_per_step;
+journalRun = msg.run;
+journalStep = msg.step;
+snapshot_received_ms = nowMs();
+snapshot_accumulator_ms = msg.accumulator_ms;
+render_prev = msg.steps > 0 && !timelineViewing ? {
+worker_progress: next.prev_worker_progress,
+truck_en_route: next.prev_truck_en_route,
+truck_progress: next.prev_truck_progress,
+chilled_truck_progress: next.prev_chilled_truck_progress,
+} : null;
+updateTimelineSlider();
+for(let idx=0; idx<Math.min(msg.steps, 20); idx++) update_money_particles();
+if(perf.enabled) perfCoreSample(msg.steps, msg.profile);
+requestRender();
+if(started !== msg.started){
+started = msg.started;
+updateControlButtons();
+}
+}
+function handleCoreMessage(event){
+const msg = event.data || {};
+coreReady = true;
+if(msg.type === 'snapshot') applySnapshot(msg);
+else if(msg.type === 'telemetry'){
+queueTelemetry(msg.buffer, msg.rows);
+postToCore({type: 'recycle', telemetry: msg.buffer}, [msg.buffer]);
+} else if(msg.type === 'telemetry_flushed'){
+const unsent = telemetryQueue.length && telemetryQueue[telemetryQueue.length - 1].seq > telemetrySentSeq;
+if(unsent || journalUnreported) reportControls();
+} else if(msg.type === 'timeline_frame'){
+applyTimelineFrame(msg);
+} else if(msg.type === 'journal'){
+appendJournal(msg.entry);
+} else if(msg.type === 'replay_progress'){
+setFastForwardStatus(`⏮ Restoring session… step ${numberFormatter.format(msg.step)} / ${numberFormatter.format(msg.target_step)}`);
+} else if(msg.type === 'replay_done'){
+setFastForwardStatus('');
+} else if(msg.type === 'fast_forward_progress'){
+setFastForwardStatus(`⏩ Day ${Math.floor(msg.day)} / ${msg.target_day}…`);
+} else if(msg.type === 'fast_forward_done'){
+fastForwarding = false;
+requestRender();
+const rate = numberFormatter.format(Math.round(msg.steps_per_second));
+setFastForwardStatus(`⏩ Day ${Math.round(msg.day)} · ${numberFormatter.format(msg.steps)} steps in ${Math.round(msg.elapsed_ms)} ms (${rate} steps/s)`);
+}
+}
+function postToCore(msg, transfer){
+if(core) core.postMessage(msg, transfer || []);
+}
+function startInlineCore(){
+const coreHost = {
+onmessage: null,
+postMessage(msg){ Promise.resolve().then(() => handleCoreMessage({data: msg})); },
+};
+simCore(coreHost);
+return {
+postMessage(msg){ Promise.resolve().then(() => coreHost.onmessage({data: msg})); },
+terminate(){},
+};
+}
+function startCore(){
+const restored = loadState();
+const initMessage = {
+type: 'init',
+params: { ...params },
+state: restored && restored.state ? restored.state : null,
+journal: restored && restored.journal ? restored.journal : null,
+journal_step: restored ? restored.step || 0 : 0,
+control_params: [...CONTROL_PARAMS],
+running: started,
+fields: SNAPSHOT_FIELDS,
+history_fields: HISTORY_FIELDS,
+history_capacity: HISTORY_CAPACITY,
+telemetry_fields: TELEMETRY_FIELDS,
+telemetry_chunk_rows: TELEMETRY_CHUNK_ROWS,
+timeline_fields: TIMELINE_FIELDS,
+timeline_interval: TIMELINE_INTERVAL,
+timeline_budget_bytes: TIMELINE_MAX_BYTES,
+hidden: Boolean(document.hidden),
+base_interval_ms,
+};
+try {
+const source = `(${simCore.toString()})(self);`;
+const url = URL.createObjectURL(new Blob([source], {type: 'text/javascript'}));
+const worker = new Worker(url);
+worker.onmessage = (event) => {
+if(!coreReady) URL.revokeObjectURL(url);
+handleCoreMessage(event);
+};
+worker.onerror = (err) => {
+if(coreReady) return;
+console.warn('Simulation worker failed to start, running it on the main thread', err);
+worker.terminate();
+core = startInlineCore();
+core.postMessage(initMessage);
+if(perf.enabled) postToCore({type: 'profile', enabled: true});
+if(fastForwarding) postToCore({type: 'fast_forward', day: fastForwardTarget});
+};
+core = worker;
+} catch (err) {
+console.warn('Web Worker unavailable, running the simulation on the main thread', err);
+core = startInlineCore();
+}
+core.postMessage(initMessage);
+const fastForwardToken = Number(params.fast_forward_token) || 0;
+if(fastForwardToken > handled_fast_forward_token){
+handled_fast_forward_token = fastForwardToken;
+requestFastForward(params.fast_forward_day);
+}
+}
+function computeFinancialSnapshot(){
+return {
+accountsPayable: state.accountsPayable,
+accountsReceivable: state.accountsReceivable,
+netCashFlow: state.netCashFlow,
+};
+}
+function compute_reorder_point(){
+return state.reorder_point;
+}
+function update_money_particles(){
+const pool = moneyParticles;
+const gravity = 0.18;
+const damping = 0.985;
+const fade = clamp(time_units_per_step / 5.0, 0.03, 0.08);
+const floor = canvas.height + 60;
+let idx = 0;
+while(idx < pool.count){
+pool.vy[idx] += gravity;
+pool.vx[idx] *= damping;
+pool.x[idx] += pool.vx[idx];
+pool.y[idx] += pool.vy[idx];
+pool.rotation[idx] += pool.spin[idx];
+pool.life[idx] -= fade;
+if(pool.life[idx] > 0 && pool.y[idx] < floor){
+idx += 1;
+continue;
+}
+const last = pool.count - 1;
+for(const key of MONEY_PARTICLE_FIELDS) pool[key][idx] = pool[key][last];
+pool.count = last;
+}
+}
+function spawnMoneyBurst(origin){
+const pool = moneyParticles;
+const spread = Math.PI / 1.4;
+for(let n=0; n<MONEY_BURST_SIZE && pool.count < MONEY_PARTICLE_CAPACITY; n++){
+const idx = pool.count++;
+const angle = (-Math.PI / 2) + (particleRandom() - 0.5) * spread;
+const speed = 1.6 + particleRandom() * 0.9;
+pool.x[idx] = origin.x + (particleRandom() * 90 - 45);
+pool.y[idx] = origin.y + particleRandom() * 16;
+pool.vx[idx] = Math.cos(angle) * speed;
+pool.vy[idx] = Math.sin(angle) * speed;
+pool.life[idx] = 1.4 + particleRandom() * 0.5;
+pool.rotation[idx] = particleRandom() * Math.PI * 2;
+pool.spin[idx] = (particleRandom() - 0.5) * 0.12;
+pool.scale[idx] = 0.55 + particleRandom() * 0.45;
+}
+}
+function generate_alerts(){
+let alerts = [];
+if(state.factory_stock < state.safety_stock) alerts.push("Factory below safety!");
+if(state.warehouse_stock < state.safety_stock) alerts.push("Warehouse critically low!");
+if(state.warehouse_stock > state.high_stock_threshold) alerts.push("Warehouse too high!");
+if(state.production_shutdown) alerts.push("Production shutdown!");
+if(params.scenario === "Biased forecast" && !state.production_shutdown && state.factory_stock < state.safety_stock)
+alerts.push("Biased forecast — factory dropping!");
+return alerts.join("\n");
+}
+let render_prev = null;
+function interpolated(key, current, alpha){
+if(!render_prev || alpha >= 1) return current;
+return lerp(render_prev[key], current, clamp(alpha, 0, 1));
+}
+function computeSceneLayout(){
+const facilityY = 220;
+const facilityWidth = 180;
+const facilityHeight = 140;
+const factory = {
+x: 80,
+y: facilityY,
+w: facilityWidth,
+h: facilityHeight,
+color: '#c8e6c9',
+stroke: '#81c784',
+label: 'Factory',
+};
+const warehouse = {
+x: factory.x + facilityWidth + 160,
+y: facilityY,
+w: facilityWidth,
+h: facilityHeight,
+color: '#ffe0b2',
+stroke: '#ffb74d',
+label: 'Warehouse',
+};
+const supplier = {
+x: warehouse.x + facilityWidth + 160,
+y: facilityY,
+w: facilityWidth,
+h: facilityHeight,
+color: '#bbdefb',
+stroke: '#8bc34a',
+label: 'Farm',
+};
+const secondaryY = facilityY + facilityHeight + 120;
+const secondaryWidth = facilityWidth;
+const secondaryHeight = facilityHeight;
+const dc_coords = {
+x: factory.x,
+y: secondaryY,
+w: secondaryWidth,
+h: secondaryHeight,
+};
+const supermarket = {
+x: warehouse.x,
+y: secondaryY,
+w: secondaryWidth,
+h: secondaryHeight,
+label: 'Supermarket',
+};
+return {factory, warehouse, supplier, dc_coords, supermarket};
+}
+const sceneLayout = computeSceneLayout();
+let backgroundLayer = null;
+let backgroundLayerKey = '';
+function createLayerCanvas(width, height){
+if(typeof OffscreenCanvas !== 'undefined') return new OffscreenCanvas(width, height);
+const layer = document.createElement('canvas');
+layer.width = width;
+layer.height = height;
+return layer;
+}
+function withContext(targetCtx, fn){
+const screenCtx = ctx;
+ctx = targetCtx;
+try {
+fn();
+} finally {
+ctx = screenCtx;
+}
+}
+function draw_static_scene(layout){
+const {factory, warehouse, supplier, dc_coords, supermarket} = layout;
+const g = ctx.createLinearGradient(0,0,0,canvas.height);
+g.addColorStop(0,'#f7fbff'); g.addColorStop(1,'#eaf4ff');
+ctx.fillStyle = g; ctx.fillRect(0,0,canvas.width,canvas.height);
+ctx.fillStyle = "#0b4f8c"; ctx.font = "28px Montserrat, sans-serif";
+ctx.fillText("Shalaby — End2End (Game Mode)", 18, 36);
+ctx.font = "12px Segoe UI";
+ctx.fillStyle = "#4b5968";
+ctx.fillText("Move resources, watch the truck and keep stock healthy!", 18, 56);
+draw_factory_machine(factory);
+draw_warehouse(warehouse);
+draw_farm(supplier);
+draw_supermarket(supermarket);
+ctx.strokeStyle = '#b0bec5'; ctx.setLineDash([8,6]); ctx.lineWidth = 6;
+const facilityMidY = factory.y + factory.h / 2;
+ctx.beginPath(); ctx.moveTo(factory.x + factory.w, facilityMidY); ctx.lineTo(warehouse.x, facilityMidY); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(warehouse.x + warehouse.w, facilityMidY); ctx.lineTo(supplier.x, facilityMidY); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(factory.x + factory.w / 2, factory.y + factory.h); ctx.lineTo(dc_coords.x + dc_coords.w / 2, dc_coords.y); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(dc_coords.x + dc_coords.w, dc_coords.y + dc_coords.h / 2); ctx.lineTo(supermarket.x, supermarket.y + supermarket.h / 2); ctx.stroke();
+ctx.setLineDash([]);
+draw_dc(dc_coords);
+}
+function ensureBackgroundLayer(){
+const dpr = window.devicePixelRatio || 1;
+const key = `${canvas.width}x${canvas.height}@${dpr}`;
+if(backgroundLayer && backgroundLayerKey === key) return backgroundLayer;
+const layer = createLayerCanvas(canvas.width, canvas.height);
+withContext(layer.getContext('2d'), () => draw_static_scene(sceneLayout));
+backgroundLayer = layer;
+backgroundLayerKey = key;
+return layer;
+}
+function draw(alpha=1){
+const {factory, warehouse, supplier, dc_coords, supermarket} = sceneLayout;
+ctx.drawImage(ensureBackgroundLayer(), 0, 0);
+perfLap('background');
+const timeNow = (typeof performance !== 'undefined' && performance.now) ? performance.now() : Date.now();
+const vaporPhase = timeNow * 0.002;
+draw_factory_exhaust(factory, vaporPhase);
+perfLap('draw_factory_exhaust');
+if(state.pending_supermarket_burst){
+spawnMoneyBurst({
+x: supermarket.x + supermarket.w / 2,
+y: supermarket.y + 32,
+});
+state.pending_supermarket_burst = false;
+}
+const dcDock = {x: dc_coords.x + dc_coords.w + 12, y: dc_coords.y + dc_coords.h / 2};
+const supermarketDock = {x: supermarket.x - 16, y: supermarket.y + supermarket.h / 2 + 4};
+const chilledProgress = interpolated('chilled_truck_progress', state.chilled_truck_progress, alpha);
+const chilledX = dcDock.x + (supermarketDock.x - dcDock.x) * chilledProgress;
+const chilledY = dcDock.y + (supermarketDock.y - dcDock.y) * chilledProgress;
+draw_chilled_truck(chilledX, chilledY, state.chilled_truck_direction);
+perfLap('draw_chilled_truck');
+draw_dc_status(dc_coords);
+perfLap('draw_dc_status');
+const reorderPoint = compute_reorder_point();
+draw_stock_blocks(factory, state.factory_stock, state.high_stock_threshold, '#66bb6a');
+draw_stock_blocks(warehouse, state.warehouse_stock, state.high_stock_threshold, '#ffa726', state.safety_stock, reorderPoint);
+draw_stock_blocks(dc_coords, state.finished_goods_stock, state.fg_high_stock_threshold, '#42a5f5', state.fg_safety_stock);
+perfLap('draw_stock_blocks');
+draw_money_particles(moneyParticles);
+perfLap('draw_money_particles');
+draw_flag(factory, determine_flag(state.factory_stock, state.safety_stock, null, null), 'left');
+draw_flag(warehouse, determine_flag(state.warehouse_stock, state.safety_stock, reorderPoint, state.high_stock_threshold), 'right');
+ctx.fillStyle = '#2e7d32'; ctx.font = 'bold 13px Segoe UI';
+ctx.fillText(Math.round(state.factory_stock) + ' u', factory.x + factory.w/2 - 30, factory.y - 12);
+ctx.fillStyle = '#ef6c00';
+ctx.fillText(Math.round(state.warehouse_stock) + ' u', warehouse.x + warehouse.w/2 - 40, warehouse.y - 12);
+ctx.fillStyle = '#1e88e5';
+const supplierLabel = state.supplier_unlimited ? '∞' : `${Math.round(state.supplier_stock)} u`;
+ctx.fillText(supplierLabel, supplier.x + supplier.w/2 - ctx.measureText(supplierLabel).width/2, supplier.y - 12);
+perfLap('draw_flag');
+const factoryCenter = {x: factory.x + factory.w/2, y: factory.y + factory.h/2};
+const warehouseCenter = {x: warehouse.x + warehouse.w/2, y: warehouse.y + warehouse.h/2};
+const workerProgress = interpolated('worker_progress', state.worker_progress, alpha);
+const workerX = factoryCenter.x + (warehouseCenter.x - factoryCenter.x) * workerProgress;
+const workerY = factoryCenter.y + 44;
+draw_forklift(workerX, workerY, state.worker_load, state.worker_direction);
+perfLap('draw_forklift');
+let truckProgress = state.truck_en_route && state.truck_wait_timer <= 0 ? state.truck_progress : 0.0;
+if(state.truck_en_route && render_prev && render_prev.truck_en_route){
+truckProgress = interpolated('truck_progress', truckProgress, alpha);
+}
+const supplierCenter = {x: supplier.x + supplier.w/2, y: supplier.y + supplier.h};
+const warehouseTruckY = warehouse.y + warehouse.h - 10;
+const truckX = supplierCenter.x + (warehouseCenter.x - supplierCenter.x) * truckProgress;
+const truckY = supplierCenter.y + (warehouseTruckY - supplierCenter.y) * truckProgress;
+draw_truck(truckX, truckY, state.truck_en_route, state.truck_wait_timer, state.truck_delivery, state.truck_travel_minutes_remaining);
+perfLap('draw_truck');
+setMetric('metric-score', 'score', 'Score', state.score, scoreLevel(state.score));
+setMetric('metric-backlog', 'backlog', 'Backlog', state.backlog, backlogLevel(state.backlog), ' u');
+const financials = computeFinancialSnapshot();
+setMetric('metric-ap', 'accounts-payable', 'A/P', financials.accountsPayable, payableLevel(financials.accountsPayable, financials.accountsReceivable), ' $');
+setMetric('metric-ar', 'accounts-receivable', 'A/R', financials.accountsReceivable, receivableLevel(financials.accountsReceivable), ' $');
+setMetric('metric-cash', 'cash-position', 'Net Cash', financials.netCashFlow, cashFlowLevel(financials.netCashFlow), ' $');
+perfLap('hud_metrics');
+}
+function roundRect(ctx, x, y, w, h, r, fill, stroke){
+if (typeof r === 'number') r = {tl:r,tr:r,br:r,bl:r};
+ctx.beginPath();
+ctx.moveTo(x + r.tl, y);
+ctx.lineTo(x + w - r.tr, y);
+ctx.quadraticCurveTo(x + w, y, x + w, y + r.tr);
+ctx.lineTo(x + w, y + h - r.br);
+ctx.quadraticCurveTo(x + w, y + h, x + w - r.br, y + h);
+ctx.lineTo(x + r.bl, y + h);
+ctx.quadraticCurveTo(x, y + h, x, y + h - r.bl);
+ctx.lineTo(x, y + r.tl);
+ctx.quadraticCurveTo(x, y, x + r.tl, y);
+ctx.closePath();
+if(fill) ctx.fill();
+if(stroke) ctx.stroke();
+}
+const STOCK_BIN_CACHE_SIZE = 48;
+const STOCK_BLOCK_LINE_WIDTH = 3;
+const stockBinCache = new Map();
+function draw_stock_blocks(coords, stock, max_stock, fill, safety_stock=null, reorder_point=null){
+const capacity = Math.max(1, max_stock);
+const units_per_block = capacity / 30;
+const block_count = Math.max(0, Math.min(30, Math.floor(stock / units_per_block)));
+if(block_count === 0) return;
+let safety_blocks = 0, reorder_blocks = 0;
+if(safety_stock!=null) safety_blocks = Math.min(30, Math.max(0, Math.ceil(safety_stock / units_per_block)));
+if(reorder_point!=null) reorder_blocks = Math.min(30, Math.max(0, Math.ceil(reorder_point / units_per_block)));
+safety_blocks = Math.min(safety_blocks, block_count);
+reorder_blocks = Math.min(reorder_blocks, block_count);
+const dpr = window.devicePixelRatio || 1;
+const key = `${block_count}|${safety_blocks}|${reorder_blocks}|${fill}|${coords.w}x${coords.h}@${dpr}`;
+let bin = stockBinCache.get(key);
+if(bin){
+stockBinCache.delete(key);
+} else {
+bin = createLayerCanvas(Math.ceil(coords.w * dpr), Math.ceil(coords.h * dpr));
+const binCtx = bin.getContext('2d');
+binCtx.scale(dpr, dpr);
+binCtx.lineWidth = STOCK_BLOCK_LINE_WIDTH;
+withContext(binCtx, () => paint_stock_blocks(coords.w, coords.h, block_count, fill, safety_blocks, reorder_blocks));
+if(stockBinCache.size >= STOCK_BIN_CACHE_SIZE) stockBinCache.delete(stockBinCache.keys().next().value);
+}
+stockBinCache.set(key, bin);
+ctx.drawImage(bin, coords.x, coords.y, coords.w, coords.h);
+}
+function paint_stock_blocks(width, height, block_count, fill, safety_blocks, reorder_blocks){
+const cols = 5;
+const block_size = Math.min(26, Math.floor(width/cols - 4));
+for(let idx=0; idx<block_count; idx++){
+const row = Math.floor(idx / cols);
+const col = idx % cols;
+const bx0 = 12 + col * (block_size + 4);
+const by1 = height - 12 - row * (block_size + 4);
+const by0 = by1 - block_size;
+if(by0 < 8) break;
+let block_color = fill;
+if(idx < safety_blocks) block_color = "#e53935";
+else if(idx < reorder_blocks) block_color = "#43a047";
+ctx.fillStyle = block_color; ctx.strokeStyle = "#ffffff";
+ctx.fillRect(bx0, by0, block_size, block_size);
+ctx.strokeRect(bx0, by0, block_size, block_size);
+}
+}
+function determine_flag(stock, safety_stock=null, reorder_point=null, high_threshold=null){
+if(safety_stock!=null && stock <= safety_stock) return "red";
+if(high_threshold!=null && stock >= high_threshold) return "yellow";
+if(reorder_point!=null && stock <= reorder_point) return "yellow";
+return "green";
+}
+function draw_flag(coords, color, align='center'){
+if(!color) return;
+const color_map = { red:'#d32f2f', yellow:'#fbc02d', green:'#388e3c' };
+const fill = color_map[color];
+let pole_x;
+if(align==='left') pole_x = coords.x - 18;
+else if(align==='right') pole_x = coords.x + coords.w + 18;
+else pole_x = coords.x + coords.w/2;
+const pole_base_y = coords.y - 4;
+const pole_top_y = pole_base_y - 36;
+ctx.beginPath(); ctx.moveTo(pole_x, pole_base_y); ctx.lineTo(pole_x, pole_top_y); ctx.strokeStyle = '#546e7a'; ctx.lineWidth = 3; ctx.stroke();
+ctx.beginPath();
+ctx.moveTo(pole_x, pole_top_y);
+ctx.lineTo(pole_x + 22, pole_top_y + 8);
+ctx.lineTo(pole_x, pole_top_y + 16);
+ctx.closePath();
+ctx.fillStyle = fill; ctx.fill();
+ctx.strokeStyle = '#eeeeee'; ctx.stroke();
+}
+const VEHICLE_SPRITES = [
+{key: 'forklift:1:0', w: 96, h: 108, ox: 48, oy: 48, paint: () => paint_forklift(1, false)},
+{key: 'forklift:1:1', w: 96, h: 108, ox: 48, oy: 48, paint: () => paint_forklift(1, true)},
+{key: 'forklift:-1:0', w: 96, h: 108, ox: 48, oy: 48, paint: () => paint_forklift(-1, false)},
+{key: 'forklift:-1:1', w: 96, h: 108, ox: 48, oy: 48, paint: () => paint_forklift(-1, true)},
+{key: 'truck', w: 82, h: 74, ox: 42, oy: 30, paint: paint_truck},
+{key: 'chilled:1', w: 76, h: 50, ox: 38, oy: 22, paint: () => paint_chilled_truck(1)},
+{key: 'chilled:-1', w: 76, h: 50, ox: 38, oy: 22, paint: () => paint_chilled_truck(-1)},
+];
+const VEHICLE_ATLAS_GAP = 2;
+let vehicleAtlas = null;
+let vehicleAtlasKey = '';
+function ensureVehicleAtlas(){
+const dpr = window.devicePixelRatio || 1;
+const key = `${canvas.width}x${canvas.height}@${dpr}`;
+if(vehicleAtlas && vehicleAtlasKey === key) return vehicleAtlas;
+const sprites = {};
+let width = VEHICLE_ATLAS_GAP;
+let height = 0;
+for(const sprite of VEHICLE_SPRITES){
+sprites[sprite.key] = {...sprite, sx: width, sy: VEHICLE_ATLAS_GAP};
+width += sprite.w + VEHICLE_ATLAS_GAP;
+height = Math.max(height, sprite.h + 2 * VEHICLE_ATLAS_GAP);
+}
+const layer = createLayerCanvas(Math.ceil(width * dpr), Math.ceil(height * dpr));
+withContext(layer.getContext('2d'), () => {
+for(const sprite of Object.values(sprites)){
+ctx.save();
+ctx.setTransform(dpr, 0, 0, dpr, (sprite.sx + sprite.ox) * dpr, (sprite.sy + sprite.oy) * dpr);
+sprite.paint();
+ctx.restore();
+}
+});
+vehicleAtlas = {canvas: layer, scale: dpr, sprites};
+vehicleAtlasKey = key;
+return vehicleAtlas;
+}
+function blit_vehicle(key, x, y){
+const atlas = ensureVehicleAtlas();
+const sprite = atlas.sprites[key];
+const scale = atlas.scale;
+ctx.drawImage(
+atlas.canvas, sprite.sx * scale, sprite.sy * scale, sprite.w * scale, sprite.h * scale,
+x - sprite.ox, y - sprite.oy, sprite.w, sprite.h
+);
+}
+window.addEventListener('resize', () => {
+vehicleAtlasKey = '';
+requestRender();
+});
+const FORKLIFT_BODY_WIDTH = 50;
+const FORKLIFT_BODY_HEIGHT = 28;
+function draw_forklift(x,y,load,direction){
+const facing = direction >= 0 ? 1 : -1;
+blit_vehicle(`forklift:${facing}:${load > 0 ? 1 : 0}`, x, y);
+if(load>0){
+const bodyX = -FORKLIFT_BODY_WIDTH * 0.45;
+const bodyY = -FORKLIFT_BODY_HEIGHT * 0.5;
+ctx.fillStyle = '#1b5e20';
+ctx.font = 'bold 11px Segoe UI';
+ctx.textAlign = 'center';
+ctx.fillText(Math.round(load), x + facing * (bodyX + FORKLIFT_BODY_WIDTH * 0.64 + 15), y + bodyY + 16);
+ctx.textAlign = 'start';
+}
+}
+function paint_forklift(facing, loaded){
+ctx.scale(facing, 1);
+const bodyWidth = FORKLIFT_BODY_WIDTH;
+const bodyHeight = FORKLIFT_BODY_HEIGHT;
+const bodyX = -bodyWidth * 0.45;
+const bodyY = -bodyHeight * 0.5;
+ctx.fillStyle = '#fbc02d';
+ctx.strokeStyle = '#ef6c00';
+ctx.lineWidth = 3;
+roundRect(ctx, bodyX, bodyY, bodyWidth, bodyHeight, 7, true, true);
+ctx.fillStyle = '#37474f';
+ctx.strokeStyle = '#263238';
+ctx.lineWidth = 2.4;
+roundRect(ctx, bodyX - 4, bodyY - 22, bodyWidth * 0.42, 20, 5, true, true);
+ctx.fillRect(bodyX + bodyWidth * 0.12, bodyY - 30, 6, 30);
+ctx.strokeStyle = '#424242';
+ctx.lineWidth = 3.4;
+ctx.beginPath();
+ctx.moveTo(bodyX + bodyWidth * 0.55, bodyY - 18);
+ctx.lineTo(bodyX + bodyWidth * 0.55, bodyY + bodyHeight + 4);
+ctx.stroke();
+ctx.fillStyle = '#263238';
+ctx.fillRect(bodyX + bodyWidth * 0.6, bodyY - 6, 8, bodyHeight + 28);
+ctx.fillRect(bodyX + bodyWidth * 0.6, bodyY + bodyHeight + 22, 8, 22);
+ctx.fillRect(bodyX + bodyWidth * 0.2, bodyY + bodyHeight - 4, 24, 6);
+ctx.fillRect(bodyX - bodyWidth * 0.3, bodyY + bodyHeight - 4, 24, 6);
+ctx.fillStyle = '#212121';
+ctx.beginPath(); ctx.arc(bodyX - bodyWidth * 0.18, bodyY + bodyHeight + 8, 12, 0, Math.PI*2); ctx.fill();
+ctx.beginPath(); ctx.arc(bodyX + bodyWidth * 0.66, bodyY + bodyHeight + 8, 12, 0, Math.PI*2); ctx.fill();
+ctx.fillStyle = '#b0bec5';
+ctx.beginPath(); ctx.arc(bodyX - bodyWidth * 0.18, bodyY + bodyHeight + 8, 4, 0, Math.PI*2); ctx.fill();
+ctx.beginPath(); ctx.arc(bodyX + bodyWidth * 0.66, bodyY + bodyHeight + 8, 4, 0, Math.PI*2); ctx.fill();
+if(loaded){
+ctx.fillStyle = '#8bc34a';
+roundRect(ctx, bodyX + bodyWidth * 0.64, bodyY + 4, 30, 20, 4, true, true);
+}
+}
+function draw_truck(x,y,enroute,wait,delivery,remaining){
+blit_vehicle('truck', x, y);
+if(enroute){
+let status;
+if(wait > 0) status = `Loading... ${formatTimeUnits(wait)}`;
+else if(delivery) {
+const rem = Math.max(0, remaining);
+const tail = rem > 0 ? ` (${formatTimeUnits(rem)})` : '';
+status = `Delivering ${Math.round(delivery)} u${tail}`;
+} else status = 'Returning';
+ctx.fillStyle = '#1565c0'; ctx.font = '11px Segoe UI'; ctx.fillText(status, x-40, y-36);
+}
+}
+function paint_truck(){
+ctx.fillStyle = '#1976d2'; ctx.fillRect(-40, -18, 76, 36);
+ctx.fillStyle = '#42a5f5'; ctx.fillRect(-30, -28, 60, 20);
+ctx.beginPath(); ctx.fillStyle = '#37474f'; ctx.ellipse(-20, 30, 12, 12, 0, 0, Math.PI*2); ctx.fill();
+ctx.beginPath(); ctx.ellipse(18, 30, 12, 12, 0, 0, Math.PI*2); ctx.fill();
+}
+function draw_chilled_truck(x,y,direction){
+blit_vehicle(direction < 0 ? 'chilled:-1' : 'chilled:1', x, y);
+}
+function paint_chilled_truck(direction){
+if(direction < 0) ctx.scale(-1, 1);
+ctx.fillStyle = '#b2ebf2'; ctx.strokeStyle = "#26c6da"; ctx.lineWidth = 2;
+roundRect(ctx, -34, -18, 68, 32, 10, true, true);
+ctx.fillStyle = '#00acc1';
+roundRect(ctx, -18, -10, 36, 20, 6, true, false);
+ctx.fillStyle = '#004d40';
+ctx.beginPath(); ctx.arc(-18, 18, 8, 0, Math.PI*2); ctx.fill();
+ctx.beginPath(); ctx.arc(18, 18, 8, 0, Math.PI*2); ctx.fill();
+ctx.strokeStyle = '#e0f7fa'; ctx.lineWidth = 1.6;
+ctx.beginPath(); ctx.moveTo(-4, -6); ctx.lineTo(4, 6); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(-4, 6); ctx.lineTo(4, -6); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(0, -8); ctx.lineTo(0, 8); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(-8, 0); ctx.lineTo(8, 0); ctx.stroke();
+ctx.fillStyle = '#007c91'; ctx.font = 'bold 11px Segoe UI'; ctx.textAlign = 'center'; ctx.textBaseline = 'middle';
+ctx.fillText('ICE', 0, -1);
+}
+const MONEY_SPRITE_RADIUS = 8;
+const MONEY_SPRITE_SIZE = 2 * (MONEY_SPRITE_RADIUS + 2);
+let moneySprite = null;
+function ensureMoneySprite(){
+if(moneySprite) return moneySprite;
+const sprite = createLayerCanvas(MONEY_SPRITE_SIZE, MONEY_SPRITE_SIZE);
+const spriteCtx = sprite.getContext('2d');
+const points = 5;
+const outer = MONEY_SPRITE_RADIUS;
+const inner = outer * 0.45;
+spriteCtx.translate(MONEY_SPRITE_SIZE / 2, MONEY_SPRITE_SIZE / 2);
+spriteCtx.fillStyle = '#ffd54f';
+spriteCtx.strokeStyle = 'rgba(255, 215, 64, 0.9)';
+spriteCtx.lineWidth = 1;
+spriteCtx.beginPath();
+for(let i=0; i<points; i++){
+const outerAngle = (Math.PI * 2 * i) / points;
+const innerAngle = outerAngle + Math.PI / points;
+const ox = Math.cos(outerAngle) * outer;
+const oy = Math.sin(outerAngle) * outer;
+if(i === 0) spriteCtx.moveTo(ox, oy);
+else spriteCtx.lineTo(ox, oy);
+spriteCtx.lineTo(Math.cos(innerAngle) * inner, Math.sin(innerAngle) * inner);
+}
+spriteCtx.closePath();
+spriteCtx.fill();
+spriteCtx.stroke();
+moneySprite = sprite;
+return sprite;
+}
+function draw_money_particles(pool){
+if(!pool || pool.count === 0) return;
+const sprite = ensureMoneySprite();
+const offset = -MONEY_SPRITE_SIZE / 2;
+for(let idx=0; idx<pool.count; idx++){
+const scale = pool.scale[idx];
+const cos = Math.cos(pool.rotation[idx]) * scale;
+const sin = Math.sin(pool.rotation[idx]) * scale;
+ctx.setTransform(cos, sin, -sin, cos, pool.x[idx], pool.y[idx]);
+ctx.globalAlpha = Math.max(0, Math.min(1, pool.life[idx]));
+ctx.drawImage(sprite, offset, offset);
+}
+ctx.setTransform(1, 0, 0, 1, 0, 0);
+ctx.globalAlpha = 1;
+}
+function wrap01(value){
+return (value % 1 + 1) % 1;
+}
+function draw_factory_machine(factory){
+const {x, y, w, h} = factory;
+const chassisMargin = 6;
+const chassisHeight = h - 36;
+const chassisY = y + h - chassisHeight;
+ctx.fillStyle = '#546e7a';
+ctx.strokeStyle = '#2f3b44';
+ctx.lineWidth = 2.5;
+roundRect(ctx, x + chassisMargin, chassisY, w - chassisMargin * 2, chassisHeight, 12, true, true);
+const consoleHeight = 22;
+const consoleY = chassisY - consoleHeight - 8;
+ctx.fillStyle = '#78909c';
+roundRect(ctx, x + 14, consoleY, w - 28, consoleHeight, 10, true, true);
+ctx.fillStyle = '#1de9b6';
+roundRect(ctx, x + 20, consoleY + 6, 54, consoleHeight - 12, 6, true, true);
+ctx.fillStyle = '#ffab40';
+roundRect(ctx, x + w - 92, consoleY + 8, 36, consoleHeight - 14, 6, true, true);
+const ventTop = chassisY + chassisHeight * 0.34;
+const ventCount = 4;
+const ventWidth = 24;
+const ventHeight = 42;
+const ventGap = (w - 2 * chassisMargin - ventCount * ventWidth) / (ventCount + 1);
+for(let i=0; i<ventCount; i++){
+const ventX = x + chassisMargin + ventGap * (i + 1) + ventWidth * i;
+ctx.fillStyle = '#263238';
+roundRect(ctx, ventX, ventTop, ventWidth, ventHeight, 6, true, false);
+ctx.fillStyle = '#90a4ae';
+ctx.fillRect(ventX + 4, ventTop + ventHeight - 10, ventWidth - 8, 4);
+}
+const rollerY = chassisY + chassisHeight - 24;
+ctx.fillStyle = '#37474f';
+roundRect(ctx, x + 16, rollerY, w - 32, 18, 8, true, true);
+ctx.strokeStyle = '#90a4ae';
+ctx.lineWidth = 2;
+for(let i=0; i<3; i++){
+const divider = x + 16 + (i + 1) * (w - 32) / 4;
+ctx.beginPath();
+ctx.moveTo(divider, rollerY + 2);
+ctx.lineTo(divider, rollerY + 16);
+ctx.stroke();
+}
+factory_stacks(factory).forEach((stack) =>{
+const stackWidth = 32;
+const stackX = stack.cx - stackWidth / 2;
+const stackY = stack.top;
+ctx.fillStyle = '#eceff1';
+ctx.strokeStyle = '#b0bec5';
+roundRect(ctx, stackX, stackY, stackWidth, stack.height, 6, true, true);
+ctx.fillStyle = '#b0bec5';
+ctx.fillRect(stackX + 6, stackY + stack.height * 0.35, stackWidth - 12, 5);
+});
+ctx.fillStyle = '#333';
+ctx.font='bold 12px Segoe UI';
+ctx.fillText(factory.label, x + w/2 - ctx.measureText(factory.label).width/2, y + h + 18);
+}
+function factory_stacks(factory){
+const {x, y, w, h} = factory;
+const chassisY = y + h - (h - 36);
+const consoleY = chassisY - 22 - 8;
+return [
+{cx: x + w * 0.32, height: 68},
+{cx: x + w * 0.62, height: 76},
+].map(stack => ({...stack, top: consoleY - stack.height - 6}));
+}
+function draw_factory_exhaust(factory, phase){
+factory_stacks(factory).forEach((stack, idx) => {
+draw_factory_vapor({x: stack.cx, y: stack.top - 12}, phase + idx * 0.4);
+});
+}
+function draw_factory_vapor(origin, phase){
+const plumeCount = 5;
+for(let i=0; i<plumeCount; i++){
+const progress = wrap01(phase * 0.3 + i * 0.22);
+const rise = progress * 120 + i * 8;
+const wobble = Math.sin((phase + i) * 1.9) * 12;
+const radius = 20 - progress * 11;
+const squash = 0.7 + progress * 0.2;
+const alpha = Math.max(0, 0.48 - progress * 0.32);
+if(alpha <= 0) continue;
+ctx.save();
+ctx.globalAlpha = alpha;
+ctx.fillStyle = '#a8d8ff';
+ctx.shadowColor = 'rgba(140, 210, 255, 0.65)';
+ctx.shadowBlur = 18;
+ctx.beginPath();
+ctx.ellipse(origin.x + wobble, origin.y - rise, radius * squash, radius, 0, 0, Math.PI * 2);
+ctx.fill();
+ctx.restore();
+}
+}
+function draw_warehouse(warehouse) {
+const {x, y, w, h} = warehouse;
+ctx.fillStyle = '#ffe0b2';
+ctx.strokeStyle = '#ffb74d';
+ctx.lineWidth = 2;
+roundRect(ctx, x, y, w, h, 8, true, true);
+const roofHeight = 20;
+const roofY = y - roofHeight;
+ctx.fillStyle = '#bdbdbd';
+ctx.strokeStyle = '#9e9e9e';
+ctx.beginPath();
+ctx.moveTo(x - 10, y);
+ctx.lineTo(x + w/2, roofY);
+ctx.lineTo(x + w + 10, y);
+ctx.closePath();
+ctx.fill();
+ctx.stroke();
+ctx.strokeStyle = '#9e9e9e';
+ctx.lineWidth = 1.5;
+ctx.beginPath();
+ctx.moveTo(x + w/2, roofY);
+ctx.lineTo(x + w/2, y);
+ctx.stroke();
+const doorWidth = 30;
+const doorHeight = h * 0.6;
+const doorY = y + (h - doorHeight) / 2;
+ctx.fillStyle = '#bdbdbd';
+ctx.strokeStyle = '#9e9e9e';
+roundRect(ctx, x + 20, doorY, doorWidth, doorHeight, 4, true, true);
+roundRect(ctx, x + w - 20 - doorWidth, doorY, doorWidth, doorHeight, 4, true, true);
+ctx.strokeStyle = '#8d6e63';
+ctx.lineWidth = 1.5;
+ctx.beginPath();
+ctx.moveTo(x + 20 + doorWidth/2, doorY + 5);
+ctx.lineTo(x + 20 + doorWidth/2, doorY + doorHeight - 5);
+ctx.stroke();
+ctx.beginPath();
+ctx.moveTo(x + w - 20 - doorWidth/2, doorY + 5);
+ctx.lineTo(x + w - 20 - doorWidth/2, doorY + doorHeight - 5);
+ctx.stroke();
+const windowSize = 20;
+const windowY = y + 15;
+ctx.fillStyle = '#e3f2fd';
+ctx.strokeStyle = '#90caf9';
+roundRect(ctx, x + 30, windowY, windowSize, windowSize, 3, true, true);
+roundRect(ctx, x + w - 30 - windowSize, windowY, windowSize, windowSize, 3, true, true);
+ctx.strokeStyle = '#90caf9';
+ctx.lineWidth = 1;
+ctx.beginPath();
+ctx.moveTo(x + 30, windowY + windowSize/2);
+ctx.lineTo(x + 30 + windowSize, windowY + windowSize/2);
+ctx.moveTo(x + 30 + windowSize/2, windowY);
+ctx.lineTo(x + 30 + windowSize/2, windowY + windowSize);
+ctx.stroke();
+ctx.beginPath();
+ctx.moveTo(x + w - 30 - windowSize, windowY + windowSize/2);
+ctx.lineTo(x + w - 30, windowY + windowSize/2);
+ctx.moveTo(x + w - 30 - windowSize/2, windowY);
+ctx.lineTo(x + w - 30 - windowSize/2, windowY + windowSize);
+ctx.stroke();
+ctx.fillStyle = '#333';
+ctx.font = 'bold 12px Segoe UI';
+ctx.fillText(warehouse.label, x + w/2 - ctx.measureText(warehouse.label).width/2, y + h + 18);
+}
+function draw_dc(dc) {
+const {x, y, w, h} = dc;
+ctx.fillStyle = '#e3f2fd';
+ctx.strokeStyle = '#42a5f5';
+ctx.lineWidth = 2;
+roundRect(ctx, x, y, w, h, 10, true, true);
+const roofHeight = 15;
+const roofY = y - roofHeight;
+ctx.fillStyle = '#90caf9';
+ctx.strokeStyle = '#64b5f6';
+roundRect(ctx, x - 5, roofY, w + 10, roofHeight + 5, 6, true, true);
+const dockHeight = 12;
+const dockY = y + h - dockHeight;
+ctx.fillStyle = '#bdbdbd';
+ctx.fillRect(x + 20, dockY, w - 40, dockHeight);
+const doorWidth = 25;
+const doorSpacing = 10;
+const doorY = dockY - 8;
+const doorHeight = 20;
+const doorCount = 3;
+const totalDoorsWidth = (doorWidth * doorCount) + (doorSpacing * (doorCount - 1));
+const startX = x + (w - totalDoorsWidth) / 2;
+for (let i = 0; i < doorCount; i++) {
+const doorX = startX + (i * (doorWidth + doorSpacing));
+ctx.fillStyle = '#78909c';
+ctx.fillRect(doorX - 2, doorY - 2, doorWidth + 4, doorHeight + 4);
+ctx.fillStyle = '#455a64';
+ctx.fillRect(doorX, doorY, doorWidth, doorHeight);
+ctx.fillStyle = '#ffd54f';
+ctx.fillRect(doorX + doorWidth - 6, doorY + doorHeight/2 - 2, 3, 4);
+ctx.fillStyle = '#9e9e9e';
+ctx.fillRect(doorX - 3, dockY - 2, doorWidth + 6, 3);
+}
+const signText = 'DISTRIBUTION';
+const signPadding = 15;
+const signHeight = 22;
+ctx.font = 'bold 14px Arial';
+const textMetrics = ctx.measureText(signText);
+const signWidth = Math.max(80, textMetrics.width + signPadding * 2);
+const signX = x + (w - signWidth) / 2;
+const signY = y + 20;
+ctx.shadowColor = 'rgba(0,0,0,0.2)';
+ctx.shadowBlur = 4;
+ctx.shadowOffsetY = 2;
+ctx.fillStyle = '#1565c0';
+roundRect(ctx, signX, signY, signWidth, signHeight, 4, true, true);
+ctx.shadowBlur = 0;
+ctx.fillStyle = '#ffffff';
+ctx.textAlign = 'center';
+ctx.textBaseline = 'middle';
+ctx.fillText(signText, x + w/2, signY + signHeight/2 + 1);
+}
+function draw_dc_status(dc){
+const {x, y} = dc;
+ctx.fillStyle = '#1e88e5';
+ctx.font = 'bold 13px Segoe UI';
+ctx.textAlign = 'left';
+ctx.textBaseline = 'alphabetic';
+ctx.fillText('DC: ' + Math.round(state.finished_goods_stock) + ' u', x + 16, y - 10);
+draw_flag(dc, determine_flag(state.finished_goods_stock, state.fg_safety_stock, null, state.fg_high_stock_threshold), 'center');
+}
+function draw_farm(farm) {
+const {x, y, w, h} = farm;
+ctx.fillStyle = '#8bc34a';
+roundRect(ctx, x, y, w, h, 8, true, true);
+ctx.fillStyle = '#8d6e63';
+const fenceHeight = 20;
+const fenceY = y + h - fenceHeight - 20;
+ctx.fillRect(x, fenceY, w, 5);
+ctx.fillRect(x, fenceY + 15, w, 5);
+const postSpacing = 20;
+for (let i = 0; i <= w; i += postSpacing) {
+ctx.fillRect(x + i, fenceY, 3, fenceHeight);
+}
+const drawCow = (cx, cy, size) => {
+ctx.fillStyle = '#f5f5f5';
+ctx.beginPath();
+ctx.ellipse(cx, cy, size * 0.6, size * 0.4, 0, 0, Math.PI * 2);
+ctx.fill();
+ctx.strokeStyle = '#9e9e9e';
+ctx.lineWidth = 1;
+ctx.stroke();
+ctx.beginPath();
+ctx.ellipse(cx - size * 0.5, cy - size * 0.1, size * 0.3, size * 0.25, 0, -Math.PI/4, Math.PI/4, true);
+ctx.fill();
+ctx.stroke();
+ctx.beginPath();
+ctx.ellipse(cx - size * 0.6, cy - size * 0.2, size * 0.1, size * 0.15, 0, 0, Math.PI * 2);
+ctx.fill();
+ctx.stroke();
+ctx.fillStyle = '#9e9e9e';
+ctx.beginPath();
+ctx.ellipse(cx, cy, size * 0.2, size * 0.1, Math.PI/4, 0, Math.PI * 2);
+ctx.fill();
+};
+const cowCount = 3;
+for (let i = 0; i < cowCount; i++) {
+const cowX = x + 30 + (i * 40);
+const cowY = y + h - 50 - (i % 2 * 15);
+drawCow(cowX, cowY, 25);
+}
+ctx.fillStyle = '#c62828';
+ctx.beginPath();
+ctx.moveTo(x + w/2, y + 20);
+ctx.lineTo(x + w - 20, y + h/2);
+ctx.lineTo(x + 20, y + h/2);
+ctx.closePath();
+ctx.fill();
+ctx.fillStyle = '#5d4037';
+ctx.fillRect(x + 20, y + h/2, w - 40, 10);
+ctx.fillStyle = '#8d6e63';
+ctx.fillRect(x + w/2 - 10, y + h/2, 20, 15);
+ctx.fillStyle = '#333';
+ctx.font = 'bold 12px Segoe UI';
+ctx.fillText(farm.label, x + w/2 - ctx.measureText(farm.label).width/2, y + h + 18);
+}
+function draw_supermarket(supermarket){
+const {x, y, w, h} = supermarket;
+const roofHeight = 24;
+const roofY = y - roofHeight;
+ctx.fillStyle = '#2f3b4c';
+ctx.strokeStyle = '#455a64';
+ctx.lineWidth = 2;
+ctx.beginPath();
+ctx.moveTo(x - 12, y);
+ctx.lineTo(x + w/2, y - roofHeight);
+ctx.lineTo(x + w + 12, y);
+ctx.closePath();
+ctx.fill();
+ctx.stroke();
+ctx.fillStyle = '#1b242d';
+ctx.strokeStyle = '#37474f';
+roundRect(ctx, x, y, w, h, 8, true, true);
+const awningY0 = y + 12;
+const awningY1 = awningY0 + 22;
+const stripeWidth = 14;
+const colors = ['#455a64', '#263238'];
+let stripeIndex = 0;
+for(let sx = x + 8; sx < x + w - 8; sx += stripeWidth){
+ctx.fillStyle = colors[stripeIndex % colors.length];
+const sx1 = Math.min(sx + stripeWidth, x + w - 8);
+ctx.fillRect(sx, awningY0, sx1 - sx, awningY1 - awningY0);
+stripeIndex += 1;
+}
+ctx.strokeStyle = '#546e7a';
+ctx.lineWidth = 2;
+ctx.beginPath(); ctx.moveTo(x + 8, awningY0); ctx.lineTo(x + w - 8, awningY0); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(x + 8, awningY1); ctx.lineTo(x + w - 8, awningY1); ctx.stroke();
+const windowWidth = 36;
+const windowHeight = 32;
+const windowY0 = awningY1 + 10;
+const windowGap = 18;
+for(let idx=0; idx<3; idx++){
+const wx0 = x + 22 + idx * (windowWidth + windowGap);
+if(wx0 + windowWidth > x + w - 22) break;
+ctx.fillStyle = '#263238'; ctx.strokeStyle = '#607d8b'; ctx.lineWidth = 2;
+ctx.strokeRect(wx0, windowY0, windowWidth, windowHeight);
+ctx.fillRect(wx0, windowY0, windowWidth, windowHeight);
+ctx.strokeStyle = '#90a4ae'; ctx.lineWidth = 1.5;
+ctx.beginPath(); ctx.moveTo(wx0, windowY0 + windowHeight/2); ctx.lineTo(wx0 + windowWidth, windowY0 + windowHeight/2); ctx.stroke();
+ctx.beginPath(); ctx.moveTo(wx0 + windowWidth/2, windowY0); ctx.lineTo(wx0 + windowWidth/2, windowY0 + windowHeight); ctx.stroke();
+}
+const doorWidth = 38;
+const doorHeight = 54;
+const doorX0 = x + (w - doorWidth) / 2;
+const doorY0 = y + h - doorHeight - 10;
+ctx.fillStyle = '#29434e'; ctx.strokeStyle = '#607d8b'; ctx.lineWidth = 2;
+roundRect(ctx, doorX0, doorY0, doorWidth, doorHeight, 6, true, true);
+ctx.beginPath(); ctx.moveTo(doorX0 + doorWidth/2, doorY0); ctx.lineTo(doorX0 + doorWidth/2, doorY0 + doorHeight); ctx.stroke();
+const signWidth = 116;
+const signHeight = 28;
+const signX0 = x + w/2 - signWidth/2;
+const signY0 = y - roofHeight + 14 - signHeight/2;
+ctx.fillStyle = '#0d47a1'; ctx.strokeStyle = '#1565c0'; ctx.lineWidth = 2;
+roundRect(ctx, signX0, signY0, signWidth, signHeight, 8, true, true);
+ctx.fillStyle = '#e3f2fd'; ctx.font = 'bold 13px Segoe UI';
+const label = 'SUPERMARKET';
+ctx.fillText(label, x + w/2 - ctx.measureText(label).width/2, signY0 + signHeight/2 + 4);
+ctx.fillStyle = '#e0e0e0'; ctx.font='bold 12px Segoe UI';
+ctx.fillText(supermarket.label, x + w/2 - ctx.measureText(supermarket.label).width/2, y + h + 18);
+}
+const sparkCanvas = document.getElementById('history');
+const sparkCtx = sparkCanvas ? sparkCanvas.getContext('2d') : null;
+const SPARK_GUTTER = 64;
+const SPARK_LANE_GAP = 6;
+const SPARK_BACKGROUND = '#071327';
+const SPARK_LANES = [
+{label: 'Stock', series: [['factory_stock', '#66bb6a'], ['warehouse_stock', '#ffa726'], ['finished_goods_stock', '#42a5f5']]},
+{label: 'Backlog', series: [['backlog', '#ef5350']]},
+{label: 'Score', series: [['score', '#ffd54f']]},
+{label: 'Cash', series: [['accountsPayable', '#ff8a65'], ['accountsReceivable', '#81c784'], ['netCashFlow', '#4dd0e1']]},
+];
+let sparkPendingRows = 0;
+let sparkNeedsFullRedraw = true;
+function resetSparklines(){
+for(const lane of SPARK_LANES){
+lane.min = Infinity;
+lane.max = -Infinity;
+}
+sparkPendingRows = 0;
+sparkNeedsFullRedraw = true;
+}
+function sparkLaneBox(index){
+const laneHeight = (sparkCanvas.height - SPARK_LANE_GAP * (SPARK_LANES.length + 1)) / SPARK_LANES.length;
+return {y: SPARK_LANE_GAP + index * (laneHeight + SPARK_LANE_GAP), h: laneHeight};
+}
+function queueSparklineRows(count){
+sparkPendingRows += count;
+const fresh = Math.min(count, stepHistory.length);
+for(const lane of SPARK_LANES){
+let low = lane.min, high = lane.max;
+for(const [key] of lane.series){
+for(let age=0; age<fresh; age++){
+const value = historyValue(stepHistory, key, age);
+if(value < low) low = value;
+if(value > high) high = value;
+}
+}
+if(low >= lane.min && high <= lane.max) continue;
+const span = Math.max(1, high - low);
+if(low < lane.min) lane.min = low >= 0 ? Math.max(0, low - span * 0.5) : low - span * 0.5;
+if(high > lane.max) lane.max = high + span * 0.5;
+sparkNeedsFullRedraw = true;
+}
+}
+function sparkY(lane, box, value){
+const t = (value - lane.min) / Math.max(1e-9, lane.max - lane.min);
+return Math.round(box.y + box.h - 1 - clamp(t, 0, 1) * (box.h - 1));
+}
+function drawSparkColumns(fromAge, toAge){
+const right = sparkCanvas.width - 1;
+sparkCtx.fillStyle = SPARK_BACKGROUND;
+sparkCtx.fillRect(right - toAge + 1, 0, toAge - fromAge, sparkCanvas.height);
+SPARK_LANES.forEach((lane, index) => {
+const box = sparkLaneBox(index);
+sparkCtx.fillStyle = 'rgba(23,54,108,0.45)';
+sparkCtx.fillRect(right - toAge + 1, box.y, toAge - fromAge, box.h);
+if(!(lane.max > lane.min)) return;
+for(const [key, color] of lane.series){
+sparkCtx.fillStyle = color;
+for(let age=fromAge; age<toAge; age++){
+const y = sparkY(lane, box, historyValue(stepHistory, key, age));
+const prevY = age + 1 < stepHistory.length ? sparkY(lane, box, historyValue(stepHistory, key, age + 1)) : y;
+const top = Math.min(y, prevY);
+sparkCtx.fillRect(right - age, top, 1, Math.max(y, prevY) - top + 1);
+}
+}
+});
+}
+function drawSparkGutter(){
+sparkCtx.fillStyle = SPARK_BACKGROUND;
+sparkCtx.fillRect(0, 0, SPARK_GUTTER, sparkCanvas.height);
+sparkCtx.font = 'bold 11px Segoe UI';
+SPARK_LANES.forEach((lane, index) => {
+const box = sparkLaneBox(index);
+sparkCtx.fillStyle = '#9fd2ff';
+sparkCtx.fillText(lane.label.toUpperCase(), 8, box.y + box.h / 2 + 4);
+});
+}
+function drawSparklines(){
+if(!sparkCtx) return;
+const plotWidth = sparkCanvas.width - SPARK_GUTTER;
+if(sparkNeedsFullRedraw || sparkPendingRows >= plotWidth){
+drawSparkGutter();
+sparkCtx.fillStyle = SPARK_BACKGROUND;
+sparkCtx.fillRect(SPARK_GUTTER, 0, plotWidth, sparkCanvas.height);
+drawSparkColumns(0, Math.min(stepHistory.length, plotWidth));
+sparkNeedsFullRedraw = false;
+} else if(sparkPendingRows > 0){
+const shift = sparkPendingRows;
+sparkCtx.drawImage(sparkCanvas, SPARK_GUTTER + shift, 0, plotWidth - shift, sparkCanvas.height,
+SPARK_GUTTER, 0, plotWidth - shift, sparkCanvas.height);
+drawSparkColumns(0, Math.min(shift, stepHistory.length));
+}
+sparkPendingRows = 0;
+}
+resetSparklines();
+const timelineSlider = document.getElementById('timeline-slider');
+const timelineLabel = document.getElementById('timeline-label');
+const timelineLiveButton = document.getElementById('timeline-live');
+const liveBadge = document.querySelector('.hud-live-badge');
+let liveState = null;
+let timelineViewing = false;
+let timelineSeekPending = null;
+let timelineSeekInFlight = false;
+function updateTimelineSlider(){
+if(!timelineSlider) return;
+const max = String(journalStep);
+if(timelineSlider.max !== max) timelineSlider.max = max;
+if(!timelineViewing && timelineSlider.value !== max) timelineSlider.value = max;
+}
+function setTimelineLabel(text, badge){
+if(timelineLabel) timelineLabel.textContent = text;
+if(liveBadge) liveBadge.textContent = badge;
+}
+function requestTimelineFrame(step){
+timelineSeekPending = step;
+if(!timelineSeekInFlight) sendTimelineSeek();
+}
+function sendTimelineSeek(){
+timelineSeekInFlight = timelineSeekPending !== null;
+if(!timelineSeekInFlight) return;
+postToCore({type: 'seek', step: timelineSeekPending});
+timelineSeekPending = null;
+}
+function applyTimelineFrame(msg){
+if(msg.buffer){
+if(timelineViewing && msg.run === journalRun){
+state = decodeSnapshot(new Float64Array(msg.buffer));
+render_prev = null;
+const day = (state.time_acc / SIM_TIME_UNITS_PER_DAY).toFixed(1);
+const note = msg.step < msg.requested_step ? ' (nearest kept)' : '';
+setTimelineLabel(`Day ${day} · step ${numberFormatter.format(msg.step)}${note}`, 'REVIEW');
+requestRender();
+}
+postToCore({type: 'recycle', buffer: msg.buffer}, [msg.buffer]);
+}
+timelineSeekInFlight = false;
+sendTimelineSeek();
+}
+function showLive(){
+if(!timelineViewing) return;
+timelineViewing = false;
+timelineSeekPending = null;
+if(liveState) state = liveState;
+render_prev = null;
+setTimelineLabel('Live', 'LIVE');
+updateTimelineSlider();
+requestRender();
+}
+if(timelineSlider){
+timelineSlider.addEventListener('input', () => {
+if(fastForwarding) return;
+const step = Math.round(Number(timelineSlider.value) || 0);
+if(step >= journalStep){
+showLive();
+return;
+}
+if(started){
+setRunning(false);
+reportControls();
+}
+timelineViewing = true;
+requestTimelineFrame(step);
+});
+}
+if(timelineLiveButton){
+timelineLiveButton.addEventListener('click', showLive);
+}
+const PERF_FRAME_SAMPLES = 600;
+const PERF_WINDOW_MS = 1000;
+const PERF_MAX_FRAME_GAP_MS = 1000;
+const PERF_HISTOGRAM_BIN_MS = 2;
+const PERF_HISTOGRAM_BINS = 25;
+const perfToggle = document.getElementById('control-perf');
+const perfPanel = document.getElementById('perf-overlay');
+const perfText = document.getElementById('perf-text');
+const perfCanvas = document.getElementById('perf-histogram');
+const perfCtx = perfCanvas ? perfCanvas.getContext('2d') : null;
+const perfExportButton = document.getElementById('perf-export');
+const perf = {
+enabled: false,
+frameMs: new Float32Array(PERF_FRAME_SAMPLES),
+sorted: new Float32Array(PERF_FRAME_SAMPLES),
+frameNext: 0,
+frameCount: 0,
+lastTimestamp: null,
+mark: 0,
+windowStart: 0,
+windowFrames: 0,
+windowSteps: 0,
+windowCoreSteps: 0,
+drawMs: {},
+coreMs: {},
+report: null,
+};
+function resetPerfWindow(){
+perf.windowStart = nowMs();
+perf.windowFrames = 0;
+perf.windowSteps = 0;
+perf.windowCoreSteps = 0;
+perf.drawMs = {};
+perf.coreMs = {};
+}
+function setPerfEnabled(enabled){
+perf.enabled = enabled;
+perf.frameNext = 0;
+perf.frameCount = 0;
+perf.lastTimestamp = null;
+perf.report = null;
+resetPerfWindow();
+postToCore({type: 'profile', enabled});
+if(perfToggle) perfToggle.setAttribute('aria-pressed', enabled ? 'true' : 'false');
+if(perfPanel) perfPanel.hidden = !enabled;
+if(perfText) perfText.textContent = enabled ? 'Collecting…' : '';
+requestRender();
+}
+function perfFrameStart(timestamp){
+if(perf.lastTimestamp !== null){
+const gap = timestamp - perf.lastTimestamp;
+if(gap >= 0 && gap < PERF_MAX_FRAME_GAP_MS){
+perf.frameMs[perf.frameNext] = gap;
+perf.frameNext = (perf.frameNext + 1) % PERF_FRAME_SAMPLES;
+perf.frameCount = Math.min(perf.frameCount + 1, PERF_FRAME_SAMPLES);
+}
+}
+perf.lastTimestamp = timestamp;
+perf.mark = nowMs();
+}
+function perfLap(section){
+if(!perf.enabled) return;
+const now = nowMs();
+perf.drawMs[section] = (perf.drawMs[section] || 0) + now - perf.mark;
+perf.mark = now;
+}
+function perfCoreSample(steps, profile){
+perf.windowSteps += steps;
+if(!profile) return;
+perf.windowCoreSteps += profile.steps;
+for(const phase in profile.phase_ms){
+perf.coreMs[phase] = (perf.coreMs[phase] || 0) + profile.phase_ms[phase];
+}
+}
+function perfFrameEnd(){
+perf.windowFrames += 1;
+if(nowMs() - perf.windowStart >= PERF_WINDOW_MS) publishPerfWindow();
+}
+function frameTimeStats(){
+const count = perf.frameCount;
+const sorted = perf.sorted.subarray(0, count);
+sorted.set(perf.frameMs.subarray(0, count));
+sorted.sort();
+const histogram = new Array(PERF_HISTOGRAM_BINS).fill(0);
+let total = 0;
+for(let idx=0; idx<count; idx++){
+total += sorted[idx];
+histogram[Math.min(PERF_HISTOGRAM_BINS - 1, Math.floor(sorted[idx] / PERF_HISTOGRAM_BIN_MS))] += 1;
+}
+const percentile = (q) => count ? sorted[Math.max(0, Math.ceil(q * count) - 1)] : 0;
+return {
+samples: count,
+mean: count ? total / count : 0,
+p50: percentile(0.5),
+p95: percentile(0.95),
+p99: percentile(0.99),
+max: count ? sorted[count - 1] : 0,
+bin_ms: PERF_HISTOGRAM_BIN_MS,
+histogram,
+};
+}
+function roundedMap(totals, divisor, scale=1){
+const out = {};
+for(const key in totals) out[key] = divisor > 0 ? Math.round(totals[key] * scale / divisor * 1000) / 1000 : 0;
+return out;
+}
+function publishPerfWindow(){
+const seconds = (nowMs() - perf.windowStart) / 1000;
+perf.report = {
+window_s: Math.round(seconds * 1000) / 1000,
+fps: Math.round(perf.windowFrames / seconds * 10) / 10,
+steps_per_second: Math.round(perf.windowSteps / seconds * 10) / 10,
+frame_ms: frameTimeStats(),
+draw_ms_per_frame: roundedMap(perf.drawMs, perf.windowFrames),
+core_us_per_step: roundedMap(perf.coreMs, perf.windowCoreSteps, 1000),
+};
+resetPerfWindow();
+renderPerfOverlay(perf.report);
+}
+function renderPerfOverlay(report){
+const fmt = (value) => value.toFixed(value < 10 ? 2 : 1);
+const section = (title, values, unit) => {
+const rows = Object.entries(values).sort((a, b) => b[1] - a[1]);
+if(!rows.length) return `${title}: –`;
+return `${title}\n` + rows.map(([name, value]) => `  ${name.padEnd(22)}${fmt(value).padStart(8)} ${unit}`).join('\n');
+};
+const frame = report.frame_ms;
+if(perfText){
+perfText.textContent = [
+`FPS ${report.fps.toFixed(1)} · ${numberFormatter.format(Math.round(report.steps_per_second))} steps/s`,
+`frame p50 ${fmt(frame.p50)} · p95 ${fmt(frame.p95)} · p99 ${fmt(frame.p99)} ms`,
+section('draw / frame', report.draw_ms_per_frame, 'ms'),
+section('tick / step', report.core_us_per_step, 'µs'),
+].join('\n');
+}
+drawPerfHistogram(frame);
+}
+function drawPerfHistogram(frame){
+if(!perfCtx) return;
+const {width, height} = perfCanvas;
+const labelHeight = 12;
+const plotHeight = height - labelHeight;
+const barWidth = width / PERF_HISTOGRAM_BINS;
+const peak = Math.max(1, ...frame.histogram);
+perfCtx.clearRect(0, 0, width, height);
+frame.histogram.forEach((count, bin) => {
+const upper = (bin + 1) * PERF_HISTOGRAM_BIN_MS;
+perfCtx.fillStyle = upper <= 18 ? '#66bb6a' : upper <= 34 ? '#ffca28' : '#ef5350';
+const barHeight = Math.round(count / peak * (plotHeight - 2));
+perfCtx.fillRect(bin * barWidth + 1, plotHeight - barHeight, barWidth - 2, barHeight);
+});
+perfCtx.fillStyle = '#9fd2ff';
+perfCtx.font = '10px Segoe UI';
+perfCtx.textBaseline = 'bottom';
+perfCtx.textAlign = 'left';
+perfCtx.fillText('0', 0, height);
+perfCtx.textAlign = 'right';
+perfCtx.fillText(`${PERF_HISTOGRAM_BINS * PERF_HISTOGRAM_BIN_MS - PERF_HISTOGRAM_BIN_MS}+ ms`, width, height);
+}
+function exportPerfSnapshot(){
+const simParams = {};
+for(const key in params){
+if(!CONTROL_PARAMS.has(key)) simParams[key] = params[key];
+}
+const snapshot = {
+captured_at: new Date().toISOString(),
+user_agent: navigator.userAgent,
+hardware_concurrency: navigator.hardwareConcurrency || null,
+device_pixel_ratio: window.devicePixelRatio || 1,
+canvas: {width: canvas.width, height: canvas.height},
+worker: typeof Worker !== 'undefined' && core instanceof Worker,
+running: started,
+day: state ? state.time_acc / SIM_TIME_UNITS_PER_DAY : 0,
+params: simParams,
+...(perf.report || frameTimeStats()),
+};
+const blob = new Blob([JSON.stringify(snapshot, null, 2)], {type: 'application/json'});
+const url = URL.createObjectURL(blob);
+const link = document.createElement('a');
+link.href = url;
+link.download = `invo-perf-${snapshot.captured_at.replace(/[:.]/g, '-')}.json`;
+document.body.appendChild(link);
+link.click();
+link.remove();
+setTimeout(() => URL.revokeObjectURL(url), 0);
+console.info('Performance snapshot', snapshot);
+}
+if(perfToggle){
+perfToggle.addEventListener('click', () => setPerfEnabled(!perf.enabled));
+}
+if(perfExportButton){
+perfExportButton.addEventListener('click', exportPerfSnapshot);
+}
+let frameId = null;
+function requestRender(){
+if(frameId !== null || document.hidden) return;
+frameId = requestAnimationFrame(renderFrame);
+}
+function renderFrame(timestamp){
+frameId = null;
+if(perf.enabled) perfFrameStart(timestamp);
+if(!state || fastForwarding) return;
+const alpha = started ? (snapshot_accumulator_ms + nowMs() - snapshot_received_ms) / base_interval_ms : 1;
+draw(alpha);
+drawSparklines();
+perfLap('sparklines');
+flushHud();
+if(perf.enabled){
+perfLap('hud_flush');
+perfFrameEnd();
+}
+if(started) requestRender();
+else perf.lastTimestamp = null;
+}
+document.addEventListener('visibilitychange', () => {
+const hidden = document.hidden;
+postToCore({type: 'visibility', hidden});
+if(hidden){
+if(frameId !== null) cancelAnimationFrame(frameId);
+frameId = null;
+perf.lastTimestamp = null;
+} else {
+requestRender();
+}
+});
+const CONTROL_PARAMS = new Set([
+'is_running', 'reset_token', 'persist_interval_ms', 'fast_forward_day', 'fast_forward_token',
+'telemetry_interval_ms', 'telemetry_session', 'telemetry_ack', 'timeline_keyframe_interval',
+]);
+let lastRenderParams = null;
+let lastFrameHeight = null;
+function sendToStreamlit(type, data={}){
+window.parent.postMessage({isStreamlitMessage: true, type, ...data}, '*');
+}
+function reportControls(){
+const telemetry = pendingTelemetry();
+if(telemetry.chunks.length) telemetrySentSeq = Math.max(telemetrySentSeq, telemetry.chunks[telemetry.chunks.length - 1].seq);
+journalUnreported = false;
+sendToStreamlit('streamlit:setComponentValue', {
+value: {running: started, reset_token: params.reset_token, telemetry, journal: sessionJournal()},
+dataType: 'json',
+});
+}
+function updateFrameHeight(){
+const height = Math.ceil(document.documentElement.scrollHeight || document.body.scrollHeight || 0);
+if(height === lastFrameHeight) return;
+lastFrameHeight = height;
+sendToStreamlit('streamlit:setFrameHeight', {height});
+}
+function boot(){
+started = Boolean(params.is_running);
+PERSIST_INTERVAL_MS = Math.max(250, Number(params.persist_interval_ms) || 2000);
+TELEMETRY_INTERVAL_MS = Math.max(1000, Number(params.telemetry_interval_ms) || 5000);
+TIMELINE_INTERVAL = Math.max(1, Math.round(Number(params.timeline_keyframe_interval) || 64));
+if(fastForwardInput && params.fast_forward_day) fastForwardInput.value = params.fast_forward_day;
+updateControlButtons();
+seedParticles();
+startCore();
+requestRender();
+startTelemetry();
+}
+function applyRenderParams(next){
+const previous = lastRenderParams;
+lastRenderParams = { ...next };
+Object.assign(params, next);
+if(!previous){
+boot();
+return;
+}
+const simChanged = Object.keys(next).some(key => !CONTROL_PARAMS.has(key) && next[key] !== previous[key]);
+if(simChanged) postToCore({type: 'params', params: { ...params }});
+if(next.reset_token !== previous.reset_token) resetGame();
+else if(next.is_running !== previous.is_running && Boolean(next.is_running) !== started) setRunning(Boolean(next.is_running));
+if(next.persist_interval_ms !== previous.persist_interval_ms){
+PERSIST_INTERVAL_MS = Math.max(250, Number(next.persist_interval_ms) || 2000);
+}
+acknowledgeTelemetry(next.telemetry_session, Number(next.telemetry_ack) || 0);
+if(next.telemetry_interval_ms !== previous.telemetry_interval_ms){
+TELEMETRY_INTERVAL_MS = Math.max(1000, Number(next.telemetry_interval_ms) || 5000);
+startTelemetry();
+}
+if(next.timeline_keyframe_interval !== previous.timeline_keyframe_interval){
+TIMELINE_INTERVAL = Math.max(1, Math.round(Number(next.timeline_keyframe_interval) || 64));
+postToCore({type: 'timeline', interval: TIMELINE_INTERVAL});
+}
+if(fastForwardInput && next.fast_forward_day !== previous.fast_forward_day) fastForwardInput.value = next.fast_forward_day;
+const fastForwardToken = Number(next.fast_forward_token) || 0;
+if(fastForwardToken > handled_fast_forward_token){
+handled_fast_forward_token = fastForwardToken;
+requestFastForward(next.fast_forward_day);
+}
+}
+window.addEventListener('message', (event) => {
+const msg = event.data || {};
+if(msg.type !== 'streamlit:render') return;
+const args = msg.args || {};
+if(args.params) applyRenderParams(args.params);
+updateFrameHeight();
+});
+window.addEventListener('resize', updateFrameHeight);
+if(typeof ResizeObserver !== 'undefined') new ResizeObserver(updateFrameHeight).observe(document.body);
+sendToStreamlit('streamlit:componentReady', {apiVersion: 1});
@@ -0,0 +1,595 @@
+# invo_engine.py
+"""Headless port of the embedded game's simulation loop.
+
+Every method on ``GameEngine`` mirrors the JS function of the same name in
+``invo_component/frontend/game.js`` and the state dict uses the same field names as
+``createInitialState()``, so a run here can be diffed field by field against a
+``window.name`` dump taken from the browser.
+"""
+import math
+
+# Simulation constants (keep in sync with the embedded JS)
+SIM_TIME_UNITS_PER_DAY = 1.0  # 1 unit = 1 in-game day
+TRUCK_LOADING_PORTION = 0.25
+SUPPLIER_UNIT_COST = 1.0
+WAREHOUSE_UNIT_COST = 1.1
+FG_UNIT_PRICE = 1.6
+MARKET_UNIT_PRICE = 1.9
+
+BASE_INTERVAL_MS = 120
+SPEED_FACTOR_MAP = {
+    "minute": 1.0,
+    "10-second": 6.0,
+    "second": 60.0,
+    "turbo-600x": 600.0,
+    "turbo-6000x": 6000.0,
+}
+
+SCENARIO_OPTIONS = ["Accurate forecast", "Biased forecast"]
+SPEED_OPTIONS = list(SPEED_FACTOR_MAP)
+DISTRIBUTION_OPTIONS = ["Normal", "Uniform"]
+
+# Same defaults as the sidebar sliders
+DEFAULT_PARAMS = {
+    "lead_time": 6.0,
+    "moq": 160,
+    "production_rate": 200,
+    "market_demand": 180,
+    "safety_stock": 180,
+    "fg_safety_stock": 160,
+    "initial_fg_stock": 200,
+    "factory_batch": 40,
+    "scenario": SCENARIO_OPTIONS[0],
+    "speed_unit": SPEED_OPTIONS[0],
+    "is_running": False,
+    "reset_token": 0,
+    "stochastic": False,
+    "seed": 1,
+    "demand_distribution": DISTRIBUTION_OPTIONS[0],
+    "demand_cv": 0.2,
+    "lead_time_distribution": DISTRIBUTION_OPTIONS[0],
+    "lead_time_cv": 0.25,
+}
+
+NUMERIC_FIELDS = (
+    "factory_stock",
+    "warehouse_stock",
+    "safety_stock",
+    "fg_safety_stock",
+    "finished_goods_stock",
+    "high_stock_threshold",
+    "fg_high_stock_threshold",
+    "worker_capacity",
+    "worker_progress",
+    "worker_load",
+    "backlog",
+    "truck_progress",
+    "truck_delivery",
+    "truck_wait_timer",
+    "truck_travel_minutes_total",
+    "truck_travel_minutes_remaining",
+    "production_plan_daily",
+    "supply_plan_daily",
+    "production_target_per_time_unit",
+    "chilled_truck_progress",
+    "chilled_truck_wait",
+    "score",
+    "time_acc",
+    "demand_factor",
+    "demand_day",
+    "truck_dispatches",
+)
+
+# Stochastic mode: each day's demand and each truck's lead time are scaled by max(0, 1 + cv * z), z a
+# zero-mean, unit-variance variate ("Normal" is Irwin-Hall, the sum of 12 uniforms minus 6; "Uniform"
+# spans +-sqrt(3)). Variates come from mulberry32 in blocks of RANDOM_BLOCK_SIZE, each block seeded
+# from (seed, stream, block index), so the draws match the JS core bit for bit.
+RANDOM_BLOCK_SIZE = 256
+STREAM_DEMAND = 1
+STREAM_LEAD_TIME = 2
+MASK32 = 0xFFFFFFFF
+
+
+def clamp(v, a, b):
+    return max(a, min(b, v))
+
+
+def safe_number(value, fallback=0.0):
+    if value is None:
+        return fallback
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return fallback
+    return num if math.isfinite(num) else fallback
+
+
+def mulberry32(seed):
+    """Uniform floats in [0, 1), the same sequence as the JS ``mulberry32``."""
+    a = seed & MASK32
+    while True:
+        a = (a + 0x6D2B79F5) & MASK32
+        t = a
+        t = ((t ^ (t >> 15)) * (t | 1)) & MASK32
+        t ^= (t + (((t ^ (t >> 7)) * (t | 61)) & MASK32)) & MASK32
+        yield ((t ^ (t >> 14)) & MASK32) / 4294967296
+
+
+def block_seed(seed, stream, block):
+    h = (seed ^ (stream * 0x9E3779B1) ^ ((block + 1) * 0x85EBCA77)) & MASK32
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & MASK32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & MASK32
+    h ^= h >> 16
+    return h
+
+
+def fill_variates(seed, distribution, size=RANDOM_BLOCK_SIZE):
+    draws = mulberry32(seed)
+    if distribution == "Uniform":
+        root3 = math.sqrt(3)
+        return [root3 * (2 * next(draws) - 1) for _ in range(size)]
+    values = []
+    for _ in range(size):
+        total = 0.0
+        for _ in range(12):
+            total += next(draws)
+        values.append(total - 6)
+    return values
+
+
+def resolve_speed_factor(unit):
+    return SPEED_FACTOR_MAP.get(unit, SPEED_FACTOR_MAP["minute"])
+
+
+def time_units_per_step(speed_unit, base_interval_ms=BASE_INTERVAL_MS):
+    return (base_interval_ms / 60000.0) * resolve_speed_factor(speed_unit)
+
+
+# Steps longer than this are sub-divided at events, and the score counts in units of it
+REFERENCE_STEP_UNITS = time_units_per_step("minute")
+
+
+def sanitize_state_numbers(state):
+    for key in NUMERIC_FIELDS:
+        value = state.get(key)
+        # runs every sub-step; finite floats, nearly every value, need no conversion
+        if type(value) is not float or value - value != 0.0:
+            state[key] = safe_number(value, 0.0)
+    state["worker_progress"] = clamp(state["worker_progress"], 0.0, 1.0)
+    state["truck_progress"] = clamp(state["truck_progress"], 0.0, 1.0)
+    state["chilled_truck_progress"] = clamp(state["chilled_truck_progress"], 0.0, 1.0)
+
+    state["worker_direction"] = 1 if safe_number(state.get("worker_direction"), 1) >= 0 else -1
+    state["truck_en_route"] = bool(state.get("truck_en_route"))
+    state["production_shutdown"] = bool(state.get("production_shutdown"))
+    state["supplier_unlimited"] = state.get("supplier_unlimited") is not False
+
+
+def update_planning_targets(state, params):
+    sanitize_state_numbers(state)
+    demand = max(0.0, safe_number(params.get("market_demand"), 0))
+    initial_fg = max(0.0, safe_number(params.get("initial_fg_stock"), 0))
+    fg_safety = max(0.0, state["fg_safety_stock"])
+    raw_safety = max(0.0, state["safety_stock"])
+    current_fg = max(0.0, safe_number(state["finished_goods_stock"], initial_fg))
+    backlog = max(0.0, state["backlog"])
+
+    deficit = max(0.0, fg_safety - current_fg)
+    production_plan = max(0.0, demand + deficit + backlog)
+    supply_plan = max(0.0, production_plan + raw_safety)
+
+    state["production_plan_daily"] = production_plan
+    state["supply_plan_daily"] = supply_plan
+    state["production_target_per_time_unit"] = production_plan / max(1.0, SIM_TIME_UNITS_PER_DAY)
+
+
+def sync_param_driven_state(state, params):
+    state["safety_stock"] = params["safety_stock"]
+    state["fg_safety_stock"] = params["fg_safety_stock"]
+    state["worker_capacity"] = max(1, params["factory_batch"])
+    state["fg_high_stock_threshold"] = max(
+        state["fg_safety_stock"] * 2.0,
+        (params.get("initial_fg_stock") or 0) + max(0, params["market_demand"]) * 2.0,
+    )
+    update_planning_targets(state, params)
+
+
+def create_initial_state(params):
+    state = {
+        "factory_stock": 240.0,
+        "warehouse_stock": 520.0,
+        "supplier_stock": None,
+        "safety_stock": params["safety_stock"],
+        "fg_safety_stock": params["fg_safety_stock"],
+        "high_stock_threshold": 800.0,
+        "fg_high_stock_threshold": 600.0,
+        "worker_capacity": max(1, params["factory_batch"]),
+        "worker_progress": 0.0,
+        "worker_direction": 1,
+        "worker_load": 0.0,
+        "finished_goods_stock": max(0, params.get("initial_fg_stock") or 0),
+        "backlog": 0.0,
+        "truck_en_route": False,
+        "truck_progress": 0.0,
+        "truck_delivery": 0.0,
+        "truck_wait_timer": 0.0,
+        "truck_travel_minutes_total": 0.0,
+        "truck_travel_minutes_remaining": 0.0,
+        "production_shutdown": False,
+        "score": 0,
+        "time_acc": 0,
+        "chilled_truck_progress": 0.0,
+        "chilled_truck_direction": 1,
+        "chilled_truck_wait": 0.0,
+        "pending_supermarket_burst": False,
+        "money_particles": [],
+        "production_plan_daily": 0.0,
+        "supply_plan_daily": 0.0,
+        "production_target_per_time_unit": 0.0,
+        "supplier_unlimited": True,
+        # stochastic mode: today's demand multiplier, the day it was drawn for, trucks sent so far
+        "demand_factor": 1.0,
+        "demand_day": -1,
+        "truck_dispatches": 0,
+    }
+    sanitize_state_numbers(state)
+    update_planning_targets(state, params)
+    return state
+
+
+def compute_financial_snapshot(state, params):
+    supplier_outstanding = max(0.0, state["truck_delivery"] if state["truck_en_route"] else 0.0)
+    warehouse_stock = max(0.0, state["warehouse_stock"])
+    finished_goods = max(0.0, state["finished_goods_stock"])
+    daily_demand = max(0.0, safe_number(params.get("market_demand"), 0))
+
+    accounts_payable = supplier_outstanding * SUPPLIER_UNIT_COST + warehouse_stock * WAREHOUSE_UNIT_COST
+    accounts_receivable = finished_goods * FG_UNIT_PRICE + daily_demand * MARKET_UNIT_PRICE
+    return {
+        "accounts_payable": accounts_payable,
+        "accounts_receivable": accounts_receivable,
+        "net_cash_flow": accounts_receivable - accounts_payable,
+    }
+
+
+class GameEngine:
+    """Scalar simulation of one game session, stepped like the JS ``tick()``.
+
+    ``params`` uses the same keys as the dict the app passes to the embedded
+    game. Rendering-only work (money particles, sounds) is skipped.
+    """
+
+    def __init__(self, params=None, state=None):
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.time_units_per_step = time_units_per_step(self.params["speed_unit"])
+        self.substep_units = self.time_units_per_step
+        self.substep_start = 0.0
+        self.biased = self.params["scenario"] == "Biased forecast"
+        self._variate_blocks = {}
+        if state is None:
+            self.state = create_initial_state(self.params)
+        else:
+            self.state = {**create_initial_state(self.params), **state}
+            sanitize_state_numbers(self.state)
+            update_planning_targets(self.state, self.params)
+        self.sync_random_params()
+        self.steps = 0
+
+    def set_params(self, **changes):
+        self.params.update(changes)
+        self.time_units_per_step = time_units_per_step(self.params["speed_unit"])
+        self.biased = self.params["scenario"] == "Biased forecast"
+        self.sync_random_params()
+
+    def sync_random_params(self):
+        p = self.params
+        self.stochastic = bool(p.get("stochastic"))
+        self.seed = int(safe_number(p.get("seed"), 0)) & MASK32
+        self.demand_distribution = p.get("demand_distribution") or "Normal"
+        self.demand_cv = max(0.0, safe_number(p.get("demand_cv"), 0))
+        self.lead_time_distribution = p.get("lead_time_distribution") or "Normal"
+        self.lead_time_cv = max(0.0, safe_number(p.get("lead_time_cv"), 0))
+        # today's demand is drawn again under the new settings
+        self.state["demand_day"] = -1
+        if not self.stochastic:
+            self.state["demand_factor"] = 1.0
+
+    def random_factor(self, stream, index, distribution, cv):
+        block = index // RANDOM_BLOCK_SIZE
+        key = (self.seed, block, distribution)
+        cached = self._variate_blocks.get(stream)
+        if cached is None or cached[0] != key:
+            cached = (key, fill_variates(block_seed(self.seed, stream, block), distribution))
+            self._variate_blocks[stream] = cached
+        return max(0.0, 1 + cv * cached[1][index - block * RANDOM_BLOCK_SIZE])
+
+    def update_demand_draw(self):
+        day = math.floor(self.substep_start / SIM_TIME_UNITS_PER_DAY + 1e-9)
+        if day == self.state["demand_day"]:
+            return
+        self.state["demand_day"] = day
+        self.state["demand_factor"] = self.random_factor(STREAM_DEMAND, day, self.demand_distribution, self.demand_cv)
+
+    # Utility calculations
+    def production_requirement_per_time_unit(self):
+        per_unit = max(0.0, self.state["production_target_per_time_unit"])
+        if self.biased:
+            per_unit *= 1.2
+        return per_unit
+
+    def market_demand_per_time_unit(self):
+        per_unit = max(0.0, self.params["market_demand"]) / max(1.0, SIM_TIME_UNITS_PER_DAY)
+        if self.biased:
+            per_unit *= 1.3
+        return per_unit * self.state["demand_factor"]
+
+    def compute_reorder_point(self):
+        lead_days = max(0.0, self.params["lead_time"])
+        lead_demand = self.production_requirement_per_time_unit() * lead_days * SIM_TIME_UNITS_PER_DAY
+        return max(0.0, self.state["safety_stock"] + lead_demand)
+
+    # Simulation steps
+    def apply_production(self):
+        s = self.state
+        if s["production_shutdown"]:
+            return
+        per_step = self.production_requirement_per_time_unit() * self.substep_units
+        if per_step <= 0:
+            return
+        actual = min(per_step, max(0.0, s["factory_stock"]))
+        if actual <= 0:
+            return
+        s["factory_stock"] = max(0.0, s["factory_stock"] - actual)
+        s["finished_goods_stock"] += actual
+        if s["backlog"] > 0 and s["finished_goods_stock"] > 0:
+            fulfill = min(s["finished_goods_stock"], s["backlog"])
+            s["finished_goods_stock"] -= fulfill
+            s["backlog"] -= fulfill
+
+    def apply_market_demand(self):
+        s = self.state
+        per_step = self.market_demand_per_time_unit() * self.substep_units
+        if per_step <= 0:
+            return
+        if s["finished_goods_stock"] >= per_step:
+            s["finished_goods_stock"] -= per_step
+        else:
+            s["backlog"] += per_step - s["finished_goods_stock"]
+            s["finished_goods_stock"] = 0.0
+
+    def compute_worker_speed(self):
+        s = self.state
+        per_unit = self.production_requirement_per_time_unit()
+        capacity = max(0.0, s["worker_capacity"])
+        if capacity <= 0:
+            return 0.0
+
+        half_trip_units = None
+        if per_unit > 0:
+            cycle_units = 1.0 / (per_unit / capacity)
+            half_trip_units = max(self.substep_units, cycle_units / 2.0)
+        elif s["worker_direction"] == -1 and s["worker_progress"] > 0:
+            half_trip_units = 0.5
+        elif s["worker_direction"] == 1 and s["worker_progress"] < 1:
+            half_trip_units = 0.5
+
+        if half_trip_units is None or not math.isfinite(half_trip_units) or half_trip_units <= 0:
+            return 0.0
+        return clamp(self.substep_units / half_trip_units, 0.0, 1.0)
+
+    def move_worker(self):
+        s = self.state
+        speed = self.compute_worker_speed()
+        if s["worker_direction"] == 1:
+            if s["worker_progress"] < 1.0:
+                s["worker_progress"] = min(1.0, s["worker_progress"] + speed)
+            if abs(s["worker_progress"] - 1.0) < 1e-3:
+                if s["warehouse_stock"] > 0:
+                    take = min(s["worker_capacity"], s["warehouse_stock"])
+                    s["worker_load"] = take
+                    s["warehouse_stock"] -= take
+                else:
+                    s["worker_load"] = 0.0
+                s["worker_direction"] = -1
+        else:
+            if s["worker_progress"] > 0.0:
+                s["worker_progress"] = max(0.0, s["worker_progress"] - speed)
+            if abs(s["worker_progress"]) < 1e-3:
+                if s["worker_load"] > 0:
+                    s["factory_stock"] += s["worker_load"]
+                    s["worker_load"] = 0.0
+                s["worker_direction"] = 1
+
+    def handle_replenishment(self):
+        s = self.state
+        if s["truck_en_route"]:
+            return
+        raw_on_hand = s["factory_stock"] + s["warehouse_stock"]
+        target_raw = max(0.0, s["supply_plan_daily"])
+        if raw_on_hand > max(target_raw, self.compute_reorder_point()):
+            return
+
+        s["truck_en_route"] = True
+        s["truck_progress"] = 0.0
+
+        lead_time_days = max(0.1, self.params["lead_time"])
+        if self.stochastic:
+            factor = self.random_factor(
+                STREAM_LEAD_TIME, int(s["truck_dispatches"]), self.lead_time_distribution, self.lead_time_cv
+            )
+            lead_time_days = max(0.1, self.params["lead_time"] * factor)
+        s["truck_dispatches"] += 1
+        lead_time_units = lead_time_days * SIM_TIME_UNITS_PER_DAY
+        loading_units = lead_time_units * TRUCK_LOADING_PORTION
+        travel_units = max(self.substep_units, lead_time_units - loading_units)
+        s["truck_wait_timer"] = loading_units
+        s["truck_travel_minutes_total"] = travel_units
+        s["truck_travel_minutes_remaining"] = travel_units
+
+        needed = max(0.0, target_raw - raw_on_hand)
+        request_amount = max(self.params["moq"], needed)
+        if request_amount <= 0:
+            request_amount = max(self.params["moq"], target_raw)
+        s["truck_delivery"] = request_amount
+
+    def move_truck(self):
+        s = self.state
+        if not s["truck_en_route"]:
+            return
+        travel_dt = self.substep_units
+        if s["truck_wait_timer"] > 0:
+            # only the part of the step left after loading counts as travel
+            loading = min(s["truck_wait_timer"], travel_dt)
+            s["truck_wait_timer"] = max(0.0, s["truck_wait_timer"] - loading)
+            travel_dt -= loading
+            if s["truck_wait_timer"] > 0 or travel_dt <= 0:
+                return
+        if s["truck_travel_minutes_total"] <= 0:
+            self.complete_truck()
+            return
+        s["truck_travel_minutes_remaining"] = max(0.0, s["truck_travel_minutes_remaining"] - travel_dt)
+        prog = travel_dt / max(1e-6, s["truck_travel_minutes_total"])
+        s["truck_progress"] = min(1.0, s["truck_progress"] + prog)
+        if s["truck_travel_minutes_remaining"] <= 0.0 or abs(s["truck_progress"] - 1.0) < 1e-3:
+            self.complete_truck()
+
+    def complete_truck(self):
+        s = self.state
+        if s["truck_delivery"] > 0:
+            s["warehouse_stock"] += s["truck_delivery"]
+        s["truck_en_route"] = False
+        s["truck_progress"] = 0.0
+        s["truck_delivery"] = 0.0
+        s["truck_wait_timer"] = 0.0
+        s["truck_travel_minutes_total"] = 0.0
+        s["truck_travel_minutes_remaining"] = 0.0
+
+    def move_chilled_truck(self):
+        s = self.state
+        base_speed = clamp(self.time_units_per_step / 6.0, 0.01, 0.06)
+        if s["chilled_truck_wait"] > 0:
+            s["chilled_truck_wait"] = max(0.0, s["chilled_truck_wait"] - self.time_units_per_step)
+            return
+
+        s["chilled_truck_progress"] = clamp(
+            s["chilled_truck_progress"] + base_speed * s["chilled_truck_direction"], 0.0, 1.0
+        )
+        if s["chilled_truck_direction"] == 1 and s["chilled_truck_progress"] >= 1.0:
+            s["chilled_truck_progress"] = 1.0
+            s["chilled_truck_direction"] = -1
+            s["chilled_truck_wait"] = 0.4
+            s["pending_supermarket_burst"] = True
+        elif s["chilled_truck_direction"] == -1 and s["chilled_truck_progress"] <= 0.0:
+            s["chilled_truck_progress"] = 0.0
+            s["chilled_truck_direction"] = 1
+            s["chilled_truck_wait"] = 0.3
+
+    def apply_scenario_effects(self):
+        s = self.state
+        if self.biased:
+            if s["factory_stock"] < max(40.0, s["safety_stock"] * 0.5):
+                s["production_shutdown"] = True
+            if s["production_shutdown"] and s["factory_stock"] > s["safety_stock"] + 60:
+                s["production_shutdown"] = False
+        else:
+            s["production_shutdown"] = False
+
+    def update_score(self, weight=1.0):
+        """``weight`` is the sub-step length in reference steps, so the score does not depend on speed."""
+        s = self.state
+        step = 0
+        if not s["production_shutdown"]:
+            step += 1
+        if s["factory_stock"] <= 0 or s["factory_stock"] < s["safety_stock"]:
+            step -= 1
+        if s["warehouse_stock"] <= 0 or s["warehouse_stock"] < s["safety_stock"]:
+            step -= 1
+        if s["warehouse_stock"] >= self.compute_reorder_point():
+            step += 1
+        s["score"] += step * weight
+
+    # Adaptive sub-stepping
+    def time_to_next_event(self):
+        s = self.state
+        horizon = math.inf
+        if s["truck_en_route"]:
+            left = s["truck_wait_timer"] if s["truck_wait_timer"] > 0 else s["truck_travel_minutes_remaining"]
+            if left > 0:
+                horizon = min(horizon, left)
+        per_unit = self.production_requirement_per_time_unit()
+        capacity = max(0.0, s["worker_capacity"])
+        distance = 1.0 - s["worker_progress"] if s["worker_direction"] == 1 else s["worker_progress"]
+        if capacity > 0 and distance > 0:
+            half_trip_units = (1.0 / (per_unit / capacity)) / 2.0 if per_unit > 0 else 0.5
+            horizon = min(horizon, distance * half_trip_units)
+        if not s["truck_en_route"] and not s["production_shutdown"] and s["factory_stock"] > 0 and per_unit > 0:
+            trigger = max(s["supply_plan_daily"], self.compute_reorder_point())
+            slack = s["factory_stock"] + s["warehouse_stock"] - trigger
+            if slack > 0:
+                horizon = min(horizon, slack / per_unit)
+        if self.stochastic:
+            # demand is redrawn at every day boundary
+            next_day = (math.floor(self.substep_start / SIM_TIME_UNITS_PER_DAY + 1e-9) + 1) * SIM_TIME_UNITS_PER_DAY
+            horizon = min(horizon, next_day - self.substep_start)
+        return horizon
+
+    def next_substep_units(self, remaining):
+        if remaining <= REFERENCE_STEP_UNITS:
+            return remaining
+        h = max(REFERENCE_STEP_UNITS, self.time_to_next_event())
+        return remaining if h >= remaining - REFERENCE_STEP_UNITS * 1e-6 else h
+
+    # Main tick
+    def tick(self):
+        sync_param_driven_state(self.state, self.params)
+        remaining = self.time_units_per_step
+        elapsed = 0.0
+        first = True
+        while remaining > 0:
+            if not first:
+                update_planning_targets(self.state, self.params)
+            first = False
+            self.substep_start = self.state["time_acc"] + elapsed
+            if self.stochastic:
+                self.update_demand_draw()
+            self.substep_units = self.next_substep_units(remaining)
+            remaining -= self.substep_units
+            elapsed += self.substep_units
+            self.apply_production()
+            self.apply_market_demand()
+            self.move_worker()
+            self.handle_replenishment()
+            self.move_truck()
+            self.apply_scenario_effects()
+            self.update_score(self.substep_units / REFERENCE_STEP_UNITS)
+        # cosmetic: once per rendered step
+        self.move_chilled_truck()
+        self.state["time_acc"] += self.time_units_per_step  # in-game clock
+        # the page turns the pending burst into money particles after every snapshot
+        self.state["pending_supermarket_burst"] = False
+        self.steps += 1
+
+    def run(self, steps):
+        for _ in range(int(steps)):
+            self.tick()
+        return self.state
+
+    def steps_for_days(self, days):
+        return int(math.ceil(max(0.0, days) / self.time_units_per_step))
+
+    def run_days(self, days):
+        return self.run(self.steps_for_days(days))
+
+    def fast_forward_to_day(self, day):
+        """Tick until the in-game clock reaches ``day``, like the game's fast-forward."""
+        target = max(0.0, day) * SIM_TIME_UNITS_PER_DAY - 1e-9
+        steps = 0
+        while self.state["time_acc"] < target:
+            self.tick()
+            steps += 1
+        return steps
+
+    def financial_snapshot(self):
+        return compute_financial_snapshot(self.state, self.params)
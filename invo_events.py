@@ -0,0 +1,413 @@
+# invo_events.py
+"""Discrete-event simulation of the game in continuous time.
+
+``GameEngine`` plays the JS ``tick()`` one step at a time. ``EventEngine``
+plays the same model with the step taken to zero. Between events every
+quantity has a closed form, and the engine jumps from event to event
+through a priority queue.
+
+The plan is ``d + max(0, S - y)``, where ``d`` is the market demand, ``S``
+the FG safety stock and ``y`` finished goods net of backlog. While the
+factory produces, it drains at ``g`` times the plan (``g`` is the biased
+scenario's 1.2) and ``y`` moves at that rate minus the demand. That is
+linear above ``S`` and relaxes exponentially below it. With production
+stopped, ``y`` falls at the demand rate. The forklift travels two legs per
+``worker_capacity`` of planned production. So the stocks, the plan, the
+forklift's travel and every threshold take the form
+a + b*t + c*t**2 + e*exp(-s*t) between events.
+
+The events are:
+
+- truck arrivals, queued at dispatch;
+- forklift pickups and drop-offs;
+- the dispatch trigger and the reorder point (which sets the score's
+  warehouse bonus) crossing the stocks;
+- the factory running dry, crossing its safety stock or, in the biased
+  scenario, the shutdown level;
+- ``y`` crossing ``S``, where the plan changes form.
+
+Each of these is solved for in closed form and pushed on the queue. A run
+costs O(events) whatever its length, and the results do not depend on a
+step size. ``GameEngine`` converges to them as its step shrinks. At
+"minute" a forklift leg lasts a whole number of steps, so the two part
+most where legs are short: a small factory batch against a high demand.
+The score is counted in reference steps like ``GameEngine``'s.
+
+Only the deterministic model with a non-negative safety stock is covered;
+stochastic runs go through ``GameEngine``. The chilled truck and money
+particles are animation only and are not played.
+"""
+import heapq
+import math
+
+from invo_engine import (
+    DEFAULT_PARAMS,
+    REFERENCE_STEP_UNITS,
+    SIM_TIME_UNITS_PER_DAY,
+    TRUCK_LOADING_PORTION,
+    compute_financial_snapshot,
+    create_initial_state,
+    safe_number,
+    sync_param_driven_state,
+)
+
+# Animation state GameEngine keeps that events do not advance
+RENDER_ONLY_FIELDS = (
+    "chilled_truck_progress",
+    "chilled_truck_direction",
+    "chilled_truck_wait",
+    "pending_supermarket_burst",
+    "money_particles",
+)
+# Queue entries, in the order events at the same instant are applied (tick()'s order)
+_LEG, _CROSSING, _ARRIVAL, _STOP = range(4)
+# Bisection rounds for an event time; brackets it to well below a float's resolution
+_BISECTIONS = 100
+# move_worker() ends a leg this close to its end and turns round from there
+_LEG_TOLERANCE = 1e-3
+
+
+class _Curve:
+    """f(t) = a + b*t + c*t**2 + e*exp(-s*t) in the time t since the last event.
+
+    Every quantity between events has this shape with either ``c`` or ``e``
+    zero, so it has at most one extremum.
+    """
+
+    __slots__ = ("a", "b", "c", "e", "s")
+
+    def __init__(self, a=0.0, b=0.0, c=0.0, e=0.0, s=0.0):
+        self.a, self.b, self.c, self.e, self.s = a, b, c, e, s
+
+    def __call__(self, t):
+        value = self.a + t * (self.b + self.c * t)
+        if self.e:
+            value += self.e * math.exp(-self.s * t)
+        return value
+
+    def plus(self, other, scale=1.0):
+        s = self.s if self.e else other.s
+        return _Curve(
+            self.a + scale * other.a,
+            self.b + scale * other.b,
+            self.c + scale * other.c,
+            self.e + scale * other.e,
+            s,
+        )
+
+    def shifted(self, offset):
+        return _Curve(self.a + offset, self.b, self.c, self.e, self.s)
+
+    def extremum(self):
+        if self.e and self.s:
+            ratio = self.b / (self.s * self.e)
+            if ratio > 0:
+                return -math.log(ratio) / self.s
+            return None
+        if self.c:
+            return -self.b / (2.0 * self.c)
+        return None
+
+    def first_crossing(self, horizon):
+        """First t in (0, horizon] where f reaches zero or the side of it f does not start on.
+
+        Where f starts at zero, the side it starts on is the one it moves into.
+        """
+        if not (self.b or self.c or self.e) or horizon <= 0:
+            return None
+        points = [0.0]
+        turn = self.extremum()
+        if turn is not None and 0 < turn < horizon:
+            points.append(turn)
+        points.append(horizon)
+        side = self(0.0)
+        if side == 0.0:
+            # f is monotone up to points[1]
+            side = self(points[1])
+            if side == 0.0:
+                return None
+        positive = side > 0
+
+        def crossed(t):
+            value = self(t)
+            return value == 0.0 or (value > 0) != positive
+
+        for lo, hi in zip(points, points[1:]):
+            if not crossed(hi):
+                continue
+            # f is monotone between lo (not crossed) and hi (crossed): bisect
+            for _ in range(_BISECTIONS):
+                mid = 0.5 * (lo + hi)
+                if not lo < mid < hi:
+                    break
+                if crossed(mid):
+                    hi = mid
+                else:
+                    lo = mid
+            return hi
+        return None
+
+
+class EventEngine:
+    """Event-driven simulation of one game session in continuous time.
+
+    ``params`` uses the same keys as ``GameEngine``; ``speed_unit`` does not
+    apply. ``events`` counts the events played so far.
+    """
+
+    def __init__(self, params=None):
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        if params.get("stochastic"):
+            raise ValueError("EventEngine runs the deterministic model only; use GameEngine for stochastic runs")
+        if safe_number(params["safety_stock"], 0) < 0:
+            raise ValueError("EventEngine needs a non-negative safety_stock")
+        self.params = params
+        self.biased = params["scenario"] == "Biased forecast"
+        self.gain = 1.2 if self.biased else 1.0
+        self.demand = max(0.0, safe_number(params["market_demand"], 0)) / max(1.0, SIM_TIME_UNITS_PER_DAY)
+        self.demand_rate = self.demand * (1.3 if self.biased else 1.0)
+        self.lead_days = max(0.0, params["lead_time"])
+
+        self._state = create_initial_state(params)
+        sync_param_driven_state(self._state, params)
+        s = self._state
+        self.fg_safety = max(0.0, s["fg_safety_stock"])
+        self.safety = s["safety_stock"]
+        self.capacity = max(0.0, s["worker_capacity"])
+        self.net = s["finished_goods_stock"] - s["backlog"]
+        self.time = 0.0
+        self.events = 0
+        self._arrival_time = None
+        self._dispatch_time = 0.0
+        self._queue = []
+        self._order = 0
+        self._epoch = 0
+        self._segment = None
+        self._apply_instant_rules()
+
+    # Public API
+    def run_until(self, end_time):
+        """Play every event up to ``end_time`` (in days) and stop there."""
+        if end_time <= self.time:
+            return self.state
+        self._push(end_time, _STOP)
+        while True:
+            if self._segment is None:
+                self._plan()
+            time, kind, _, epoch, elapsed = heapq.heappop(self._queue)
+            if epoch is not None and epoch != self._epoch:
+                continue  # predicted from a state that has since changed
+            # a prediction keeps its exact offset, so the state lands on the side of the threshold it crossed to
+            self._advance(time - self.time if elapsed is None else elapsed)
+            if kind == _STOP:
+                return self.state
+            self.events += 1
+            if kind == _ARRIVAL:
+                self._complete_truck()
+            elif kind == _LEG:
+                self._end_leg()
+            self._apply_instant_rules()
+
+    def run_days(self, days):
+        return self.run_until(self.time + max(0.0, days))
+
+    @property
+    def state(self):
+        """Current state using the JS field names, without the animation-only fields."""
+        return {key: value for key, value in self._state.items() if key not in RENDER_ONLY_FIELDS}
+
+    def financial_snapshot(self):
+        return compute_financial_snapshot(self._state, self.params)
+
+    # Queue
+    def _push(self, time, kind, epoch=None, elapsed=None):
+        self._order += 1
+        heapq.heappush(self._queue, (time, kind, self._order, epoch, elapsed))
+
+    def _plan(self):
+        """Work out the curves up to the next event and queue that event."""
+        s = self._state
+        d, big_s, g, demand = self.demand, self.fg_safety, self.gain, self.demand_rate
+        y0 = self.net
+        factory = s["factory_stock"]
+        plan0 = d + max(0.0, big_s - y0)
+        producing = not s["production_shutdown"] and factory > 0 and plan0 > 0
+        slope = (g * d if producing else 0.0) - demand
+        upper = y0 > big_s or (y0 == big_s and slope >= 0)
+
+        # net finished goods, plan and planned production since the last event
+        if upper:
+            net = _Curve(a=y0, b=slope)
+            plan = _Curve(a=d)
+            planned = _Curve(b=g * d)
+        elif producing:
+            settle = d + big_s - demand / g
+            net = _Curve(a=settle, e=y0 - settle, s=g)
+            plan = _Curve(a=demand / g, e=settle - y0, s=g)
+            planned = _Curve(a=settle - y0, b=demand, e=y0 - settle, s=g)
+        else:
+            net = _Curve(a=y0, b=-demand)
+            plan = _Curve(a=d + big_s - y0, b=demand)
+            planned = _Curve(b=g * (d + big_s - y0), c=g * demand / 2.0)
+        factory_curve = _Curve(a=factory).plus(planned, -1.0) if producing else _Curve(a=factory)
+
+        # forklift: a leg per half of capacity / planned production, or a half day per leg with no plan
+        if self.capacity <= 0:
+            travel = None
+        elif plan0 > 0:
+            travel = _Curve().plus(planned, 2.0 / self.capacity)
+        else:
+            travel = _Curve(b=2.0 * SIM_TIME_UNITS_PER_DAY)
+        self._segment = (net, plan, factory_curve if producing else None, travel)
+
+        warehouse = s["warehouse_stock"]
+        lead_cover = g * self.lead_days * SIM_TIME_UNITS_PER_DAY
+        crossings = [
+            net.shifted(-big_s),
+            _Curve(a=warehouse - self.safety).plus(plan, -lead_cover),
+        ]
+        if producing:
+            crossings += [factory_curve, factory_curve.shifted(-self.safety)]
+            if self.biased:
+                crossings.append(factory_curve.shifted(-max(40.0, self.safety * 0.5)))
+        if not s["truck_en_route"]:
+            crossings.append(
+                factory_curve.shifted(warehouse - self.safety).plus(plan, -max(1.0, lead_cover / SIM_TIME_UNITS_PER_DAY))
+            )
+        # earlier predictions are stale now; the first live entry bounds the search
+        self._epoch += 1
+        while self._queue[0][3] is not None:
+            heapq.heappop(self._queue)
+        horizon = self._queue[0][0] - self.time
+        if travel is not None:
+            left = 1.0 - s["worker_progress"] if s["worker_direction"] == 1 else s["worker_progress"]
+            leg = travel.shifted(_LEG_TOLERANCE - left).first_crossing(horizon) if left > _LEG_TOLERANCE else 0.0
+            if leg is not None:
+                self._push(self.time + leg, _LEG, self._epoch, leg)
+                horizon = leg
+        crossing = None
+        for curve in crossings:
+            found = curve.first_crossing(horizon)
+            if found is not None and found < horizon:
+                crossing = horizon = found
+        if crossing is not None:
+            self._push(self.time + crossing, _CROSSING, self._epoch, crossing)
+
+    # Between events
+    def _advance(self, elapsed):
+        """Move the continuous state ``elapsed`` days along the planned curves."""
+        # the events the segment was planned up to are due now, so it is spent even if no time passes
+        net, plan, factory_curve, travel = self._segment
+        self._segment = None
+        if elapsed <= 0:
+            return
+        s = self._state
+        self._count_score(elapsed, plan, factory_curve)
+        self.net = net(elapsed)
+        s["finished_goods_stock"] = max(0.0, self.net)
+        s["backlog"] = max(0.0, -self.net)
+        if factory_curve is not None:
+            s["factory_stock"] = max(0.0, factory_curve(elapsed))
+        if travel is not None:
+            s["worker_progress"] = min(1.0, max(0.0, s["worker_progress"] + s["worker_direction"] * travel(elapsed)))
+        self.time += elapsed
+        s["time_acc"] = self.time
+        self._set_plan(plan(elapsed))
+        if s["truck_en_route"]:
+            self._update_truck()
+
+    def _count_score(self, elapsed, plan, factory_curve):
+        """Add the score over ``elapsed`` days; the rate holds between events, so take it mid-way."""
+        s = self._state
+        mid = elapsed / 2.0
+        factory = max(0.0, factory_curve(mid)) if factory_curve is not None else s["factory_stock"]
+        warehouse = s["warehouse_stock"]
+        reorder_point = max(0.0, self.safety + self.gain * plan(mid) * self.lead_days * SIM_TIME_UNITS_PER_DAY)
+        rate = (
+            (0 if s["production_shutdown"] else 1)
+            - (factory <= 0 or factory < self.safety)
+            - (warehouse <= 0 or warehouse < self.safety)
+            + (warehouse >= reorder_point)
+        )
+        s["score"] += rate * elapsed / REFERENCE_STEP_UNITS
+
+    def _set_plan(self, plan):
+        s = self._state
+        s["production_plan_daily"] = plan
+        s["supply_plan_daily"] = plan + max(0.0, self.safety)
+        s["production_target_per_time_unit"] = plan / max(1.0, SIM_TIME_UNITS_PER_DAY)
+
+    def _update_truck(self):
+        s = self._state
+        since = self.time - self._dispatch_time
+        loading = self._truck_lead_units() * TRUCK_LOADING_PORTION
+        travelled = max(0.0, since - loading)
+        s["truck_wait_timer"] = max(0.0, loading - since)
+        s["truck_travel_minutes_remaining"] = max(0.0, s["truck_travel_minutes_total"] - travelled)
+        s["truck_progress"] = min(1.0, travelled / max(1e-6, s["truck_travel_minutes_total"]))
+
+    def _truck_lead_units(self):
+        return max(0.1, self.params["lead_time"]) * SIM_TIME_UNITS_PER_DAY
+
+    # Events
+    def _end_leg(self):
+        s = self._state
+        if s["worker_direction"] == 1:
+            take = min(s["worker_capacity"], s["warehouse_stock"]) if s["warehouse_stock"] > 0 else 0.0
+            s["worker_load"] = take
+            s["warehouse_stock"] -= take
+            s["worker_direction"] = -1
+        else:
+            if s["worker_load"] > 0:
+                s["factory_stock"] += s["worker_load"]
+                s["worker_load"] = 0.0
+            s["worker_direction"] = 1
+
+    def _complete_truck(self):
+        s = self._state
+        if s["truck_delivery"] > 0:
+            s["warehouse_stock"] += s["truck_delivery"]
+        s["truck_en_route"] = False
+        s["truck_progress"] = 0.0
+        s["truck_delivery"] = 0.0
+        s["truck_wait_timer"] = 0.0
+        s["truck_travel_minutes_total"] = 0.0
+        s["truck_travel_minutes_remaining"] = 0.0
+        self._arrival_time = None
+
+    def _apply_instant_rules(self):
+        """Dispatch and shutdown as handle_replenishment and apply_scenario_effects decide them now."""
+        s = self._state
+        plan = s["production_plan_daily"]
+        if not s["truck_en_route"]:
+            raw_on_hand = s["factory_stock"] + s["warehouse_stock"]
+            target_raw = max(0.0, s["supply_plan_daily"])
+            reorder_point = max(0.0, self.safety + self.gain * plan * self.lead_days * SIM_TIME_UNITS_PER_DAY)
+            if raw_on_hand <= max(target_raw, reorder_point):
+                self._dispatch(raw_on_hand, target_raw)
+        if self.biased:
+            if s["factory_stock"] < max(40.0, self.safety * 0.5):
+                s["production_shutdown"] = True
+            if s["production_shutdown"] and s["factory_stock"] > self.safety + 60:
+                s["production_shutdown"] = False
+        else:
+            s["production_shutdown"] = False
+        self._segment = None
+
+    def _dispatch(self, raw_on_hand, target_raw):
+        s = self._state
+        lead = self._truck_lead_units()
+        loading = lead * TRUCK_LOADING_PORTION
+        s["truck_en_route"] = True
+        s["truck_progress"] = 0.0
+        s["truck_dispatches"] += 1
+        s["truck_wait_timer"] = loading
+        s["truck_travel_minutes_total"] = lead - loading
+        s["truck_travel_minutes_remaining"] = lead - loading
+        request_amount = max(self.params["moq"], max(0.0, target_raw - raw_on_hand))
+        if request_amount <= 0:
+            request_amount = max(self.params["moq"], target_raw)
+        s["truck_delivery"] = request_amount
+        self._dispatch_time = self.time
+        self._arrival_time = self.time + lead
+        self._push(self._arrival_time, _ARRIVAL)
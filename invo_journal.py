@@ -0,0 +1,87 @@
+# invo_journal.py
+"""Headless replay of the game's input journal.
+
+The JS core records every input that changes what ``tick()`` computes,
+stamped with the run and the number of steps taken before it applied:
+
+- an ``init`` or ``reset`` entry that carries the run's params, plus the start
+  state after a legacy restore. A ``reset`` also records ``previous_steps``,
+  the number of steps the run before it reached;
+- a ``params`` entry for each edit, holding the keys that changed;
+- a ``checkpoint`` entry with the params and the whole state at its step.
+  The page asks for one when the live run's entries pass its cap, then drops
+  everything before it. The core also takes one every 20000 sub-steps, so a
+  restore replays a bounded amount of work however fast the game runs.
+  Replay starts from it like from a run's first entry.
+
+It also records ``running`` and ``fast_forward`` entries for the audit trail.
+
+The page sends the journal with the component value as ``{"v",
+"base_interval_ms", "seed", "run", "step", "entries"}``. ``GameEngine`` matches
+the core step for step, so ``replay_journal`` reproduces a session exactly.
+"""
+import json
+
+from invo_engine import BASE_INTERVAL_MS, GameEngine
+
+JOURNAL_FORMAT_VERSION = 1
+RUN_START_TYPES = ("init", "reset", "checkpoint")
+
+
+def run_entries(journal, run=None):
+    """Entries of one run (the newest by default), from its last ``init``/``reset``/``checkpoint`` entry on."""
+    entries = list(journal.get("entries") or ())
+    if run is None:
+        run = journal.get("run", entries[-1]["run"] if entries else 0)
+    start = None
+    for idx, entry in enumerate(entries):
+        if entry.get("run") == run and entry.get("type") in RUN_START_TYPES:
+            start = idx
+    if start is None:
+        raise ValueError(f"journal has no start entry for run {run}")
+    return [entry for entry in entries[start:] if entry.get("run") == run]
+
+
+def run_length(journal, run):
+    """Steps a run reached: from the ``reset`` that ended it, or the journal's step for the current run."""
+    entries = journal.get("entries") or ()
+    for entry in entries:
+        if entry.get("run", 0) > run and entry.get("type") == "reset":
+            return int(entry.get("previous_steps") or 0)
+    steps = max((entry["step"] for entry in entries if entry.get("run") == run), default=0)
+    if run == journal.get("run"):
+        steps = max(steps, int(journal.get("step") or 0))
+    return steps
+
+
+def replay_journal(journal, run=None, steps=None):
+    """Rebuild a run as a ``GameEngine`` ticked to ``steps``, by default as far as the journal got."""
+    if journal.get("v") != JOURNAL_FORMAT_VERSION:
+        raise ValueError(f"unsupported journal format {journal.get('v')!r}")
+    if journal.get("base_interval_ms", BASE_INTERVAL_MS) != BASE_INTERVAL_MS:
+        raise ValueError("journal was recorded with a different base interval")
+    entries = run_entries(journal, run)
+    first = entries[0]
+    engine = GameEngine(first.get("params"), state=first.get("state"))
+    # a checkpoint starts partway through the run
+    engine.steps = int(first.get("step") or 0)
+    if steps is None:
+        steps = run_length(journal, first["run"])
+    for entry in entries[1:]:
+        if entry["step"] > steps:
+            break
+        engine.run(entry["step"] - engine.steps)
+        if entry["type"] == "params":
+            engine.set_params(**entry["changes"])
+    engine.run(steps - engine.steps)
+    return engine
+
+
+def dumps(journal):
+    return json.dumps(journal, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
@@ -0,0 +1,199 @@
+# invo_optimizer.py
+"""Settings search behind the sidebar's "Suggest settings" button.
+
+The lead time, market demand, scenario and the other sliders stay as they
+are. The search looks for the MOQ, safety stock (which sets the reorder
+point), FG safety stock and factory batch with the best final score. The
+candidates are points on the sliders' own grid, and the current settings
+are always one of them.
+
+The search is successive halving over the horizon on
+``invo_batch.BatchEngine``, at the coarse ``SEARCH_SPEED``. Every candidate
+first plays two lead times, long enough to see a truck come back. The best
+1/eta then carry on from where they are, and so on over ``rungs`` horizons
+growing geometrically up to ``days``. The early rungs only screen, so they
+play whole steps. The last rung sub-steps at events, so it ranks the
+survivors as the game does at that speed. The candidates are split into one
+chunk per process. The finalists and the current settings are then scored
+on ``GameEngine`` at the session's own speed, in the same pool. With
+variability on the search still ranks candidates on the deterministic
+model, and only the final scores carry the session's draws.
+
+Only a sample of the grid is searched, so the suggestion is not guaranteed
+to be the best setting. It never scores below the current settings,
+because they are among the finalists.
+
+    python invo_optimizer.py --lead-time 6 --market-demand 180 --speed second --days 90
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from invo_batch import SLIDER_FIELDS, BatchEngine
+from invo_engine import DEFAULT_PARAMS, SCENARIO_OPTIONS, SPEED_OPTIONS, GameEngine
+
+# The searched sliders as (low, high, step), matching the sidebar
+SEARCH_SPACE = {
+    "moq": (40, 400, 10),
+    "safety_stock": (60, 360, 10),
+    "fg_safety_stock": (40, 400, 10),
+    "factory_batch": (20, 120, 5),
+}
+SEARCH_FIELDS = tuple(SEARCH_SPACE)
+# Speed of the search rungs. A whole batch step costs the same at any speed, so the screening rungs
+# play 90 days in 80 steps here against 45000 at "minute"
+SEARCH_SPEED = "turbo-600x"
+
+
+def sample_candidates(base, count, rng):
+    """``count`` distinct slider settings, one array per field; row 0 is ``base``'s own."""
+    axes = [np.arange(low, high + step, step) for low, high, step in SEARCH_SPACE.values()]
+    shape = tuple(len(axis) for axis in axes)
+    current = np.ravel_multi_index(
+        tuple(int(np.abs(axis - float(base[field])).argmin()) for field, axis in zip(SEARCH_FIELDS, axes)),
+        shape,
+    )
+    picks = rng.choice(math.prod(shape), size=min(count, math.prod(shape)), replace=False)
+    picks = np.concatenate(([current], picks[picks != current]))[:count]
+    cells = np.unravel_index(picks, shape)
+    return {field: axis[cell].astype(float) for field, axis, cell in zip(SEARCH_FIELDS, axes, cells)}
+
+
+def score_settings(params, days):
+    """Final score, backlog and financials of one setting played on ``GameEngine`` for ``days``."""
+    engine = GameEngine(params)
+    engine.run_days(days)
+    return {
+        "final_score": engine.state["score"],
+        "backlog": engine.state["backlog"],
+        **engine.financial_snapshot(),
+    }
+
+
+def _advance(task):
+    engine, steps, adaptive = task
+    engine.adaptive = adaptive
+    engine.run(steps)
+    return engine
+
+
+def _ranking(chunks):
+    """Candidate positions across ``chunks``, best first: by score, then by net cash flow."""
+    score = np.concatenate([chunk.state["score"] for chunk in chunks])
+    cash = np.concatenate([chunk.financial_snapshot()["net_cash_flow"] for chunk in chunks])
+    return np.lexsort((cash, score))[::-1]
+
+
+def successive_halving(chunks, ids, horizons, eta, map_fn=map):
+    """Run the rungs; returns the last rung's candidate ids, best first, and a summary per rung.
+
+    Only the last rung sub-steps at events; the earlier ones play whole steps.
+    """
+    rungs = []
+    for rung, horizon in enumerate(horizons):
+        last = rung == len(horizons) - 1
+        chunks = list(map_fn(_advance, [(chunk, horizon - chunk.steps, last) for chunk in chunks]))
+        order = _ranking(chunks)
+        rungs.append({"days": horizon * chunks[0].time_units_per_step, "candidates": len(order)})
+        if last:
+            return np.concatenate(ids)[order], rungs
+        keep = np.zeros(len(order), dtype=bool)
+        keep[order[:math.ceil(len(order) / eta)]] = True
+        survivors = []
+        offset = 0
+        for chunk, chunk_ids in zip(chunks, ids):
+            local = np.flatnonzero(keep[offset:offset + chunk.size])
+            offset += chunk.size
+            if local.size:
+                survivors.append((chunk.take(local), chunk_ids[local]))
+        chunks = [chunk for chunk, _ in survivors]
+        ids = [chunk_ids for _, chunk_ids in survivors]
+
+
+def suggest_settings(params=None, days=90.0, candidates=2187, eta=3, rungs=4, finalists=2, processes=None, seed=0):
+    """Best SEARCH_FIELDS values for the other settings in ``params``.
+
+    Returns ``{"params", "score", "baseline", "finalists", "rungs", "evaluated",
+    "elapsed_s"}``. ``params`` holds the slider values to apply. ``score`` and
+    ``baseline`` are the ``score_settings`` results of the suggestion and of the
+    current settings; the suggestion is the current settings when no finalist
+    beats them.
+    """
+    started = time.perf_counter()
+    base = {**DEFAULT_PARAMS, **(params or {})}
+    grid = sample_candidates(base, candidates, np.random.default_rng(seed))
+    fixed = {field: base[field] for field in SLIDER_FIELDS if field not in SEARCH_SPACE}
+    # the batch plays the deterministic model; variability only comes in with the final scoring
+    engine = BatchEngine({**fixed, **grid, "scenario": base["scenario"]}, speed_unit=SEARCH_SPEED)
+
+    first = min(days, 2.0 * float(base["lead_time"]))
+    horizons = sorted({
+        engine.steps_for_days(first * (days / first) ** (rung / max(1, rungs - 1))) for rung in range(rungs)
+    })
+
+    def settings(idx):
+        return {field: int(round(grid[field][idx])) for field in SEARCH_FIELDS}
+
+    workers = max(1, min(processes or os.cpu_count() or 1, engine.size))
+    split = np.array_split(np.arange(engine.size), workers)
+    chunks = [engine] if workers == 1 else [engine.take(index) for index in split]
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext() as pool:
+        map_fn = pool.map if pool else map
+        ranked, rung_report = successive_halving(chunks, split, horizons, eta, map_fn)
+        picks = [0] + [int(idx) for idx in ranked[:finalists] if idx != 0]
+        scores = list(map_fn(score_settings, [{**base, **settings(idx)} for idx in picks], itertools.repeat(days)))
+    baseline = scores[0]
+    results = [{"params": settings(idx), **score} for idx, score in zip(picks, scores)]
+    results.sort(key=lambda result: (result["final_score"], result["net_cash_flow"]), reverse=True)
+    best = results[0]
+    return {
+        "params": best["params"],
+        "score": {key: value for key, value in best.items() if key != "params"},
+        "baseline": baseline,
+        "finalists": results,
+        "rungs": rung_report,
+        "evaluated": engine.size,
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suggest MOQ, safety stock, FG safety stock and factory batch.")
+    parser.add_argument("--lead-time", type=float, default=DEFAULT_PARAMS["lead_time"])
+    parser.add_argument("--market-demand", type=float, default=DEFAULT_PARAMS["market_demand"])
+    parser.add_argument("--production-rate", type=float, default=DEFAULT_PARAMS["production_rate"])
+    parser.add_argument("--initial-fg-stock", type=float, default=DEFAULT_PARAMS["initial_fg_stock"])
+    parser.add_argument("--scenario", choices=SCENARIO_OPTIONS, default=SCENARIO_OPTIONS[0])
+    parser.add_argument("--speed", choices=SPEED_OPTIONS, default=DEFAULT_PARAMS["speed_unit"])
+    parser.add_argument("--days", type=float, default=90.0)
+    parser.add_argument("--candidates", type=int, default=2187)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = suggest_settings(
+        {
+            "lead_time": args.lead_time,
+            "market_demand": args.market_demand,
+            "production_rate": args.production_rate,
+            "initial_fg_stock": args.initial_fg_stock,
+            "scenario": args.scenario,
+            "speed_unit": args.speed,
+        },
+        days=args.days,
+        candidates=args.candidates,
+        processes=args.processes,
+        seed=args.seed,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# invo_sweep.py
+"""Parameter sweeps over a process pool.
+
+The grid is cut into chunks, each worker runs its chunk through
+``invo_batch.BatchEngine`` and sends back only a handful of numbers per run;
+the parent folds those into a ``SweepAggregator`` as chunks complete.
+Runs step at "minute" by default, the app's default speed and the step the
+score counts in. A faster ``speed_unit`` takes fewer steps and reproduces
+the game played at that speed, whose scores can differ from "minute".
+
+    python invo_sweep.py --days 365 --out sweep.csv
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from invo_batch import SLIDER_FIELDS, BatchEngine, param_grid
+from invo_engine import SCENARIO_OPTIONS, SPEED_OPTIONS
+
+SUMMARY_FIELDS = ("final_score", "peak_backlog", "stockout_steps", "avg_net_cash")
+
+
+def summarize_batch(params, steps, speed_unit="minute"):
+    """Run a batch and keep only per-run summaries, never the trace.
+
+    ``stockout_steps`` and ``avg_net_cash`` are sampled once per step of ``speed_unit``.
+    """
+    engine = BatchEngine(params, speed_unit=speed_unit)
+    peak_backlog = np.zeros(engine.size)
+    stockout_steps = np.zeros(engine.size, dtype=np.int64)
+    net_cash_total = np.zeros(engine.size)
+    for _ in range(steps):
+        engine.tick()
+        state = engine.state
+        np.maximum(peak_backlog, state["backlog"], out=peak_backlog)
+        stockout_steps += state["finished_goods_stock"] <= 0
+        net_cash_total += engine.financial_snapshot()["net_cash_flow"]
+    return {
+        "final_score": engine.state["score"].copy(),
+        "peak_backlog": peak_backlog,
+        "stockout_steps": stockout_steps,
+        "avg_net_cash": net_cash_total / max(1, steps),
+    }
+
+
+def _sweep_chunk(task):
+    start, params, steps, speed_unit = task
+    return start, summarize_batch(params, steps, speed_unit)
+
+
+class SweepAggregator:
+    """Incrementally collects chunk summaries into preallocated columns."""
+
+    def __init__(self, size):
+        self.size = size
+        self.completed = 0
+        self.columns = {field: np.full(size, np.nan) for field in SUMMARY_FIELDS}
+        self.best_index = None
+        self.best_score = -math.inf
+
+    def update(self, start, summary):
+        count = len(summary["final_score"])
+        for field in SUMMARY_FIELDS:
+            self.columns[field][start:start + count] = summary[field]
+        self.completed += count
+        local = int(np.argmax(summary["final_score"]))
+        if summary["final_score"][local] > self.best_score:
+            self.best_score = float(summary["final_score"][local])
+            self.best_index = start + local
+
+    @property
+    def done(self):
+        return self.completed >= self.size
+
+    def means(self):
+        return {field: float(np.nanmean(col)) if self.completed else math.nan for field, col in self.columns.items()}
+
+
+def run_sweep(grid, days=365.0, speed_unit="minute", processes=None, chunk_size=None, on_progress=None):
+    """Evaluate every run in ``grid`` (see ``invo_batch.param_grid``).
+
+    ``on_progress(aggregator)`` is called after each chunk lands.
+    """
+    size = len(grid["scenario"])
+    processes = processes or os.cpu_count() or 1
+    if chunk_size is None:
+        # a few chunks per worker keeps the pool busy without tiny batches
+        chunk_size = max(64, math.ceil(size / (processes * 4)))
+    steps = BatchEngine({key: grid[key][:1] for key in grid}, speed_unit=speed_unit).steps_for_days(days)
+    aggregator = SweepAggregator(size)
+
+    tasks = [
+        (start, {key: values[start:start + chunk_size] for key, values in grid.items()}, steps, speed_unit)
+        for start in range(0, size, chunk_size)
+    ]
+    if processes == 1:
+        for task in tasks:
+            aggregator.update(*_sweep_chunk(task))
+            if on_progress:
+                on_progress(aggregator)
+        return aggregator
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_sweep_chunk, task) for task in tasks]
+        for future in as_completed(futures):
+            aggregator.update(*future.result())
+            if on_progress:
+                on_progress(aggregator)
+    return aggregator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep lead_time x moq x safety_stock over a process pool.")
+    parser.add_argument("--lead-time", type=float, nargs="+", default=list(np.arange(1.0, 14.5, 0.5)))
+    parser.add_argument("--moq", type=float, nargs="+", default=list(range(40, 410, 10)))
+    parser.add_argument("--safety-stock", type=float, nargs="+", default=list(range(60, 370, 10)))
+    parser.add_argument("--scenario", choices=SCENARIO_OPTIONS, default=SCENARIO_OPTIONS[0])
+    parser.add_argument("--speed", choices=SPEED_OPTIONS, default="minute")
+    parser.add_argument("--days", type=float, default=365.0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default=None, help="CSV path (default: stdout)")
+    args = parser.parse_args(argv)
+
+    grid = param_grid(
+        lead_time=args.lead_time,
+        moq=args.moq,
+        safety_stock=args.safety_stock,
+        scenario=[args.scenario],
+    )
+
+    def report(agg):
+        print(f"\r{agg.completed}/{agg.size} runs", end="", file=sys.stderr)
+
+    result = run_sweep(grid, days=args.days, speed_unit=args.speed, processes=args.processes, on_progress=report)
+    print(file=sys.stderr)
+
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(SLIDER_FIELDS + ("scenario",) + SUMMARY_FIELDS)
+        for idx in range(result.size):
+            writer.writerow(
+                [grid[field][idx] for field in SLIDER_FIELDS + ("scenario",)]
+                + [result.columns[field][idx] for field in SUMMARY_FIELDS]
+            )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
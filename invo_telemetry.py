@@ -0,0 +1,207 @@
+# invo_telemetry.py
+"""Per-step run data sent back by the game component.
+
+The page batches the rows the core records each tick and ships them in the
+component value as ``{"session", "dropped", "chunks": [{"seq", "rows",
+"columns"}]}``. A chunk is resent until its sequence number comes back as
+``params.telemetry_ack``, so ``TelemetryBuffer.ingest`` skips anything it has
+already stored. Rows land in preallocated NumPy columns that grow by
+doubling up to ``max_rows``. Past that the buffer keeps the whole run at a
+coarser resolution: it drops every other stored row and from then on keeps
+one row in ``stride``. A kept row ORs in the event flags of the rows it
+stands for, so no dispatch or shutdown is lost. The page thins its queue
+the same way when sends fall behind, and ``dropped`` counts the rows it
+thinned out. The buffer exports as CSV or, when pyarrow is installed, as
+Parquet.
+"""
+import csv
+import io
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# Column order of the JS TELEMETRY_FIELDS
+TELEMETRY_FIELDS = (
+    "run",
+    "step",
+    "time_acc",
+    "factory_stock",
+    "warehouse_stock",
+    "finished_goods_stock",
+    "backlog",
+    "score",
+    "worker_progress",
+    "worker_direction",
+    "worker_load",
+    "truck_en_route",
+    "truck_progress",
+    "truck_delivery",
+    "truck_wait_timer",
+    "truck_travel_minutes_remaining",
+    "production_shutdown",
+    "production_plan_daily",
+    "supply_plan_daily",
+    "chilled_truck_progress",
+    "demand_factor",
+    "events",
+)
+
+# Bits of the "events" column (EVENT_* in the JS core)
+EVENT_FLAGS = {
+    "truck_dispatch": 1,
+    "truck_delivery": 2,
+    "shutdown_start": 4,
+    "shutdown_end": 8,
+    "supermarket_burst": 16,
+}
+
+INTEGER_FIELDS = ("run", "step", "worker_direction", "events")
+BOOLEAN_FIELDS = ("truck_en_route", "production_shutdown")
+
+PARQUET_AVAILABLE = pa is not None
+
+# About 18 MB of columns; a "minute" run fills it after 200 in-game days
+MAX_ROWS = 100_000
+
+
+class TelemetryBuffer:
+    """Columnar store of telemetry rows, fed chunk by chunk from the component value."""
+
+    def __init__(self, capacity=4096, max_rows=MAX_ROWS):
+        self.max_rows = max(2, int(max_rows))
+        self.columns = {field: np.zeros(min(capacity, self.max_rows)) for field in TELEMETRY_FIELDS}
+        self.size = 0
+        self.session = None
+        self.last_seq = 0
+        self.dropped = 0
+        # one stored row per `stride` steps received; doubles each time the buffer fills
+        self.stride = 1
+        self._received = 0
+
+    @property
+    def capacity(self):
+        return len(self.columns["step"])
+
+    def clear(self):
+        self.size = 0
+        self.dropped = 0
+        self.stride = 1
+        self._received = 0
+
+    def ingest(self, telemetry):
+        """Store the chunks of a component value not seen yet; returns the rows received."""
+        if not isinstance(telemetry, dict):
+            return 0
+        session = telemetry.get("session")
+        if session != self.session:
+            # a reloaded page numbers its chunks from 1 again
+            self.session = session
+            self.last_seq = 0
+        added = 0
+        for chunk in telemetry.get("chunks") or ():
+            seq = int(chunk.get("seq", 0))
+            if seq <= self.last_seq:
+                continue
+            added += self._append(chunk)
+            self.last_seq = seq
+        self.dropped = int(telemetry.get("dropped") or 0)
+        return added
+
+    def _kept(self, first, rows):
+        """How many of the received rows first .. first + rows - 1 start a stride."""
+        return -(-(first + rows) // self.stride) - -(-first // self.stride)
+
+    def _append(self, chunk):
+        rows = int(chunk.get("rows", 0))
+        columns = chunk.get("columns") or {}
+        if rows <= 0:
+            return 0
+        first = self._received
+        self._received += rows
+        while self.size + self._kept(first, rows) > self.max_rows:
+            self._halve()
+        needed = self.size + self._kept(first, rows)
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            capacity = min(capacity, self.max_rows)
+            for field, column in self.columns.items():
+                grown = np.zeros(capacity)
+                grown[:self.size] = column[:self.size]
+                self.columns[field] = grown
+
+        starts = np.flatnonzero((first + np.arange(rows)) % self.stride == 0)
+        values = columns.get("events")
+        events = np.zeros(rows, dtype=np.int64)
+        if values is not None and len(values) == rows:
+            events = np.nan_to_num(np.asarray(values, dtype=float)).astype(np.int64)
+        head = starts[0] if starts.size else rows
+        if head and self.size:
+            # rows finishing the stride of the last stored row
+            last = self.columns["events"]
+            last[self.size - 1] = int(last[self.size - 1]) | int(np.bitwise_or.reduce(events[:head]))
+        if not starts.size:
+            return rows
+
+        for field in TELEMETRY_FIELDS:
+            values = columns.get(field)
+            target = self.columns[field][self.size:needed]
+            if field == "events":
+                target[:] = np.bitwise_or.reduceat(events, starts)
+            elif values is None or len(values) != rows:
+                target.fill(np.nan)
+            else:
+                target[:] = np.asarray(values, dtype=float)[starts]
+        self.size = needed
+        return rows
+
+    def _halve(self):
+        """Keep every other stored row, folding the dropped rows' events into the kept ones."""
+        events = self.columns["events"][:self.size].astype(np.int64)
+        kept = (self.size + 1) // 2
+        for field, column in self.columns.items():
+            column[:kept] = column[:self.size:2]
+        merged = events[0::2]
+        merged[:self.size // 2] |= events[1::2]
+        self.columns["events"][:kept] = merged
+        self.size = kept
+        self.stride *= 2
+
+    def as_columns(self):
+        """Trimmed, typed copies of the columns, with the event bitmask split into flags."""
+        out = {}
+        for field in TELEMETRY_FIELDS:
+            column = self.columns[field][:self.size]
+            if field in INTEGER_FIELDS:
+                out[field] = np.nan_to_num(column).astype(np.int64)
+            elif field in BOOLEAN_FIELDS:
+                out[field] = column != 0
+            else:
+                out[field] = column.copy()
+        for name, bit in EVENT_FLAGS.items():
+            out[name] = (out["events"] & bit) != 0
+        return out
+
+    def to_csv(self):
+        columns = self.as_columns()
+        names = list(columns)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name].tolist() for name in names)))
+        return out.getvalue().encode("utf-8")
+
+    def to_parquet(self):
+        """Parquet bytes, or None when pyarrow is not installed."""
+        if not PARQUET_AVAILABLE:
+            return None
+        table = pa.table({name: pa.array(column) for name, column in self.as_columns().items()})
+        out = io.BytesIO()
+        pq.write_table(table, out)
+        return out.getvalue()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from invo_batch import BatchEngine, param_grid
+from invo_engine import SPEED_OPTIONS, GameEngine
+
+FIELDS = (
+    "score",
+    "factory_stock",
+    "warehouse_stock",
+    "finished_goods_stock",
+    "backlog",
+    "worker_progress",
+    "truck_progress",
+    "production_plan_daily",
+)
+
+
+def grid():
+    return param_grid(
+        lead_time=[1.0, 6.0],
+        moq=[40, 400],
+        factory_batch=[20, 120],
+        scenario=["Accurate forecast", "Biased forecast"],
+    )
+
+
+@pytest.mark.parametrize("speed_unit", SPEED_OPTIONS)
+def test_matches_game_engine_at_every_speed(speed_unit):
+    params = grid()
+    batch = BatchEngine(params, speed_unit=speed_unit)
+    batch.run_days(8)
+
+    for idx in range(batch.size):
+        game = GameEngine({**{field: values[idx].item() for field, values in params.items()}, "speed_unit": speed_unit})
+        game.run_days(8)
+        for field in FIELDS:
+            assert batch.state[field][idx] == pytest.approx(game.state[field], rel=1e-9, abs=1e-9), (idx, field)
+
+
+def test_take_continues_the_selected_runs():
+    whole = BatchEngine(grid(), speed_unit="second")
+    whole.run_days(2)
+    part = whole.take(np.array([1, 5]))
+    whole.run_days(2)
+    part.run_days(2)
+
+    assert part.size == 2
+    np.testing.assert_array_equal(part.state["score"], whole.state["score"][[1, 5]])
+
+
+def test_rejects_stochastic_params():
+    with pytest.raises(ValueError):
+        BatchEngine({"stochastic": True})
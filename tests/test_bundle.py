@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import invo_bundle
+from invo_bundle import MANIFEST_NAME, _strip_js_comments, ensure_bundle, minify_js
+
+
+def test_strips_comments_but_not_strings():
+    source = "const a = 'x // y'; // gone\nconst b = \"/* kept */\"; /* gone */\nconst c = `${a} // kept`;\n"
+
+    assert _strip_js_comments(source) == "const a = 'x // y'; \nconst b = \"/* kept */\"; \nconst c = `${a} // kept`;\n"
+
+
+@pytest.mark.parametrize("line", [
+    "name.replace(/[:.]/g, '-');",
+    "const slashes = /\\/\\//;",
+    "const klass = /[/*]+/;",
+    "if(/^\\d+$/.test(text)) return /a\\/b/i;",
+])
+def test_keeps_regex_literals(line):
+    assert minify_js(line + " // note\n") == line + "\n"
+
+
+def test_division_is_not_a_regex():
+    assert minify_js("const half = total / 2; // over two\nconst r = (a) / b / c;\n") == (
+        "const half = total / 2;\nconst r = (a) / b / c;\n"
+    )
+
+
+def test_unterminated_regex_fails_the_build():
+    with pytest.raises(ValueError):
+        minify_js("const broken = /abc\n")
+
+
+def test_ensure_bundle_hashes_the_sources_once_per_change(tmp_path, monkeypatch):
+    checks = []
+    is_stale = invo_bundle.is_stale
+
+    def counted(out_dir):
+        checks.append(out_dir)
+        return is_stale(out_dir)
+
+    monkeypatch.setattr(invo_bundle, "is_stale", counted)
+    out_dir = str(tmp_path)
+
+    ensure_bundle(out_dir)
+    ensure_bundle(out_dir)
+    assert len(checks) == 1
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+    manifest = tmp_path / MANIFEST_NAME
+    os.utime(manifest, ns=(0, manifest.stat().st_mtime_ns + 1))
+    ensure_bundle(out_dir)
+    assert len(checks) == 2
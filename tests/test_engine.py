@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from invo_engine import GameEngine
+
+TRACES = sorted((Path(__file__).parent / "traces").glob("*.json"))
+
+
+@pytest.mark.parametrize("trace_path", TRACES, ids=[path.stem for path in TRACES])
+def test_matches_recorded_js_trace(trace_path):
+    trace = json.loads(trace_path.read_text())
+    fields = trace["fields"][1:]
+    engine = GameEngine(trace["params"])
+
+    for row in trace["rows"]:
+        step, values = row[0], row[1:]
+        engine.run(step - engine.steps)
+        for field, expected in zip(fields, values):
+            assert float(engine.state[field]) == pytest.approx(expected, rel=1e-9, abs=1e-9), (step, field)
+
+
+def test_traces_are_checked_in():
+    assert len(TRACES) >= 4
+
+
+def test_score_is_weighted_by_sub_step_length():
+    engine = GameEngine({"speed_unit": "second"})
+    engine.tick()
+    # one "second" step is 60 reference steps; the opening state scores +1 per reference step
+    assert engine.state["score"] == pytest.approx(60.0)
+    assert engine.state["time_acc"] == pytest.approx(engine.time_units_per_step)
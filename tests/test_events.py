@@ -0,0 +1,59 @@
+import pytest
+
+from invo_engine import REFERENCE_STEP_UNITS, GameEngine
+from invo_events import EventEngine
+
+
+def relative_gap(value, reference):
+    return abs(value - reference) / max(1.0, abs(reference))
+
+
+def game_score(params, days, divisor):
+    game = GameEngine({**params, "speed_unit": "minute"})
+    game.time_units_per_step = REFERENCE_STEP_UNITS / divisor
+    game.run_days(days)
+    return game.state["score"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"lead_time": 6.0, "moq": 40, "scenario": "Biased forecast"},
+    ],
+)
+def test_game_engine_converges_to_it(params):
+    events = EventEngine(params)
+    score = events.run_days(10)["score"]
+
+    assert relative_gap(game_score(params, 10, 16), score) < 0.005
+    # one event per leg, truck or threshold, against 5000 steps at "minute"
+    assert events.events < 1000
+
+
+def test_game_engine_closes_in_as_the_step_shrinks():
+    params = {"lead_time": 1.0, "moq": 400, "safety_stock": 360, "factory_batch": 120, "market_demand": 360}
+    score = EventEngine(params).run_days(5)["score"]
+
+    gaps = [relative_gap(game_score(params, 5, divisor), score) for divisor in (1, 16)]
+    assert gaps[1] < gaps[0]
+    assert gaps[1] < 0.01
+
+
+def test_run_until_in_pieces_matches_one_run():
+    whole = EventEngine()
+    whole.run_until(10.0)
+    pieces = EventEngine()
+    for tenth in range(1, 101):
+        state = pieces.run_until(tenth / 10)
+        assert state["time_acc"] == pytest.approx(tenth / 10)
+
+    assert pieces.state["score"] == pytest.approx(whole.state["score"])
+    assert pieces.events == whole.events
+
+
+def test_rejects_what_it_does_not_model():
+    with pytest.raises(ValueError):
+        EventEngine({"stochastic": True})
+    with pytest.raises(ValueError):
+        EventEngine({"safety_stock": -10})
@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from invo_engine import BASE_INTERVAL_MS, DEFAULT_PARAMS, GameEngine
+from invo_journal import JOURNAL_FORMAT_VERSION, RUN_START_TYPES, dumps, loads, replay_journal, run_length
+
+PARAMS = {**DEFAULT_PARAMS, "speed_unit": "second"}
+EDITS = [(40, {"moq": 300}), (95, {"lead_time": 2.5, "scenario": "Biased forecast"}), (160, {"safety_stock": 90})]
+# Recorded by tests/traces/record_traces.js
+TURBO_JOURNAL = Path(__file__).parent / "traces" / "journals" / "journal_turbo_fast_forward.json"
+# game.js JOURNAL_CHECKPOINT_SUBSTEPS
+CHECKPOINT_SUBSTEPS = 20000
+
+
+def session(entries, step, run=0):
+    return {
+        "v": JOURNAL_FORMAT_VERSION,
+        "base_interval_ms": BASE_INTERVAL_MS,
+        "seed": 1,
+        "run": run,
+        "step": step,
+        "entries": entries,
+    }
+
+
+def played(steps):
+    """GameEngine ticked through EDITS by hand, as the core applied them."""
+    engine = GameEngine(PARAMS)
+    for step, changes in EDITS:
+        if step > steps:
+            break
+        engine.run(step - engine.steps)
+        engine.set_params(**changes)
+    engine.run(steps - engine.steps)
+    return engine
+
+
+def recorded_journal(steps):
+    entries = [{"run": 0, "step": 0, "type": "init", "params": PARAMS, "running": True}]
+    entries += [{"run": 0, "step": step, "type": "params", "changes": changes} for step, changes in EDITS]
+    return session(entries, steps)
+
+
+def test_replay_applies_edits_at_their_steps():
+    engine = replay_journal(loads(dumps(recorded_journal(240))))
+
+    assert engine.steps == 240
+    assert engine.state == played(240).state
+
+
+def test_replay_from_a_checkpoint_matches_the_whole_run():
+    at = played(120)
+    checkpoint = {"run": 0, "step": 120, "type": "checkpoint", "params": dict(at.params), "state": dict(at.state)}
+    journal = loads(dumps(session([checkpoint, {"run": 0, "step": 160, "type": "params", "changes": {"safety_stock": 90}}], 240)))
+    engine = replay_journal(journal)
+
+    assert engine.steps == 240
+    assert engine.state["score"] == played(240).state["score"]
+    assert engine.state == replay_journal(recorded_journal(240)).state
+
+
+def test_finished_runs_replay_to_the_step_they_reached():
+    entries = recorded_journal(240)["entries"] + [
+        {"run": 1, "step": 0, "type": "reset", "params": PARAMS, "previous_steps": 200},
+    ]
+    journal = session(entries, 30, run=1)
+
+    assert run_length(journal, 0) == 200
+    assert replay_journal(journal, run=0).state == played(200).state
+    assert replay_journal(journal).steps == 30
+
+
+def test_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        replay_journal({**recorded_journal(10), "v": JOURNAL_FORMAT_VERSION + 1})
+    with pytest.raises(ValueError):
+        replay_journal(session([{"run": 0, "step": 5, "type": "params", "changes": {}}], 10))
+
+
+def test_core_checkpoints_bound_the_replay_at_turbo_speed():
+    journal = json.loads(TURBO_JOURNAL.read_text())
+    starts = [entry for entry in journal["entries"] if entry["type"] in RUN_START_TYPES]
+    assert [entry["type"] for entry in starts[1:]] == ["checkpoint"] * (len(starts) - 1)
+    assert len(starts) >= 3
+
+    substeps = 0
+
+    def counted(next_substep_units):
+        def wrapper(remaining):
+            nonlocal substeps
+            substeps += 1
+            return next_substep_units(remaining)
+        return wrapper
+
+    for start, end in zip(starts, starts[1:]):
+        engine = GameEngine(start["params"], state=start.get("state"))
+        engine.next_substep_units = counted(engine.next_substep_units)
+        substeps = 0
+        engine.run(end["step"] - start["step"] - 1)
+        # the core checkpoints after the step that takes it to the cap
+        assert substeps < CHECKPOINT_SUBSTEPS
+        engine.run(1)
+        assert substeps >= CHECKPOINT_SUBSTEPS
+        assert engine.state["score"] == pytest.approx(end["state"]["score"], rel=1e-9)
+
+    assert replay_journal(journal).steps == journal["step"]
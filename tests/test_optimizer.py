@@ -0,0 +1,45 @@
+import numpy as np
+
+from invo_engine import DEFAULT_PARAMS
+from invo_optimizer import SEARCH_FIELDS, SEARCH_SPACE, sample_candidates, score_settings, suggest_settings
+
+
+def test_candidates_are_distinct_grid_points_led_by_the_current_settings():
+    grid = sample_candidates(DEFAULT_PARAMS, 200, np.random.default_rng(3))
+
+    assert {field: grid[field][0] for field in SEARCH_FIELDS} == {field: DEFAULT_PARAMS[field] for field in SEARCH_FIELDS}
+    assert len({tuple(grid[field][idx] for field in SEARCH_FIELDS) for idx in range(200)}) == 200
+    for field, (low, high, step) in SEARCH_SPACE.items():
+        assert grid[field].min() >= low and grid[field].max() <= high
+        assert np.all((grid[field] - low) % step == 0)
+
+
+def test_suggestion_is_scored_at_the_session_speed_and_never_worse():
+    params = {**DEFAULT_PARAMS, "lead_time": 2.0, "speed_unit": "second"}
+    result = suggest_settings(params, days=12.0, candidates=81, rungs=3, processes=1)
+
+    assert result["score"]["final_score"] >= result["baseline"]["final_score"]
+    assert result["score"] == score_settings({**params, **result["params"]}, 12.0)
+    assert result["baseline"] == score_settings(params, 12.0)
+    assert result["evaluated"] == 81
+    assert [rung["candidates"] for rung in result["rungs"]] == [81, 27, 9]
+
+
+def test_every_rung_runs_and_chunking_does_not_change_the_ranking():
+    params = {**DEFAULT_PARAMS, "speed_unit": "second"}
+    alone = suggest_settings(params, days=30.0, candidates=243, processes=1)
+    pooled = suggest_settings(params, days=30.0, candidates=243, processes=2)
+
+    assert [rung["candidates"] for rung in alone["rungs"]] == [243, 81, 27, 9]
+    assert [rung["days"] for rung in alone["rungs"]] == sorted({rung["days"] for rung in alone["rungs"]})
+    assert alone["rungs"][-1]["days"] >= 30.0
+    assert pooled["finalists"] == alone["finalists"]
+
+
+def test_default_search_fits_a_sidebar_button():
+    # "minute", the app's default speed, is the slowest to score; one core is enough
+    result = suggest_settings(processes=1)
+
+    assert result["evaluated"] == 2187
+    assert len(result["rungs"]) == 4
+    assert result["elapsed_s"] < 5.0
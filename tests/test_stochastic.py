@@ -0,0 +1,52 @@
+import statistics
+
+import pytest
+
+from invo_engine import RANDOM_BLOCK_SIZE, GameEngine, fill_variates, mulberry32
+
+STOCHASTIC = {"stochastic": True, "seed": 11, "demand_cv": 0.4, "lead_time_cv": 0.3, "speed_unit": "second"}
+
+
+def final_state(params, days=30):
+    engine = GameEngine(params)
+    engine.run_days(days)
+    return engine.state
+
+
+def test_same_seed_replays_the_same_run():
+    assert final_state(STOCHASTIC) == final_state(STOCHASTIC)
+
+
+def test_seed_changes_the_run():
+    assert final_state(STOCHASTIC)["score"] != final_state({**STOCHASTIC, "seed": 12})["score"]
+
+
+def test_deterministic_mode_ignores_the_seed():
+    assert final_state({"seed": 1}) == final_state({"seed": 99})
+    assert final_state({})["demand_factor"] == 1.0
+
+
+def test_demand_is_drawn_once_per_day():
+    engine = GameEngine({**STOCHASTIC, "speed_unit": "minute"})
+    factors = {}
+    while engine.state["time_acc"] < 5.0:
+        engine.tick()
+        factors.setdefault(engine.state["demand_day"], set()).add(engine.state["demand_factor"])
+    assert sorted(factors)[:5] == [0, 1, 2, 3, 4]
+    assert all(len(day_factors) == 1 for day_factors in factors.values())
+
+
+@pytest.mark.parametrize("distribution", ["Normal", "Uniform"])
+def test_variates_have_zero_mean_and_unit_spread(distribution):
+    values = []
+    for seed in range(16):
+        values += fill_variates(seed, distribution)
+    assert len(values) == 16 * RANDOM_BLOCK_SIZE
+    assert statistics.fmean(values) == pytest.approx(0.0, abs=0.05)
+    assert statistics.pstdev(values) == pytest.approx(1.0, abs=0.05)
+
+
+def test_mulberry32_matches_the_js_sequence():
+    # first draws of the JS mulberry32(1)
+    draws = mulberry32(1)
+    assert [next(draws) for _ in range(3)] == [0.6270739405881613, 0.002735721180215478, 0.5274470399599522]
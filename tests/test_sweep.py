@@ -0,0 +1,31 @@
+import numpy as np
+
+from invo_batch import param_grid
+from invo_engine import GameEngine
+from invo_sweep import run_sweep, summarize_batch
+
+
+def game_scores(grid, days, speed_unit):
+    scores = []
+    for idx in range(len(grid["scenario"])):
+        game = GameEngine({**{field: values[idx].item() for field, values in grid.items()}, "speed_unit": speed_unit})
+        game.run_days(days)
+        scores.append(game.state["score"])
+    return np.array(scores)
+
+
+def test_default_speed_matches_game_engine_at_minute():
+    grid = param_grid(lead_time=[1.0, 6.0], moq=[40, 400])
+    result = run_sweep(grid, days=5.0, processes=1, chunk_size=3)
+
+    assert result.done
+    np.testing.assert_allclose(result.columns["final_score"], game_scores(grid, 5.0, "minute"))
+    assert result.best_index == int(np.argmax(result.columns["final_score"]))
+
+
+def test_faster_speed_matches_game_engine_at_that_speed():
+    grid = param_grid(lead_time=[2.0, 9.0], safety_stock=[60, 360])
+    summary = summarize_batch(grid, 100, speed_unit="second")
+
+    np.testing.assert_allclose(summary["final_score"], game_scores(grid, 12.0, "second"))
+    assert summary["stockout_steps"].max() <= 100
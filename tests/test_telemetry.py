@@ -0,0 +1,62 @@
+import csv
+import io
+
+import numpy as np
+
+from invo_telemetry import EVENT_FLAGS, TELEMETRY_FIELDS, TelemetryBuffer
+
+
+def chunk(seq, first_step, rows, events=None):
+    steps = list(range(first_step, first_step + rows))
+    columns = {field: [0.0] * rows for field in TELEMETRY_FIELDS}
+    columns["step"] = steps
+    columns["score"] = [float(step) for step in steps]
+    columns["events"] = [events.get(step, 0) for step in steps] if events else [0] * rows
+    return {"seq": seq, "rows": rows, "columns": columns}
+
+
+def test_ingest_skips_chunks_already_stored():
+    buffer = TelemetryBuffer()
+    value = {"session": "a", "dropped": 0, "chunks": [chunk(1, 1, 5), chunk(2, 6, 5)]}
+    assert buffer.ingest(value) == 10
+    assert buffer.ingest(value) == 0
+    assert buffer.ingest({"session": "a", "chunks": [chunk(2, 6, 5), chunk(3, 11, 2)]}) == 2
+    # a reloaded page numbers its chunks from 1 again
+    assert buffer.ingest({"session": "b", "chunks": [chunk(1, 1, 3)]}) == 3
+    assert buffer.size == 15
+
+
+def test_full_buffer_downsamples_without_losing_events():
+    events = {3: EVENT_FLAGS["truck_dispatch"], 22: EVENT_FLAGS["shutdown_start"], 37: EVENT_FLAGS["truck_delivery"]}
+    buffer = TelemetryBuffer(capacity=4, max_rows=8)
+    for seq, first in enumerate(range(0, 40, 7), start=1):
+        buffer.ingest({"session": "a", "chunks": [chunk(seq, first, min(7, 40 - first), events)]})
+
+    columns = buffer.as_columns()
+    assert buffer.size <= 8
+    assert buffer.stride == 8
+    np.testing.assert_array_equal(columns["step"], np.arange(0, 40, buffer.stride))
+    # each event is kept on the row whose stride covers its step
+    for step, bit in events.items():
+        row = step // buffer.stride
+        assert columns["events"][row] & bit
+    assert int(np.bitwise_or.reduce(columns["events"])) == sum(events.values())
+
+
+def test_clear_resets_the_resolution():
+    buffer = TelemetryBuffer(max_rows=4)
+    buffer.ingest({"session": "a", "chunks": [chunk(1, 0, 10)]})
+    assert buffer.stride > 1
+    buffer.clear()
+    buffer.ingest({"session": "a", "chunks": [chunk(2, 0, 3)]})
+    assert buffer.stride == 1
+    np.testing.assert_array_equal(buffer.as_columns()["step"], [0, 1, 2])
+
+
+def test_csv_export_has_a_row_per_stored_step():
+    buffer = TelemetryBuffer()
+    buffer.ingest({"session": "a", "chunks": [chunk(1, 1, 4, {2: EVENT_FLAGS["truck_dispatch"]})]})
+    rows = list(csv.DictReader(io.StringIO(buffer.to_csv().decode("utf-8"))))
+
+    assert [row["step"] for row in rows] == ["1", "2", "3", "4"]
+    assert [row["truck_dispatch"] for row in rows] == ["False", "True", "False", "False"]
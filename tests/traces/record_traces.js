@@ -0,0 +1,160 @@
+// Records traces of the game's simulation core for tests/test_engine.py and tests/test_journal.py.
+//
+//   node tests/traces/record_traces.js
+//
+// simCore() is cut out of invo_component/frontend/game.js and driven under fake timers exactly as the
+// Web Worker runs it: the pump ticks one step per base interval and posts a snapshot after it. Every
+// `every`-th step of each case is written to tests/traces/<name>.json. JOURNAL_CASE fast-forwards a
+// run instead and writes every journal entry the core posts to tests/traces/journals/<name>.json.
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const GAME_JS = path.join(__dirname, '..', '..', 'invo_component', 'frontend', 'game.js');
+const BASE_INTERVAL_MS = 120;
+
+// Core state GameEngine mirrors (the page clears pending_supermarket_burst; supplier_stock is unused)
+const FIELDS = [
+  'factory_stock', 'warehouse_stock', 'safety_stock', 'fg_safety_stock', 'fg_high_stock_threshold',
+  'worker_capacity', 'worker_progress', 'worker_direction', 'worker_load', 'finished_goods_stock', 'backlog',
+  'truck_en_route', 'truck_progress', 'truck_delivery', 'truck_wait_timer', 'truck_travel_minutes_total',
+  'truck_travel_minutes_remaining', 'production_shutdown', 'score', 'time_acc', 'chilled_truck_progress',
+  'chilled_truck_direction', 'chilled_truck_wait', 'production_plan_daily', 'supply_plan_daily',
+  'production_target_per_time_unit', 'demand_factor', 'demand_day', 'truck_dispatches',
+];
+
+// Same as invo_engine.DEFAULT_PARAMS
+const DEFAULT_PARAMS = {
+  lead_time: 6.0, moq: 160, production_rate: 200, market_demand: 180, safety_stock: 180,
+  fg_safety_stock: 160, initial_fg_stock: 200, factory_batch: 40, scenario: 'Accurate forecast',
+  speed_unit: 'minute', is_running: true, reset_token: 0, stochastic: false, seed: 1,
+  demand_distribution: 'Normal', demand_cv: 0.2, lead_time_distribution: 'Normal', lead_time_cv: 0.25,
+};
+
+const CASES = [
+  {name: 'accurate_minute', params: {}, steps: 3000, every: 30},
+  {
+    name: 'biased_short_lead_second',
+    params: {scenario: 'Biased forecast', lead_time: 1.0, moq: 40, safety_stock: 60, factory_batch: 20, speed_unit: 'second'},
+    steps: 600,
+    every: 6,
+  },
+  {
+    name: 'long_lead_big_orders_10_second',
+    params: {
+      lead_time: 14.0, moq: 400, safety_stock: 360, fg_safety_stock: 400, factory_batch: 120,
+      market_demand: 360, initial_fg_stock: 40, speed_unit: '10-second',
+    },
+    steps: 1200,
+    every: 12,
+  },
+  {name: 'accurate_turbo_6000x', params: {speed_unit: 'turbo-6000x'}, steps: 60, every: 1},
+  {
+    name: 'stochastic_uniform_second',
+    params: {
+      stochastic: true, seed: 7, demand_distribution: 'Uniform', demand_cv: 0.5, lead_time_cv: 0.4,
+      speed_unit: 'second',
+    },
+    steps: 600,
+    every: 6,
+  },
+];
+
+// Few inputs but many sub-steps: the core checkpoints on its own along the way
+const JOURNAL_CASE = {name: 'journal_turbo_fast_forward', params: {speed_unit: 'turbo-600x'}, day: 730};
+
+function loadSimCore(){
+  const js = fs.readFileSync(GAME_JS, 'utf8');
+  const start = js.indexOf('function simCore(host){');
+  let depth = 0;
+  for(let idx = js.indexOf('{', start); idx < js.length; idx++){
+    if(js[idx] === '{') depth += 1;
+    else if(js[idx] === '}' && --depth === 0) return js.slice(start, idx + 1);
+  }
+  throw new Error('simCore() not found in ' + GAME_JS);
+}
+
+// simCore() in a sandbox whose timers fire when runTimers(until) moves the fake clock
+function fakeTimerCore(coreSrc){
+  let now = 0;
+  let timers = [];
+  const sandbox = {
+    performance: {now: () => now},
+    setInterval: (fn, ms) => { timers.push({fn, ms, next: now + ms}); return timers.length; },
+    clearInterval: () => { timers = []; },
+    setTimeout: (fn, ms) => { timers.push({fn, ms: 0, next: now + (ms || 0), once: true}); return timers.length; },
+    clearTimeout: () => {},
+  };
+  const simCore = vm.runInNewContext(coreSrc + '\nsimCore;', sandbox);
+  function runTimers(until){
+    while(true){
+      const due = timers.filter(timer => timer.next <= until).sort((a, b) => a.next - b.next)[0];
+      if(!due) break;
+      now = due.next;
+      if(due.once) timers = timers.filter(timer => timer !== due);
+      else due.next += due.ms;
+      due.fn();
+    }
+  }
+  return {simCore, runTimers};
+}
+
+function record(coreSrc, spec){
+  const {simCore, runTimers} = fakeTimerCore(coreSrc);
+  const params = {...DEFAULT_PARAMS, ...spec.params};
+  const rows = [];
+  const host = {
+    postMessage(msg){
+      if(msg.type !== 'snapshot' || msg.step === 0 || msg.step % spec.every !== 0) return;
+      if(rows.length && rows[rows.length - 1][0] === msg.step) return;
+      rows.push([msg.step, ...new Float64Array(msg.buffer)]);
+    },
+    onmessage: null,
+  };
+  simCore(host);
+  host.onmessage({data: {type: 'init', params, state: null, running: true, fields: FIELDS, base_interval_ms: BASE_INTERVAL_MS}});
+
+  runTimers(spec.steps * BASE_INTERVAL_MS + BASE_INTERVAL_MS / 4);
+  return {params, fields: FIELDS, rows};
+}
+
+function recordJournal(coreSrc, spec){
+  const {simCore, runTimers} = fakeTimerCore(coreSrc);
+  const params = {...DEFAULT_PARAMS, ...spec.params};
+  const entries = [];
+  let done = null;
+  const host = {
+    postMessage(msg){
+      if(msg.type === 'journal') entries.push(msg.entry);
+      else if(msg.type === 'fast_forward_done') done = msg;
+    },
+    onmessage: null,
+  };
+  simCore(host);
+  host.onmessage({data: {type: 'init', params, state: null, running: false, fields: FIELDS, base_interval_ms: BASE_INTERVAL_MS}});
+  host.onmessage({data: {type: 'fast_forward', day: spec.day}});
+  // fast-forward slices run back to back on zero-delay timeouts
+  while(!done) runTimers(Infinity);
+  return {v: 1, base_interval_ms: BASE_INTERVAL_MS, seed: params.seed, run: 0, step: done.steps, entries};
+}
+
+const coreSrc = loadSimCore();
+for(const spec of CASES){
+  const trace = record(coreSrc, spec);
+  const body = [
+    '{',
+    `  "params": ${JSON.stringify(trace.params)},`,
+    `  "fields": ${JSON.stringify(['step', ...trace.fields])},`,
+    '  "rows": [',
+    trace.rows.map(row => '    ' + JSON.stringify(row)).join(',\n'),
+    '  ]',
+    '}',
+    '',
+  ].join('\n');
+  fs.writeFileSync(path.join(__dirname, spec.name + '.json'), body);
+  console.log(`${spec.name}: ${trace.rows.length} rows`);
+}
+const journal = recordJournal(coreSrc, JOURNAL_CASE);
+fs.mkdirSync(path.join(__dirname, 'journals'), {recursive: true});
+fs.writeFileSync(path.join(__dirname, 'journals', JOURNAL_CASE.name + '.json'), JSON.stringify(journal, null, 1) + '\n');
+console.log(`${JOURNAL_CASE.name}: ${journal.entries.length} entries`);